@@ -0,0 +1,136 @@
+"""
+===========================
+@Time : 2026/10/20 下午2:00
+@Author : Entropy.Xu
+@File : autosave.py
+@Software: PyCharm
+============================
+"""
+# autosave.py
+# 自动保存：编辑后延迟一段时间（连续编辑会合并为一次）再保存，
+# 在界面线程只取课程快照，序列化和写入在后台线程完成，并以临时文件加重命名的方式原子写入。
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, QStandardPaths, Signal
+
+from course import Course
+from period_table import format_time, parse_time_or_none
+from utils import atomic_open
+
+AUTOSAVE_PATH_ENV = "CLASSTABLE_AUTOSAVE_PATH"
+AUTOSAVE_FORMAT_VERSION = 1
+DEBOUNCE_MS = 1000     # 最后一次编辑后等待的时间
+MAX_DELAY_MS = 5000    # 持续编辑时，距第一次未保存的编辑最多等待的时间
+
+
+def default_autosave_path():
+    """默认的自动保存路径：应用数据目录下的 autosave.json"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    return os.path.join(directory or os.path.expanduser("~"), "autosave.json")
+
+
+def resolve_autosave_path(configured=None):
+    """确定自动保存路径：环境变量优先，其次为用户设置的路径，最后为默认路径"""
+    return os.environ.get(AUTOSAVE_PATH_ENV) or configured or default_autosave_path()
+
+
+def snapshot_courses(courses):
+    """在界面线程中取课程快照，每门课程为一个不可变的元组"""
+    return [
+        (c.day, c.period, c.name, c.location, c.weeks_mask, c.start_time, c.end_time)
+        for c in courses
+    ]
+
+
+def encode_snapshot(snapshot):
+    """将快照编码为紧凑的 JSON：每门课程一个数组，周数保存为位掩码"""
+    rows = [
+        [day, period, name, location, weeks_mask, format_time(start_time), format_time(end_time)]
+        for day, period, name, location, weeks_mask, start_time, end_time in snapshot
+    ]
+    data = {'version': AUTOSAVE_FORMAT_VERSION, 'saved_at': time.time(), 'courses': rows}
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_courses(data):
+    """解码自动保存的内容，返回课程列表"""
+    payload = json.loads(data)
+    if payload.get('version') != AUTOSAVE_FORMAT_VERSION:
+        raise ValueError(f"不支持的自动保存格式版本：{payload.get('version')}")
+    return [
+        Course(day, period, name, location, weeks_mask, parse_time_or_none(start), parse_time_or_none(end))
+        for day, period, name, location, weeks_mask, start, end in payload['courses']
+    ]
+
+
+def load_autosave(path):
+    """读取自动保存文件，返回课程列表"""
+    with open(path, 'rb') as f:
+        return decode_courses(f.read())
+
+
+def write_snapshot(snapshot, path):
+    """在后台线程中序列化快照并原子写入"""
+    data = encode_snapshot(snapshot)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with atomic_open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+class AutoSaver(QObject):
+    """防抖的异步自动保存"""
+    saved = Signal(str)    # 保存成功的路径
+    failed = Signal(str)   # 错误信息
+
+    def __init__(self, courses, path=None, parent=None):
+        super().__init__(parent)
+        self.courses = courses
+        self.path = path or resolve_autosave_path()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending_since = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.save_now)
+
+    def schedule(self):
+        """记录一次编辑，合并短时间内的连续编辑后再保存"""
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        remaining_ms = MAX_DELAY_MS - int((now - self._pending_since) * 1000)
+        self._timer.start(max(0, min(DEBOUNCE_MS, remaining_ms)))
+
+    def save_now(self):
+        """立即取快照并提交到后台线程写入"""
+        self._timer.stop()
+        self._pending_since = None
+        future = self._executor.submit(write_snapshot, snapshot_courses(self.courses), self.path)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        # 在后台线程中调用，信号会排队到界面线程
+        error = future.exception()
+        if error is not None:
+            self.failed.emit(str(error))
+        else:
+            self.saved.emit(future.result())
+
+    def has_pending(self):
+        """是否有尚未保存的编辑"""
+        return self._pending_since is not None
+
+    def flush(self):
+        """保存尚未保存的编辑并等待所有写入完成（用于退出前）"""
+        if self.has_pending():
+            self.save_now()
+        self._executor.shutdown(wait=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+
+    def set_path(self, path):
+        """修改自动保存路径，之后的保存写入新路径"""
+        self.path = path
@@ -0,0 +1,242 @@
+"""
+===========================
+@Time : 2026/10/18 上午9:45
+@Author : Entropy.Xu
+@File : batch_generate.py
+@Software: PyCharm
+============================
+"""
+# batch_generate.py
+# 无界面的批量 ICS 生成入口，例如：
+#   python batch_generate.py courses/*.json -o out --start 2024-09-02 -j 8
+#   python batch_generate.py --db schedules.db --semester 2024秋 -o out
+#   python batch_generate.py --db schedules.db --semester 2024秋 -o out --update   # 调课后再生成增量更新文件
+#   python batch_generate.py courses/*.json -o out --start 2024-09-02 --holidays holidays.json
+#   python batch_generate.py courses/*.json -o out --start 2024-09-02 --metrics -      # 输出各阶段耗时和计数
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from holiday_calendar import load_holidays
+from ics_cache import EventCache
+from ics_feed import export_calendar, update_path_for
+from ics_generator import EVENT_MODES, MODE_RRULE, load_courses
+from ics_writer import write_ics_stream
+from instrumentation import METRICS_ENV, PROFILE_ENV, OperationRecord, metrics, operation
+
+# 每个子进程各自的事件缓存，同一课程出现在多个学生的课表中时只序列化一次
+_event_cache = EventCache()
+# 每个子进程各自打开的课表库连接，按库文件路径缓存
+_databases = {}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="批量将 courses.json 格式的课程文件生成 ICS 日历")
+    parser.add_argument('inputs', nargs='*', help="课程 JSON 文件")
+    parser.add_argument('--db', help="从 SQLite 课表库读取课表（见 schedule_db.py、csv_import.py）")
+    parser.add_argument('--semester', help="与 --db 一起使用，导出该学期的所有课表")
+    parser.add_argument('-o', '--output-dir', default='.', help="ICS 文件输出目录（默认当前目录）")
+    parser.add_argument('-s', '--start', type=date.fromisoformat,
+                        help="学期第一周的第一天，格式 YYYY-MM-DD；使用 --db 时默认取课表库中记录的日期")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="并行进程数（默认使用全部 CPU 核心）")
+    parser.add_argument('-m', '--mode', choices=EVENT_MODES, default=MODE_RRULE,
+                        help="rrule：每门课一个重复事件（默认）；expanded：每周一个事件")
+    parser.add_argument('--update', action='store_true',
+                        help="与上次生成时保存的清单比较，另写只含新增、修改、取消事件的 <名称>.update.ics")
+    parser.add_argument('--holidays', metavar='FILE',
+                        help="节假日与调休表（JSON，格式见 holiday_calendar.py），放假日期的课程不生成，调休日补课")
+    parser.add_argument('--metrics', metavar='FILE', default=os.environ.get(METRICS_ENV),
+                        help=f"把各操作的耗时和计数（生成的事件数等）以 JSON 写入 FILE，- 表示标准错误；"
+                             f"默认取环境变量 {METRICS_ENV}")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.db:
+        parser.error("请指定课程 JSON 文件或 --db 课表库")
+    if args.db and not args.semester:
+        parser.error("使用 --db 时必须指定 --semester")
+    if args.inputs and args.start is None:
+        parser.error("从 JSON 文件生成时必须指定 --start")
+    if args.holidays:
+        try:
+            args.holidays = load_holidays(args.holidays)
+        except (OSError, ValueError) as e:
+            parser.error(f"读取节假日表失败：{e}")
+    return args
+
+
+def output_path_for(input_path, output_dir):
+    """根据输入文件名得到输出的 ICS 路径（只取文件名，不同目录下的同名文件会冲突，见 check_output_paths）"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem}.ics")
+
+
+def unique_inputs(inputs):
+    """去掉重复给出的同一个文件（如通配符与文件名同时给出），保持原顺序"""
+    seen = set()
+    result = []
+    for path in inputs:
+        key = os.path.realpath(path)
+        if key not in seen:
+            seen.add(key)
+            result.append(path)
+    return result
+
+
+def class_output_path(class_name, output_dir):
+    """课表库中班级课表的输出路径：<班级>.ics，班级名称中的路径分隔符替换为 _，其中的 . 原样保留"""
+    name = class_name.replace('/', '_').replace(os.sep, '_')
+    if os.altsep:
+        name = name.replace(os.altsep, '_')
+    return os.path.join(output_dir, f"{name}.ics")
+
+
+def check_output_paths(tasks):
+    """检查是否有多个任务写入同一个文件，有则抛出 ValueError，避免后写的课表静默覆盖先写的"""
+    sources = {}
+    for task in tasks:
+        sources.setdefault(os.path.normcase(os.path.abspath(task[1])), []).append(source_label(task[0]))
+    collisions = [(path, labels) for path, labels in sources.items() if len(labels) > 1]
+    if collisions:
+        raise ValueError('；'.join(f"{'、'.join(labels)} 都会写入 {path}" for path, labels in collisions))
+
+
+def database_sources(db_path, semester, semester_start=None):
+    """列出课表库中某学期的所有课表，返回 [((库文件, 班级, 学期), 学期开始日期), ...]"""
+    from schedule_db import ScheduleDatabase
+
+    with ScheduleDatabase(db_path) as db:
+        return [((db_path, class_name, semester), semester_start or stored_start)
+                for class_name, _, stored_start, _ in db.list_schedules(semester=semester)]
+
+
+def source_label(source):
+    """任务来源的显示名称：JSON 文件路径或班级名"""
+    return source[1] if isinstance(source, tuple) else source
+
+
+def load_source(source):
+    """读取任务的课程：JSON 文件路径，或课表库中的 (库文件, 班级, 学期)"""
+    if not isinstance(source, tuple):
+        return load_courses(source)
+    from schedule_db import ScheduleDatabase
+
+    db_path, class_name, semester = source
+    db = _databases.get(db_path)
+    if db is None:
+        db = _databases[db_path] = ScheduleDatabase(db_path)
+    return db.load_schedule(class_name, semester)[0]
+
+
+def init_worker(profile_dir):
+    """子进程启动时调用：spawn 方式启动的子进程不继承父进程的状态，需要在这里设置 cProfile 的输出目录"""
+    metrics.set_profile_dir(profile_dir)
+
+
+def generate_one(task):
+    """在子进程中生成单个 ICS 文件，返回 (来源名称, 事件数, 错误信息, 计时记录的字典, 跳过的课程名称)
+
+    时间格式错误的课程不生成事件，其名称随结果返回。update 为真时通过 ics_feed 与上次的清单比较并写出增量更新文件，否则只写完整文件。
+    """
+    source, output_path, semester_start, mode, update, holidays = task
+    count, error = 0, None
+    skipped = []
+    with operation('load_courses') as load_record:
+        try:
+            if semester_start is None:
+                raise ValueError("缺少学期开始日期，请指定 --start")
+            courses = load_source(source)
+        except Exception as e:
+            error = str(e)
+    records = [load_record.to_dict()]
+    if error is None:
+        def on_invalid_course(course):
+            skipped.append(course.name)
+
+        with operation('generate_ics') as record:
+            try:
+                if update:
+                    count = export_calendar(courses, semester_start, output_path, mode, update_path_for(output_path),
+                                            on_invalid_course=on_invalid_course, cache=_event_cache,
+                                            holidays=holidays).event_count
+                else:
+                    count = write_ics_stream(courses, semester_start, output_path, mode, on_invalid_course,
+                                             cache=_event_cache, holidays=holidays)
+            except Exception as e:
+                error = str(e)
+        records.append(record.to_dict())
+    return source_label(source), count, error, records, skipped
+
+
+def run(inputs, output_dir, semester_start, jobs=None, mode=MODE_RRULE, db_sources=(), update=False, holidays=None,
+        profile_dir=None):
+    """并行生成所有 ICS 文件，返回 (成功文件数, 事件总数, 失败列表, 跳过列表, 耗时秒数)
+
+    失败列表为 [(来源, 错误信息), ...]；跳过列表为 [(来源, [课程名称, ...]), ...]，列出因时间格式错误
+    而没有生成事件的课程，这些文件仍计入成功。
+
+    db_sources 为 database_sources() 的结果，每份课表输出为 <班级>.ics。
+    update 为真时每个文件旁边保存清单，并写出相对上次的增量更新文件。
+    holidays 为可选的 holiday_calendar.HolidayCalendar，随任务传给子进程。
+    profile_dir 给出时每个子进程用 cProfile 记录各自的操作，写入该目录。
+    多个来源对应同一个输出文件时不生成任何文件，抛出 ValueError。
+    """
+    tasks = [(path, output_path_for(path, output_dir), semester_start, mode, update, holidays)
+             for path in unique_inputs(inputs)]
+    tasks.extend(
+        (source, class_output_path(source[1], output_dir), start, mode, update, holidays)
+        for source, start in db_sources
+    )
+    check_output_paths(tasks)
+    os.makedirs(output_dir, exist_ok=True)
+
+    files = events = 0
+    failures = []
+    skipped = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(profile_dir,)) as executor:
+        chunksize = max(1, len(tasks) // ((jobs or os.cpu_count() or 1) * 4))
+        for input_path, count, error, records, names in executor.map(generate_one, tasks, chunksize=chunksize):
+            for data in records:
+                metrics.record(OperationRecord.from_dict(data))
+            if names:
+                skipped.append((input_path, names))
+            if error is not None:
+                failures.append((input_path, error))
+                continue
+            files += 1
+            events += count
+    elapsed = time.perf_counter() - started
+    return files, events, failures, skipped, elapsed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    db_sources = database_sources(args.db, args.semester, args.start) if args.db else ()
+    try:
+        files, events, failures, skipped, elapsed = run(args.inputs, args.output_dir, args.start, args.jobs,
+                                                        args.mode, db_sources, args.update, args.holidays,
+                                                        os.environ.get(PROFILE_ENV))
+    except ValueError as e:
+        print(f"输出文件冲突：{e}", file=sys.stderr)
+        return 2
+
+    for input_path, error in failures:
+        print(f"生成失败：{input_path}: {error}", file=sys.stderr)
+    for input_path, names in skipped:
+        print(f"跳过时间格式错误的课程：{input_path}: {'、'.join(names)}", file=sys.stderr)
+
+    rate = elapsed if elapsed > 0 else float('inf')
+    print(f"已生成 {files} 个文件，共 {events} 个事件，耗时 {elapsed:.2f} 秒")
+    if skipped:
+        print(f"{len(skipped)} 个文件中共跳过 {sum(len(names) for _, names in skipped)} 门时间格式错误的课程")
+    print(f"吞吐量：{files / rate:.1f} 文件/秒，{events / rate:.1f} 事件/秒")
+    if args.metrics:
+        metrics.write_report(args.metrics)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""
+===========================
+@Time : 2026/10/19 下午4:00
+@Author : Entropy.Xu
+@File : __init__.py
+@Software: PyCharm
+============================
+"""
+# benchmarks/__init__.py
+# 性能基准测试，运行方式见 run_benchmarks.py
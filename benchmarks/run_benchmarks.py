@@ -0,0 +1,373 @@
+"""
+===========================
+@Time : 2026/10/19 下午4:10
+@Author : Entropy.Xu
+@File : run_benchmarks.py
+@Software: PyCharm
+============================
+"""
+# benchmarks/run_benchmarks.py
+# 性能基准测试：ICS 生成、表格刷新、周数解析与格式化、复制/粘贴/删除、保存/加载、冲突检测。
+# 在项目根目录运行，结果以 JSON 输出，可与之前的结果比较：
+#   python -m benchmarks.run_benchmarks -o bench.json
+#   python -m benchmarks.run_benchmarks --sizes 10,1000 --compare bench.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from benchmarks.synthetic import make_courses, make_week_strings  # noqa: E402
+from conflicts import ConflictEngine, find_conflicts  # noqa: E402
+from course import Course  # noqa: E402
+from ics_cache import EventCache  # noqa: E402
+from holiday_calendar import HolidayCalendar  # noqa: E402
+from ics_feed import export_calendar  # noqa: E402
+from ics_generator import MODE_EXPANDED, MODE_RRULE, fixed_versions, utc_now  # noqa: E402
+from ics_writer import write_ics_stream  # noqa: E402
+from utils import format_weeks, parse_weeks_input  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+SEMESTER_START = date(2024, 9, 2)
+# 2024 年秋季学期的中秋、国庆放假和调休
+HOLIDAYS = HolidayCalendar.from_dict({
+    'skip': ['2024-09-15..2024-09-17', '2024-10-01..2024-10-07', '2025-01-01'],
+    'makeup': {'2024-09-14': '2024-09-16', '2024-09-29': '2024-10-04', '2024-10-12': '2024-10-07'},
+})
+
+
+def measure(func, repeat, setup=None):
+    """运行 repeat 次并返回每次耗时（秒），setup 的返回值作为 func 的参数且不计入耗时"""
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        started = time.perf_counter()
+        func(state)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def ics_benchmarks(size, tmp_dir):
+    """ICS 生成相关的基准"""
+    courses = make_courses(size)
+    path = os.path.join(tmp_dir, 'bench.ics')
+    feed_path = os.path.join(tmp_dir, 'bench_feed.ics')
+    # 固定 DTSTAMP，重复导出时缓存才能命中（与有清单时的界面导出相同）
+    versions = fixed_versions(utc_now())
+    cache = EventCache(max_entries=size)
+    write_ics_stream(courses, SEMESTER_START, path, MODE_RRULE, cache=cache, versions=versions)
+    feed_cache = EventCache(max_entries=size)
+    export_calendar(courses, SEMESTER_START, feed_path, MODE_RRULE, cache=feed_cache)
+    return {
+        'ics_stream_expanded': lambda _: write_ics_stream(courses, SEMESTER_START, path, MODE_EXPANDED),
+        'ics_stream_rrule': lambda _: write_ics_stream(courses, SEMESTER_START, path, MODE_RRULE),
+        'ics_stream_expanded_holidays': lambda _: write_ics_stream(courses, SEMESTER_START, path, MODE_EXPANDED,
+                                                                   holidays=HOLIDAYS),
+        'ics_stream_rrule_holidays': lambda _: write_ics_stream(courses, SEMESTER_START, path, MODE_RRULE,
+                                                                holidays=HOLIDAYS),
+        'ics_stream_rrule_cached': lambda _: write_ics_stream(courses, SEMESTER_START, path, MODE_RRULE, cache=cache,
+                                                              versions=versions),
+        # 与上次清单比较、课程未变化时的重复导出（含增量更新文件）
+        'ics_feed_rrule_unchanged': lambda _: export_calendar(courses, SEMESTER_START, feed_path, MODE_RRULE,
+                                                              feed_path + '.update', cache=feed_cache),
+    }
+
+
+def week_benchmarks(size, tmp_dir):
+    """周数解析与格式化的基准"""
+    strings = make_week_strings(size)
+    masks = [parse_weeks_input(s, as_mask=True) for s in strings]
+    lists = [parse_weeks_input(s) for s in strings]
+    return {
+        'parse_weeks': lambda _: [parse_weeks_input(s) for s in strings],
+        'parse_weeks_mask': lambda _: [parse_weeks_input(s, as_mask=True) for s in strings],
+        'format_weeks_list': lambda _: [format_weeks(weeks) for weeks in lists],
+        'format_weeks_mask': lambda _: [format_weeks(mask) for mask in masks],
+    }
+
+
+def persistence_benchmarks(size, tmp_dir):
+    """保存与加载 courses.json 的基准"""
+    courses = make_courses(size)
+    path = os.path.join(tmp_dir, 'courses.json')
+
+    def save(_):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([course.to_dict() for course in courses], f, ensure_ascii=False, indent=4)
+
+    def load(_):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [Course.from_dict(data) for data in json.load(f)]
+
+    save(None)
+    return {'save_json': save, 'load_json': load}
+
+
+def conflict_benchmarks(size, tmp_dir):
+    """冲突检测的基准：全量扫描、整体重建和单次编辑的增量更新"""
+    courses = make_courses(size)
+    engine = ConflictEngine(courses)
+    edited = courses[0].copy()
+
+    def single_edit(_):
+        engine.course_added(edited)
+        engine.course_removed(edited)
+
+    return {
+        'find_conflicts': lambda _: find_conflicts(courses),
+        'conflicts_reset': lambda _: engine.courses_reset(courses),
+        'conflicts_single_edit': single_edit,
+    }
+
+
+def server_benchmarks(size, tmp_dir):
+    """订阅服务的基准：单门课程修改后重新生成，以及带 If-None-Match 的轮询请求（每次 200 个）"""
+    import http.client
+    from ics_server import CalendarFeed, IcsServer
+
+    courses = make_courses(size)
+    edited = [course.copy() for course in courses]
+    edited[0] = edited[0].copy(location=edited[0].location + '*')
+    server = IcsServer('127.0.0.1', 0)
+    feed = server.add_feed('bench', CalendarFeed())
+    feed.update(courses, SEMESTER_START)
+    feed.body()
+    server.start()
+
+    def rebuild_after_edit(_):
+        feed.update(edited, SEMESTER_START)
+        feed.body()
+        feed.update(courses, SEMESTER_START)
+        feed.body()
+
+    def poll(_):
+        body = feed.body()
+        etag = body.gzip_etag or body.etag  # 请求带 Accept-Encoding: gzip，内容足够大时返回压缩结果
+        conn = http.client.HTTPConnection('127.0.0.1', server.port)
+        for _ in range(200):
+            conn.request('GET', '/bench.ics', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+            conn.getresponse().read()
+        conn.close()
+
+    return {
+        'feed_rebuild_single_edit': rebuild_after_edit,
+        'feed_poll_304_x200': poll,
+    }, server.stop
+
+
+def gui_benchmarks(size, tmp_dir):
+    """表格刷新与复制/粘贴/删除的基准（offscreen 平台）"""
+    from PySide6.QtCore import QEvent, QItemSelection, QItemSelectionModel
+    from PySide6.QtWidgets import QApplication
+    from main_window import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    os.environ['CLASSTABLE_AUTOSAVE_PATH'] = os.path.join(tmp_dir, 'autosave.json')
+    window = MainWindow()
+    courses = make_courses(size)
+    model = window.table.model()
+
+    def select_all_days():
+        selection_model = window.table.selectionModel()
+        selection_model.clearSelection()
+        selection_model.select(
+            QItemSelection(model.index(0, 1), model.index(model.rowCount() - 1, 7)),
+            QItemSelectionModel.SelectionFlag.Select,
+        )
+
+    def loaded():
+        window.courses.reset(course.copy() for course in courses)
+        window.refresh_table()
+        app.processEvents()
+
+    def full_refresh(_):
+        window.refresh_table()
+        app.processEvents()
+
+    def single_edit(_):
+        course = courses[0].copy()
+        window.courses.add(course)
+        window.refresh_dirty_cells()
+        window.courses.remove(course)
+        window.refresh_dirty_cells()
+        app.processEvents()
+
+    def copy_setup():
+        loaded()
+        select_all_days()
+
+    def paste_setup():
+        copy_setup()
+        window.copy_cells()
+        window.courses.clear()
+        window.refresh_dirty_cells()
+
+    def undo_setup():
+        copy_setup()
+        window.delete_selected_courses()
+        app.processEvents()
+
+    def scripted_edits(_):
+        # 脚本逐门添加课程并逐次提交，batch_update 把这些提交合并为一次刷新
+        with window.batch_update("脚本"):
+            for course in courses[:200]:
+                window.courses.add(course.copy())
+                window.commit_course_changes()
+        app.processEvents()
+
+    def show_all_weeks():
+        window.week_spin.setValue(0)
+        window.resize_pending_rows()
+        app.processEvents()
+
+    def week_scrub(_):
+        for week in range(1, 21):
+            window.week_spin.setValue(week)
+            app.processEvents()
+        window.resize_pending_rows()
+        app.processEvents()
+
+    def finish(action):
+        def run(_):
+            action()
+            app.processEvents()
+        return run
+
+    def close_window():
+        # 临时目录删除前等自动保存写完，并销毁窗口，避免后台线程再写入 autosave.json
+        window.autosaver.flush()
+        window.close()
+        window.deleteLater()
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    loaded()
+    return {
+        'table_full_refresh': full_refresh,
+        'table_single_edit': single_edit,
+        'copy_all': (finish(window.copy_cells), copy_setup),
+        'paste_all': (finish(window.paste_cells), paste_setup),
+        'delete_all': (finish(window.delete_selected_courses), copy_setup),
+        'undo_delete_all': (finish(window.undo_edit), undo_setup),
+        'scripted_add_200': (scripted_edits, loaded),
+        'week_scrub_20': (week_scrub, show_all_weeks),
+    }, close_window
+
+
+GROUPS = {
+    'ics': ics_benchmarks,
+    'weeks': week_benchmarks,
+    'persistence': persistence_benchmarks,
+    'conflicts': conflict_benchmarks,
+    'server': server_benchmarks,
+    'gui': gui_benchmarks,
+}
+
+
+def run(sizes, groups, repeat, gui_limit):
+    """运行所有基准，返回结果列表"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for group in groups:
+            for size in sizes:
+                if group == 'gui' and size > gui_limit:
+                    continue
+                benchmarks = GROUPS[group](size, tmp_dir)
+                # 基准组可以返回 (基准, 清理函数)，清理函数在该规模测完后调用
+                benchmarks, cleanup = benchmarks if isinstance(benchmarks, tuple) else (benchmarks, None)
+                try:
+                    for name, bench in benchmarks.items():
+                        func, setup = bench if isinstance(bench, tuple) else (bench, None)
+                        timings = measure(func, repeat, setup)
+                        result = {
+                            'group': group,
+                            'name': name,
+                            'size': size,
+                            'repeat': repeat,
+                            'min': min(timings),
+                            'median': statistics.median(timings),
+                            'max': max(timings),
+                        }
+                        results.append(result)
+                        print(f"{group:<12}{name:<26}{size:>8}  min {result['min'] * 1000:10.3f} ms  "
+                              f"median {result['median'] * 1000:10.3f} ms", file=sys.stderr)
+                finally:
+                    if cleanup is not None:
+                        cleanup()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """与之前的结果比较，返回变慢超过阈值的条目"""
+    previous = {(r['group'], r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['group'], result['name'], result['size']))
+        if old is None or old['min'] <= 0:
+            continue
+        ratio = result['min'] / old['min']
+        if ratio > 1 + threshold:
+            regressions.append({**result, 'baseline_min': old['min'], 'ratio': ratio})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="课表生成工具性能基准测试")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="课程数量，逗号分隔（默认 10 到 100000）")
+    parser.add_argument('--groups', default=','.join(GROUPS),
+                        help=f"要运行的基准组，逗号分隔，可选 {','.join(GROUPS)}")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数（取最小值比较）")
+    parser.add_argument('--gui-limit', type=int, default=10000,
+                        help="表格相关基准的最大课程数（默认 10000）")
+    parser.add_argument('-o', '--output', help="结果 JSON 输出路径（默认输出到标准输出）")
+    parser.add_argument('--compare', help="之前的结果 JSON，用于检查性能回退")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="判定为回退的变慢比例（默认 0.2，即慢 20%%）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    groups = [group for group in args.groups.split(',') if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        print(f"未知的基准组：{','.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': run(sizes, groups, args.repeat, args.gui_limit),
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare(report['results'], json.load(f), args.threshold)
+        for item in report['regressions']:
+            print(f"性能回退：{item['group']}/{item['name']} size={item['size']} "
+                  f"慢了 {(item['ratio'] - 1) * 100:.0f}%", file=sys.stderr)
+        status = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+===========================
+@Time : 2026/10/19 下午4:00
+@Author : Entropy.Xu
+@File : synthetic.py
+@Software: PyCharm
+============================
+"""
+# benchmarks/synthetic.py
+# 生成用于基准测试的合成课表
+import random
+
+from course import Course
+from period_table import PeriodTable
+from utils import format_weeks
+
+COURSE_NAMES = ["高等数学", "线性代数", "大学英语", "大学物理", "程序设计", "数据结构", "思想政治", "体育"]
+BUILDINGS = ["教学楼A", "教学楼B", "实验楼", "综合楼"]
+WEEK_PATTERNS = ["1-16", "1-8", "9-16", "1-17", "1,3,5,7,9,11,13,15", "2-16", "1-4,6-12,14-16"]
+
+
+def make_courses(count, seed=0, periods=None):
+    """生成 count 门随机课程，相同 seed 结果相同"""
+    rng = random.Random(seed)
+    periods = periods or PeriodTable.default()
+    courses = []
+    for i in range(count):
+        period = rng.randrange(len(periods))
+        start_time, end_time = periods.times(period)
+        weeks_mask = 0
+        for part in rng.choice(WEEK_PATTERNS).split(','):
+            start, _, end = part.partition('-')
+            for week in range(int(start), int(end or start) + 1):
+                weeks_mask |= 1 << week
+        courses.append(Course(
+            rng.randrange(7),
+            period,
+            f"{rng.choice(COURSE_NAMES)}{i}",
+            f"{rng.choice(BUILDINGS)}{rng.randrange(100, 600)}",
+            weeks_mask,
+            start_time,
+            end_time,
+        ))
+    return courses
+
+
+def make_week_strings(count, seed=0):
+    """生成 count 个周数输入字符串"""
+    rng = random.Random(seed)
+    strings = []
+    for _ in range(count):
+        weeks = rng.sample(range(1, 21), rng.randrange(1, 18))
+        strings.append(format_weeks(weeks))
+    return strings
@@ -0,0 +1,207 @@
+"""
+===========================
+@Time : 2026/10/21 上午10:00
+@Author : Entropy.Xu
+@File : conflicts.py
+@Software: PyCharm
+============================
+"""
+# conflicts.py
+# 上课时间冲突检测：同一天、时间区间重叠且有共同上课周的两门课程视为冲突。
+# 课程按星期分组并按开始时间排序，周数用位掩码一次比较所有周，
+# 相当于按 (周, 星期) 建立索引，但每门课程只需一条记录。
+# ConflictEngine 作为 CourseStore 的监听者随增删改增量更新，每次编辑只检查时间上相邻的课程。
+from bisect import bisect_left, insort
+
+from utils import format_weeks
+
+WEEKDAY_NAMES = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+
+
+def course_interval(course):
+    """课程的上课时间区间 (开始分钟, 结束分钟)，时间缺失或不合法时返回 None"""
+    start, end = course.start_time, course.end_time
+    if start is None or end is None:
+        return None
+    start_minutes, end_minutes = start.hour * 60 + start.minute, end.hour * 60 + end.minute
+    if end_minutes <= start_minutes:
+        return None
+    return start_minutes, end_minutes
+
+
+class Conflict:
+    """两门课程的冲突，weeks_mask 为冲突的周"""
+
+    __slots__ = ('first', 'second', 'weeks_mask')
+
+    def __init__(self, first, second, weeks_mask):
+        self.first = first
+        self.second = second
+        self.weeks_mask = weeks_mask
+
+    def __repr__(self):
+        return f"Conflict({self.first.name!r}, {self.second.name!r}, weeks={format_weeks(self.weeks_mask)})"
+
+    def other(self, course):
+        """冲突中的另一门课程"""
+        return self.second if course is self.first else self.first
+
+    def describe(self):
+        """冲突的文字描述"""
+        return (f"{WEEKDAY_NAMES[self.first.day]}：{self.first.name}({self.first.location}) 与 "
+                f"{self.second.name}({self.second.location}) 在第 {format_weeks(self.weeks_mask)} 周时间重叠")
+
+
+def find_conflicts(courses):
+    """一次性找出所有冲突：按星期分组，按开始时间扫描（sweep line），只比较仍在进行中的课程"""
+    by_day = {}
+    for course in courses:
+        interval = course_interval(course)
+        if interval is not None:
+            by_day.setdefault(course.day, []).append((interval[0], interval[1], course))
+
+    conflicts = []
+    for entries in by_day.values():
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        active = []
+        for start, end, course in entries:
+            active = [entry for entry in active if entry[1] > start]
+            for _, _, other in active:
+                common = course.weeks_mask & other.weeks_mask
+                if common:
+                    conflicts.append(Conflict(other, course, common))
+            active.append((start, end, course))
+    return conflicts
+
+
+class ConflictEngine:
+    """增量维护的冲突索引，实现 CourseStore 的监听接口"""
+
+    def __init__(self, courses=()):
+        self._entries = {}      # id(course) -> (day, start, end, course)，记录加入时的时间
+        self._days = {}         # day -> [(start, end, id(course)), ...]，按开始时间排序
+        self._max_duration = 0  # 最长的课程时长，用于限定需要比较的范围
+        self._pairs = {}        # id(course) -> {id(other): Conflict}
+        self._slot_counts = {}  # (day, period) -> 涉及该单元格的冲突数
+        self._changed = set()   # 冲突状态变化的 (day, period)
+        self._count = 0
+        if courses:
+            self.courses_reset(courses)
+
+    def __len__(self):
+        return self._count
+
+    def check(self, course):
+        """检查一门课程（无论是否已加入）与已有课程的冲突，不修改索引"""
+        interval = course_interval(course)
+        if interval is None:
+            return []
+        start, end = interval
+        entries = self._days.get(course.day)
+        if not entries:
+            return []
+        # 只有开始时间落在 (start - 最长时长, end) 内的课程才可能与之重叠
+        lo = bisect_left(entries, (start - self._max_duration + 1,))
+        hi = bisect_left(entries, (end,))
+        conflicts = []
+        for other_start, other_end, other_key in entries[lo:hi]:
+            if other_end <= start or other_key == id(course):
+                continue
+            other = self._entries[other_key][3]
+            common = course.weeks_mask & other.weeks_mask
+            if common:
+                conflicts.append(Conflict(other, course, common))
+        return conflicts
+
+    def course_added(self, course):
+        key = id(course)
+        interval = course_interval(course)
+        if key in self._entries or interval is None:
+            return
+        for conflict in self.check(course):
+            self._link(conflict)
+        start, end = interval
+        self._entries[key] = (course.day, start, end, course)
+        insort(self._days.setdefault(course.day, []), (start, end, key))
+        self._max_duration = max(self._max_duration, end - start)
+
+    def course_removed(self, course):
+        key = id(course)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        day, start, end, _ = entry
+        entries = self._days[day]
+        del entries[bisect_left(entries, (start, end, key))]
+        for conflict in list(self._pairs.get(key, {}).values()):
+            self._unlink(conflict)
+
+    def courses_reset(self, courses):
+        """整体替换课程：排序建立索引，并用 sweep line 一次找出所有冲突"""
+        self._changed.update(self._slot_counts)
+        self._entries.clear()
+        self._days.clear()
+        self._max_duration = 0
+        self._pairs.clear()
+        self._slot_counts.clear()
+        self._count = 0
+        for course in courses:
+            interval = course_interval(course)
+            if interval is None or id(course) in self._entries:
+                continue
+            start, end = interval
+            self._entries[id(course)] = (course.day, start, end, course)
+            self._days.setdefault(course.day, []).append((start, end, id(course)))
+            self._max_duration = max(self._max_duration, end - start)
+        for entries in self._days.values():
+            entries.sort()
+        for conflict in find_conflicts(entry[3] for entry in self._entries.values()):
+            self._link(conflict)
+
+    def _link(self, conflict):
+        first, second = conflict.first, conflict.second
+        self._pairs.setdefault(id(first), {})[id(second)] = conflict
+        self._pairs.setdefault(id(second), {})[id(first)] = conflict
+        self._count += 1
+        for course in (first, second):
+            slot = (course.day, course.period)
+            self._slot_counts[slot] = self._slot_counts.get(slot, 0) + 1
+            self._changed.add(slot)
+
+    def _unlink(self, conflict):
+        first, second = conflict.first, conflict.second
+        self._count -= 1
+        for course, other in ((first, second), (second, first)):
+            pairs = self._pairs[id(course)]
+            del pairs[id(other)]
+            if not pairs:
+                del self._pairs[id(course)]
+            slot = (course.day, course.period)
+            self._slot_counts[slot] -= 1
+            if not self._slot_counts[slot]:
+                del self._slot_counts[slot]
+            self._changed.add(slot)
+
+    def conflicts(self):
+        """所有冲突，每对课程只出现一次"""
+        seen = set()
+        result = []
+        for pairs in self._pairs.values():
+            for conflict in pairs.values():
+                if id(conflict) not in seen:
+                    seen.add(id(conflict))
+                    result.append(conflict)
+        return result
+
+    def conflicts_for(self, course):
+        """与指定课程冲突的所有冲突记录"""
+        return list(self._pairs.get(id(course), {}).values())
+
+    def slot_has_conflict(self, day, period):
+        """指定单元格中是否有课程存在冲突"""
+        return (day, period) in self._slot_counts
+
+    def take_changed(self):
+        """取出并清空冲突状态发生变化的单元格集合"""
+        changed, self._changed = self._changed, set()
+        return changed
@@ -0,0 +1,78 @@
+"""
+===========================
+@Time : 2026/10/19 上午9:15
+@Author : Entropy.Xu
+@File : course.py
+@Software: PyCharm
+============================
+"""
+# course.py
+# 紧凑的课程记录：使用 __slots__，周数以整数位掩码保存，
+# 判断某周是否上课、两门课是否有共同周数都只需一次位运算。
+# 上课时间以 datetime.time 保存，只在读取 JSON 时解析一次。
+from period_table import format_time, parse_time_or_none
+from utils import mask_to_weeks, weeks_to_mask
+
+
+class Course:
+    """课程记录，weeks_mask 的第 n 位表示第 n 周有课，start_time/end_time 为 datetime.time"""
+
+    __slots__ = ('day', 'period', 'name', 'location', 'weeks_mask', 'start_time', 'end_time')
+
+    def __init__(self, day, period, name, location, weeks_mask, start_time=None, end_time=None):
+        self.day = day
+        self.period = period
+        self.name = name
+        self.location = location
+        self.weeks_mask = weeks_mask
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __repr__(self):
+        return f"Course({self.name!r}, day={self.day}, period={self.period}, weeks={self.weeks})"
+
+    @property
+    def weeks(self):
+        """升序的周数列表"""
+        return mask_to_weeks(self.weeks_mask)
+
+    def has_week(self, week):
+        """判断第 week 周是否有课"""
+        return bool(self.weeks_mask >> week & 1)
+
+    def shares_week(self, other):
+        """判断与另一门课程是否有共同的上课周"""
+        return bool(self.weeks_mask & other.weeks_mask)
+
+    def copy(self, **changes):
+        """复制课程，可同时修改部分字段"""
+        course = Course(self.day, self.period, self.name, self.location, self.weeks_mask,
+                        self.start_time, self.end_time)
+        for field, value in changes.items():
+            setattr(course, field, value)
+        return course
+
+    def to_dict(self):
+        """转换为与 courses.json 兼容的字典"""
+        return {
+            'day': self.day,
+            'period': self.period,
+            'name': self.name,
+            'location': self.location,
+            'weeks': self.weeks,
+            'start_time': format_time(self.start_time),
+            'end_time': format_time(self.end_time)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 courses.json 中的字典创建课程，时间格式错误时对应字段为 None"""
+        return cls(
+            data['day'],
+            data['period'],
+            data['name'],
+            data.get('location', ''),
+            weeks_to_mask(data.get('weeks', ())),
+            parse_time_or_none(data.get('start_time')),
+            parse_time_or_none(data.get('end_time')),
+        )
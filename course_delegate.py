@@ -0,0 +1,181 @@
+"""
+===========================
+@Time : 2026/10/23 下午8:00
+@Author : Entropy.Xu
+@File : course_delegate.py
+@Software: PyCharm
+============================
+"""
+# course_delegate.py
+# 课程单元格的绘制：每门课程画成一个圆角 "标签"（名称一行或多行，地点和周数一行），
+# 颜色由课程名称决定。行高计算（sizeHint）按单元格内容和列宽缓存，内容或列宽不变时
+# 调整行高不再重新排版文字；名称换行的高度另按 (名称, 宽度) 缓存，相同的课程只排版一次。
+import zlib
+from functools import lru_cache
+
+from PySide6.QtCore import Qt, QRect, QSize
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+from PySide6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+CHIP_MARGIN = 3    # 标签与单元格边缘的距离
+CHIP_PADDING = 4   # 标签内文字与边框的距离
+CHIP_SPACING = 3   # 相邻标签的间距
+CHIP_RADIUS = 4
+NAME_MAX_LINES = 3  # 名称最多换行显示的行数，超出部分被裁掉
+TEXT_COLOR = QColor(33, 33, 33)
+DETAIL_COLOR = QColor(90, 90, 90)
+MAX_CACHED_NAMES = 8192
+
+
+@lru_cache(maxsize=4096)
+def chip_colors(name):
+    """课程名称对应的 (填充色, 边框画笔)，同名课程颜色固定，不随进程变化"""
+    hue = zlib.crc32(name.encode('utf-8')) % 360
+    return QColor.fromHsv(hue, 45, 250), QPen(QColor.fromHsv(hue, 110, 200), 1)
+
+
+def chip_detail(chip):
+    """标签第二行的文字：地点和周数"""
+    _, location, weeks = chip
+    return f"{location}  {weeks}周" if location else f"{weeks}周"
+
+
+class CourseChipDelegate(QStyledItemDelegate):
+    """把 TimetableModel 单元格中的每门课程画成一个标签，节次列和空单元格按默认方式绘制"""
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self._font = None
+        self._bold = None
+        self._metrics = None
+        self._bold_metrics = None
+        self._name_heights = {}  # (名称, 文字宽度) -> 名称部分的高度
+        self._details = {}       # (课程元组, 文字宽度) -> 省略后的第二行文字
+        self._cell_sizes = {}    # (row, column) -> (课程元组, 列宽, QSize)
+
+    def invalidate(self):
+        """清空所有缓存的尺寸（字体变化时自动调用）"""
+        self._name_heights.clear()
+        self._details.clear()
+        self._cell_sizes.clear()
+
+    def _use_font(self, font):
+        if self._font is not None and font == self._font:
+            return
+        self._font = QFont(font)
+        self._bold = QFont(font)
+        self._bold.setBold(True)
+        self._metrics = QFontMetrics(self._font)
+        self._bold_metrics = QFontMetrics(self._bold)
+        self.invalidate()
+
+    def _chips(self, index):
+        column = index.column()
+        return self.model.cell_chips(index.row(), column) if column else ()
+
+    def name_height(self, name, width):
+        """名称按 width 换行后的高度，width 为 None 时不换行"""
+        key = (name, width)
+        height = self._name_heights.get(key)
+        if height is None:
+            line = self._bold_metrics.height()
+            if width is None:
+                height = line
+            else:
+                rect = self._bold_metrics.boundingRect(QRect(0, 0, width, line * NAME_MAX_LINES),
+                                                       Qt.TextFlag.TextWordWrap, name)
+                height = min(max(rect.height(), line), line * NAME_MAX_LINES)
+            if len(self._name_heights) >= MAX_CACHED_NAMES:
+                self._name_heights.clear()
+            self._name_heights[key] = height
+        return height
+
+    def detail_text(self, chip, width):
+        """标签第二行按 width 省略后的文字"""
+        key = (chip, width)
+        text = self._details.get(key)
+        if text is None:
+            text = self._metrics.elidedText(chip_detail(chip), Qt.TextElideMode.ElideRight, width)
+            if len(self._details) >= MAX_CACHED_NAMES:
+                self._details.clear()
+            self._details[key] = text
+        return text
+
+    def chip_height(self, chip, text_width):
+        return self.name_height(chip[0], text_width) + self._metrics.height() + 2 * CHIP_PADDING
+
+    def _text_width(self, cell_width):
+        if cell_width <= 0:
+            return None
+        return max(1, cell_width - 2 * (CHIP_MARGIN + CHIP_PADDING))
+
+    def sizeHint(self, option, index):
+        chips = self._chips(index)
+        if not chips:
+            return super().sizeHint(option, index)
+        self._use_font(option.font)
+        key = (index.row(), index.column())
+        width = option.rect.width()
+        cached = self._cell_sizes.get(key)
+        if cached is not None and cached[1] == width and cached[0] == chips:
+            return cached[2]
+
+        text_width = self._text_width(width)
+        height = 2 * CHIP_MARGIN + CHIP_SPACING * (len(chips) - 1)
+        height += sum(self.chip_height(chip, text_width) for chip in chips)
+        if text_width is None:
+            # 列宽未知（如计算列宽时）：取不换行时最宽的一行
+            width = 2 * (CHIP_MARGIN + CHIP_PADDING) + max(
+                max(self._bold_metrics.horizontalAdvance(chip[0]),
+                    self._metrics.horizontalAdvance(chip_detail(chip)))
+                for chip in chips
+            )
+        size = QSize(width, height)
+        self._cell_sizes[key] = (chips, option.rect.width(), size)
+        return size
+
+    def paint(self, painter, option, index):
+        chips = self._chips(index)
+        if not chips:
+            super().paint(painter, option, index)
+            return
+        self._use_font(option.font)
+
+        # 背景（冲突底色、选中状态、焦点框）仍由样式绘制，只是不画文字
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ''
+        style = opt.widget.style() if opt.widget is not None else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt, painter, opt.widget)
+
+        painter.save()
+        painter.setClipRect(option.rect)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        area = option.rect.adjusted(CHIP_MARGIN, CHIP_MARGIN, -CHIP_MARGIN, -CHIP_MARGIN)
+        text_width = self._text_width(option.rect.width())
+        detail_height = self._metrics.height()
+        top = area.top()
+        for chip in chips:
+            if top > option.rect.bottom():
+                break
+            name_height = self.name_height(chip[0], text_width)
+            chip_rect = QRect(area.left(), top, area.width(), name_height + detail_height + 2 * CHIP_PADDING)
+            fill, border = chip_colors(chip[0])
+            painter.setPen(border)
+            painter.setBrush(fill)
+            painter.drawRoundedRect(chip_rect, CHIP_RADIUS, CHIP_RADIUS)
+
+            text_rect = chip_rect.adjusted(CHIP_PADDING, CHIP_PADDING, -CHIP_PADDING, -CHIP_PADDING)
+            painter.setPen(TEXT_COLOR)
+            painter.setFont(self._bold)
+            painter.drawText(QRect(text_rect.left(), text_rect.top(), text_rect.width(), name_height),
+                             Qt.TextFlag.TextWordWrap | Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+                             chip[0])
+            painter.setPen(DETAIL_COLOR)
+            painter.setFont(self._font)
+            detail = self.detail_text(chip, text_rect.width())
+            painter.drawText(QRect(text_rect.left(), text_rect.top() + name_height, text_rect.width(), detail_height),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, detail)
+            top = chip_rect.bottom() + 1 + CHIP_SPACING
+        painter.restore()
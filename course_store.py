@@ -0,0 +1,181 @@
+"""
+===========================
+@Time : 2026/10/18 下午2:00
+@Author : Entropy.Xu
+@File : course_store.py
+@Software: PyCharm
+============================
+"""
+# course_store.py
+# 课程集合：按插入顺序保存课程，并维护 (星期, 节次) 和节次两个索引，
+# 使按单元格、按节次的查找和删除只与涉及的课程数有关，而与课程总数无关。
+# 每次增删都会记录受影响的单元格，界面据此只刷新变化的部分。
+# 监听者（如冲突检测）通过 course_added / course_removed / courses_reset 增量同步。
+
+
+class CourseStore:
+    """课程集合，维护按 (星期, 节次) 和按节次的索引"""
+
+    def __init__(self, courses=None):
+        self._courses = {}   # id(course) -> course，保持插入顺序
+        self._by_slot = {}   # (day, period) -> [course, ...]
+        self._by_period = {}  # period -> {id(course): course}
+        self._dirty = set()  # 自上次 take_dirty 以来发生变化的 (day, period)
+        self._listeners = []
+        if courses:
+            self.extend(courses)
+
+    def __iter__(self):
+        return iter(list(self._courses.values()))
+
+    def __len__(self):
+        return len(self._courses)
+
+    def __bool__(self):
+        return bool(self._courses)
+
+    def add_listener(self, listener):
+        """添加监听者，需实现 course_added(course)、course_removed(course) 和 courses_reset(courses)
+
+        course_removed 在课程从索引中移除之前调用，监听者可以用 position() 取得它在单元格中的位置。
+        """
+        self._listeners.append(listener)
+
+    def add(self, course, index=None):
+        """添加一门课程，放在单元格中第 index 个位置（默认放在最后）"""
+        key = id(course)
+        if key in self._courses:
+            return
+        self._courses[key] = course
+        self._index(course, index)
+        for listener in self._listeners:
+            listener.course_added(course)
+
+    def _index(self, course, index=None):
+        slot = (course.day, course.period)
+        slot_courses = self._by_slot.setdefault(slot, [])
+        if index is None:
+            slot_courses.append(course)
+        else:
+            slot_courses.insert(index, course)
+        self._dirty.add(slot)
+        self._by_period.setdefault(course.period, {})[id(course)] = course
+
+    def _unindex(self, course):
+        slot = (course.day, course.period)
+        slot_courses = self._by_slot[slot]
+        slot_courses.remove(course)
+        if not slot_courses:
+            del self._by_slot[slot]
+        self._dirty.add(slot)
+        period_courses = self._by_period[course.period]
+        del period_courses[id(course)]
+        if not period_courses:
+            del self._by_period[course.period]
+
+    def extend(self, courses):
+        """批量添加课程"""
+        for course in courses:
+            self.add(course)
+
+    def remove(self, course):
+        """删除一门课程（按对象身份）"""
+        if id(course) not in self._courses:
+            return
+        for listener in self._listeners:
+            listener.course_removed(course)
+        del self._courses[id(course)]
+        self._unindex(course)
+
+    def update(self, course, index=None, **changes):
+        """修改课程的字段，保持在集合中的顺序，并同步索引和监听者；原单元格和新单元格（移动时）都标记为需要刷新
+
+        课程移动到其他单元格时放在第 index 个位置（默认放在最后）。
+        """
+        if id(course) not in self._courses:
+            for field, value in changes.items():
+                setattr(course, field, value)
+            return
+        for listener in self._listeners:
+            listener.course_removed(course)
+        moved = 'day' in changes or 'period' in changes
+        if moved:
+            self._unindex(course)
+        for field, value in changes.items():
+            setattr(course, field, value)
+        if moved:
+            self._index(course, index)
+        else:
+            # 名称、地点、周数等变化同样改变单元格的显示内容
+            self._dirty.add((course.day, course.period))
+        for listener in self._listeners:
+            listener.course_added(course)
+
+    def clear(self):
+        """清空所有课程"""
+        self.reset(())
+
+    def reset(self, courses):
+        """用新的课程列表替换全部课程，监听者只收到一次 courses_reset 通知"""
+        self._dirty.update(self._by_slot)
+        self._courses.clear()
+        self._by_slot.clear()
+        self._by_period.clear()
+        for course in courses:
+            if id(course) not in self._courses:
+                self._courses[id(course)] = course
+                self._index(course)
+        for listener in self._listeners:
+            listener.courses_reset(self.to_list())
+
+    def at(self, day, period):
+        """返回指定星期和节次的课程列表"""
+        return list(self._by_slot.get((day, period), ()))
+
+    def in_period(self, period):
+        """返回指定节次的所有课程"""
+        return list(self._by_period.get(period, {}).values())
+
+    def find(self, day, period, name):
+        """查找指定单元格中同名的课程，不存在时返回 None"""
+        for course in self._by_slot.get((day, period), ()):
+            if course.name == name:
+                return course
+        return None
+
+    def contains(self, day, period, name):
+        """检查指定单元格中是否已有同名课程"""
+        return self.find(day, period, name) is not None
+
+    def remove_at(self, day, period, names=None):
+        """删除指定单元格中的课程，names 不为空时只删除这些名称的课程，返回被删除的课程"""
+        removed = [
+            course for course in self._by_slot.get((day, period), ())
+            if names is None or course.name in names
+        ]
+        for course in removed:
+            self.remove(course)
+        return removed
+
+    def position(self, course):
+        """课程在所在单元格的课程列表中的位置，不在集合中时返回 None"""
+        if id(course) not in self._courses:
+            return None
+        return self._by_slot[(course.day, course.period)].index(course)
+
+    def slots(self):
+        """返回所有有课程的 (星期, 节次)"""
+        return list(self._by_slot)
+
+    def mark_dirty(self, day, period):
+        """手动标记单元格需要刷新"""
+        self._dirty.add((day, period))
+
+    def take_dirty(self):
+        """取出并清空自上次调用以来发生变化的单元格集合"""
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def to_list(self):
+        """按插入顺序返回课程列表（用于保存）"""
+        return list(self._courses.values())
@@ -0,0 +1,245 @@
+"""
+===========================
+@Time : 2026/10/20 下午8:00
+@Author : Entropy.Xu
+@File : csv_import.py
+@Software: PyCharm
+============================
+"""
+# csv_import.py
+# 流式导入教务系统导出的 CSV 课表（班级, 课程, 地点, 星期, 节次, 周数）。
+# 逐行读取、分批产出课程，内存占用与文件大小无关；格式错误的行记入错误报告而不是静默丢弃。
+# 可以直接导入课程集合（界面），也可以导入 SQLite 课表库后用 batch_generate.py --db 批量导出：
+#   python csv_import.py registrar.csv --db schedules.db --semester 2024秋 --errors errors.csv
+import argparse
+import csv
+import sys
+import time
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+
+from course import Course
+from period_table import PeriodTable
+from utils import parse_weeks_input
+
+FIELDS = ('class', 'name', 'location', 'weekday', 'period', 'weeks')
+# 表头中可识别的列名，没有可识别的表头时按 FIELDS 的顺序读取各列
+COLUMN_ALIASES = {
+    'class': ('class', 'class_name', '班级', '班级名称'),
+    'name': ('course', 'name', '课程', '课程名称'),
+    'location': ('location', 'room', '地点', '教室', '上课地点'),
+    'weekday': ('weekday', 'day', '星期', '上课星期'),
+    'period': ('period', '节次', '上课节次'),
+    'weeks': ('weeks', '周数', '上课周次'),
+}
+WEEKDAY_NAMES = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7}
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_ERRORS = 1000
+
+
+class ImportReport:
+    """导入结果：成功的行数和格式错误的行
+
+    只保留前 max_errors 条错误用于显示；给出 error_file 时所有错误同时以 CSV 写入该文件。
+    """
+
+    def __init__(self, max_errors=DEFAULT_MAX_ERRORS, error_file=None):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.courses = 0
+        self.error_count = 0
+        self.errors = []  # [(行号, 原因, 原始行), ...]
+        self._error_writer = csv.writer(error_file) if error_file is not None else None
+        if self._error_writer is not None:
+            self._error_writer.writerow(('line', 'reason', 'row'))
+
+    def add_error(self, line, reason, row):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, reason, row))
+        if self._error_writer is not None:
+            self._error_writer.writerow((line, reason, ','.join(row)))
+
+    def summary(self):
+        return f"读取 {self.rows} 行，导入 {self.courses} 门课程，{self.error_count} 行格式错误"
+
+
+@lru_cache(maxsize=4096)
+def parse_weeks_cached(weeks_str):
+    """解析周数字符串为位掩码；教务数据中周数字符串高度重复，结果按字符串缓存"""
+    return parse_weeks_input(weeks_str, as_mask=True)
+
+
+def parse_weekday(text):
+    """解析星期（1-7、"一"至"日"，可带"周"/"星期"前缀），返回从 0 开始的列号"""
+    text = text.strip()
+    for prefix in ('星期', '周'):
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    day = WEEKDAY_NAMES.get(text)
+    if day is None:
+        day = int(text)
+    if not 1 <= day <= 7:
+        raise ValueError(f"星期超出范围：{text}")
+    return day - 1
+
+
+def parse_periods(text, period_count):
+    """解析节次（"3"、"3-4"，可带"第"/"节"），返回从 0 开始的节次行号列表"""
+    text = text.strip().removeprefix('第').removesuffix('节')
+    if '-' in text:
+        first, last = (int(part) for part in text.split('-'))
+    else:
+        first = last = int(text)
+    if not 1 <= first <= last <= period_count:
+        raise ValueError(f"节次超出范围：{text}")
+    return list(range(first - 1, last))
+
+
+def detect_columns(first_row):
+    """根据第一行判断列的位置，返回 ({字段: 列号}, 第一行是否为表头)"""
+    normalized = [cell.strip().lower() for cell in first_row]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for index, cell in enumerate(normalized):
+            if cell in aliases:
+                columns[field] = index
+                break
+    if columns:
+        missing = [field for field in FIELDS if field not in columns and field != 'location']
+        if missing:
+            raise ValueError(f"CSV 表头缺少列：{', '.join(missing)}")
+        return columns, True
+    return {field: index for index, field in enumerate(FIELDS)}, False
+
+
+def iter_csv_rows(f, report):
+    """逐行读取 CSV，产出 (行号, {字段: 值}, 原始行)，列数不足的行字段为 None"""
+    reader = csv.reader(f)
+    first_row = next(reader, None)
+    if first_row is None:
+        return
+    columns, has_header = detect_columns(first_row)
+    width = max(columns.values()) + 1
+    rows = reader if has_header else _chain_first(first_row, reader)
+    for row in rows:
+        line = reader.line_num
+        if not any(cell.strip() for cell in row):
+            continue
+        report.rows += 1
+        if len(row) < width:
+            yield line, None, row
+            continue
+        yield line, {field: row[index].strip() for field, index in columns.items()}, row
+
+
+def _chain_first(first_row, reader):
+    yield first_row
+    yield from reader
+
+
+def iter_course_batches(f, periods=None, report=None, class_name=None, batch_size=DEFAULT_BATCH_SIZE):
+    """分批产出 [(班级, 课程), ...]，每批最多 batch_size 行
+
+    class_name 不为 None 时只导入该班级的行。上课时间取自节次时间表 periods，
+    跨多节的行（如 "3-4"）为每一节生成一门课程，与界面中逐格添加的结果一致。
+    """
+    periods = periods or PeriodTable.default()
+    report = report if report is not None else ImportReport()
+    rows = iter_csv_rows(f, report)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        batch = []
+        for line, fields, row in chunk:
+            if fields is None:
+                report.add_error(line, "列数不足", row)
+                continue
+            if class_name is not None and fields['class'] != class_name:
+                continue
+            try:
+                if not fields['name']:
+                    raise ValueError("课程名称为空")
+                day = parse_weekday(fields['weekday'])
+                period_rows = parse_periods(fields['period'], len(periods))
+                weeks_mask = parse_weeks_cached(fields['weeks'])
+                if not weeks_mask:
+                    raise ValueError(f"周数无效：{fields['weeks']}")
+            except ValueError as e:
+                report.add_error(line, str(e), row)
+                continue
+            location = fields.get('location', '')
+            for period in period_rows:
+                start_time, end_time = periods.times(period)
+                batch.append((fields['class'], Course(day, period, fields['name'], location, weeks_mask,
+                                                      start_time, end_time)))
+        report.courses += len(batch)
+        if batch:
+            yield batch
+
+
+def scan_class_names(f):
+    """读取一遍文件，返回其中出现的所有班级名（按名称排序）"""
+    names = set()
+    for _, fields, _ in iter_csv_rows(f, ImportReport(max_errors=0)):
+        if fields is not None:
+            names.add(fields['class'])
+    return sorted(names)
+
+
+def import_into_store(f, store, periods=None, class_name=None, report=None):
+    """将 CSV 中的课程（可只取一个班级）逐批加入课程集合，返回导入报告"""
+    report = report if report is not None else ImportReport()
+    for batch in iter_course_batches(f, periods, report, class_name):
+        store.extend(course for _, course in batch)
+    return report
+
+
+def import_into_database(f, db, semester, semester_start=None, periods=None, report=None):
+    """将 CSV 中所有班级的课程逐批写入 schedule_db.ScheduleDatabase，返回导入报告"""
+    report = report if report is not None else ImportReport()
+    db.import_class_courses(
+        (item for batch in iter_course_batches(f, periods, report) for item in batch),
+        semester, semester_start,
+    )
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="流式导入教务系统导出的 CSV 课表到 SQLite 课表库")
+    parser.add_argument('input', help="CSV 文件，列为 班级, 课程, 地点, 星期, 节次, 周数")
+    parser.add_argument('--db', required=True, help="课表库文件（不存在时自动创建）")
+    parser.add_argument('--semester', required=True, help="学期名称，例如 2024秋")
+    parser.add_argument('-s', '--start', type=date.fromisoformat, help="学期第一周的第一天，格式 YYYY-MM-DD")
+    parser.add_argument('--encoding', default='utf-8-sig', help="CSV 文件编码（默认 utf-8-sig，教务导出常见 gbk）")
+    parser.add_argument('--errors', help="将所有格式错误的行写入该 CSV 文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from schedule_db import ScheduleDatabase
+
+    args = parse_args(argv)
+    error_file = open(args.errors, 'w', encoding='utf-8-sig', newline='') if args.errors else None
+    try:
+        report = ImportReport(max_errors=20, error_file=error_file)
+        started = time.perf_counter()
+        with open(args.input, 'r', encoding=args.encoding, newline='') as f, ScheduleDatabase(args.db) as db:
+            import_into_database(f, db, args.semester, args.start, report=report)
+        elapsed = time.perf_counter() - started
+    finally:
+        if error_file is not None:
+            error_file.close()
+
+    for line, reason, row in report.errors:
+        print(f"第 {line} 行：{reason}：{','.join(row)}", file=sys.stderr)
+    if report.error_count > len(report.errors):
+        print(f"……另有 {report.error_count - len(report.errors)} 行错误", file=sys.stderr)
+    print(f"{report.summary()}，耗时 {elapsed:.2f} 秒")
+    return 1 if report.error_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
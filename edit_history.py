@@ -0,0 +1,178 @@
+"""
+===========================
+@Time : 2026/10/23 下午3:00
+@Author : Entropy.Xu
+@File : edit_history.py
+@Software: PyCharm
+============================
+"""
+# edit_history.py
+# 撤销/重做：作为 CourseStore 的监听者，把一次编辑（添加、粘贴、删除、修改节次时间）中
+# 课程集合的变化记录为增量：添加和删除只保存课程对象的引用，修改只保存变化字段的新旧值。
+# 历史占用的内存与编辑的规模成正比，而与课表大小、历史长度的乘积无关；撤销、重做
+# 通过 CourseStore 重放这些增量，界面照常只刷新变化的单元格。删除和移动时记下课程在单元格中的位置，
+# 撤销时放回原位，单元格中课程的先后顺序保持不变。
+# 在 command() 之外发生的变化（加载文件、导入等整体替换）无法还原，会清空历史。
+from contextlib import contextmanager
+
+from course import Course
+
+ADDED = 'add'
+REMOVED = 'remove'
+UPDATED = 'update'
+CALL = 'call'
+
+DEFAULT_LIMIT = 100
+
+
+def course_state(course):
+    """课程当前各字段的值"""
+    return tuple(getattr(course, field) for field in Course.__slots__)
+
+
+class EditCommand:
+    """一次可撤销的编辑，steps 按发生顺序保存增量"""
+
+    __slots__ = ('label', 'steps')
+
+    def __init__(self, label):
+        self.label = label
+        self.steps = []
+
+    def __repr__(self):
+        return f"EditCommand({self.label!r}, steps={len(self.steps)})"
+
+    def __len__(self):
+        return len(self.steps)
+
+
+class EditHistory:
+    """课程集合的撤销/重做栈，最多保留 limit 条编辑"""
+
+    def __init__(self, store, limit=DEFAULT_LIMIT):
+        self.store = store
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+        self._current = None  # 正在记录的 EditCommand
+        self._replaying = False
+        self._removed_state = None  # (course, 删除时的字段, 单元格中的位置)，用于把 update 的删除 + 添加合并为一次修改
+        store.add_listener(self)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    @contextmanager
+    def command(self, label):
+        """记录一次编辑：期间课程集合的所有变化在撤销时一起还原；嵌套调用并入外层的编辑"""
+        if self._current is not None:
+            yield self._current
+            return
+        command = self._current = EditCommand(label)
+        try:
+            yield command
+        finally:
+            self._current = None
+            self._removed_state = None
+            if command.steps:
+                self._undo.append(command)
+                del self._undo[:-self.limit]
+                self._redo.clear()
+
+    def record_call(self, undo, redo):
+        """在当前编辑中记录课程集合以外的变化（如节次时间表），撤销、重做时分别调用 undo() 和 redo()"""
+        if self._current is not None and not self._replaying:
+            self._current.steps.append((CALL, undo, redo))
+
+    # CourseStore 监听接口
+
+    def course_added(self, course):
+        if self._replaying:
+            return
+        if self._current is None:
+            self.clear()
+            return
+        steps = self._current.steps
+        removed = self._removed_state
+        self._removed_state = None
+        if removed is not None and removed[0] is course and steps and steps[-1][1] is course:
+            # CourseStore.update 先通知删除再通知添加：合并为只保存变化字段的修改
+            steps.pop()
+            before, after = {}, {}
+            for field, old, new in zip(Course.__slots__, removed[1], course_state(course)):
+                if old != new:
+                    before[field] = old
+                    after[field] = new
+            if before:
+                steps.append((UPDATED, course, before, after, removed[2]))
+            return
+        steps.append((ADDED, course))
+
+    def course_removed(self, course):
+        if self._replaying:
+            return
+        if self._current is None:
+            self.clear()
+            return
+        # CourseStore 在移除课程之前通知，此时还能取得它在单元格中的位置
+        position = self.store.position(course)
+        self._current.steps.append((REMOVED, course, position))
+        self._removed_state = (course, course_state(course), position)
+
+    def courses_reset(self, courses):
+        if not self._replaying:
+            self.clear()
+
+    # 撤销、重做
+
+    def undo(self):
+        """撤销最近一次编辑，返回其名称；没有可撤销的编辑时返回 None"""
+        if self._current is not None or not self._undo:
+            return None
+        command = self._undo.pop()
+        self._replay(reversed(command.steps), undo=True)
+        self._redo.append(command)
+        return command.label
+
+    def redo(self):
+        """重做最近撤销的编辑，返回其名称；没有可重做的编辑时返回 None"""
+        if self._current is not None or not self._redo:
+            return None
+        command = self._redo.pop()
+        self._replay(command.steps, undo=False)
+        self._undo.append(command)
+        return command.label
+
+    def _replay(self, steps, undo):
+        store = self.store
+        self._replaying = True
+        try:
+            for step in steps:
+                kind, target = step[0], step[1]
+                if kind == ADDED and undo or kind == REMOVED and not undo:
+                    store.remove(target)
+                elif kind == REMOVED:
+                    store.add(target, step[2])
+                elif kind == ADDED:
+                    store.add(target)
+                elif undo and kind == UPDATED:
+                    store.update(target, step[4], **step[2])
+                elif kind == UPDATED:
+                    store.update(target, **step[3])
+                else:
+                    (step[1] if undo else step[2])()
+        finally:
+            self._replaying = False
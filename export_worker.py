@@ -0,0 +1,78 @@
+"""
+===========================
+@Time : 2026/10/20 上午10:00
+@Author : Entropy.Xu
+@File : export_worker.py
+@Software: PyCharm
+============================
+"""
+# export_worker.py
+# 在线程池中后台导出 ICS 文件，通过信号报告进度，支持取消。
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ics_feed import export_calendar
+from instrumentation import operation
+
+
+class ExportCancelled(Exception):
+    """导出被用户取消"""
+
+
+class ExportSignals(QObject):
+    """导出任务的信号，在主线程中创建，跨线程发出时自动排队到主线程"""
+    progress = Signal(int, int)    # 已处理课程数, 课程总数
+    invalid_course = Signal(str)   # 时间格式错误的课程名称
+    finished = Signal(str, object)  # 文件路径, ics_feed.FeedResult
+    failed = Signal(str)           # 错误信息
+    cancelled = Signal()
+
+
+class IcsExportTask(QRunnable):
+    """后台导出任务，基于创建时的课程快照运行，不会受到之后编辑的影响"""
+
+    def __init__(self, courses, semester_start, file_path, mode, cache=None, update_path=None, holidays=None):
+        super().__init__()
+        self.setAutoDelete(False)  # 由 Python 端持有和释放
+        self.courses = [course.copy() for course in courses]
+        self.semester_start = semester_start
+        self.file_path = file_path
+        self.mode = mode
+        self.cache = cache
+        self.update_path = update_path
+        self.holidays = holidays
+        self.signals = ExportSignals()
+        self._cancel_event = threading.Event()
+        self._last_percent = -1
+
+    def cancel(self):
+        """请求取消导出，已写入的临时文件会被删除"""
+        self._cancel_event.set()
+
+    def _on_progress(self, done, total):
+        if self._cancel_event.is_set():
+            raise ExportCancelled()
+        # 每前进 1% 才发出一次信号，避免课程很多时信号堆积
+        percent = done * 100 // total
+        if percent != self._last_percent or done == total:
+            self._last_percent = percent
+            self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            with operation('generate_ics'):
+                result = export_calendar(
+                    self.courses, self.semester_start, self.file_path, self.mode,
+                    update_path=self.update_path,
+                    on_invalid_course=lambda course: self.signals.invalid_course.emit(course.name),
+                    cache=self.cache,
+                    on_progress=self._on_progress,
+                    holidays=self.holidays,
+                )
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(self.file_path, result)
@@ -0,0 +1,111 @@
+"""
+===========================
+@Time : 2026/10/23 上午9:30
+@Author : Entropy.Xu
+@File : holiday_calendar.py
+@Software: PyCharm
+============================
+"""
+# holiday_calendar.py
+# 节假日与调休表：导出时跳过放假日期的课程，并把调休上课日按指定日期的课表补上。
+# 文件为 JSON，例如：
+#   {
+#     "skip": ["2024-09-16..2024-09-17", "2024-10-01..2024-10-07"],
+#     "makeup": {"2024-09-14": "2024-09-16", "2024-09-29": "2024-10-04", "2024-10-12": "2024-10-07"}
+#   }
+# skip 为放假日期（可写 起..止 表示区间），makeup 为 {调休上课日: 按哪一天的课表上课}。
+# 加载后预先建立日期集合和反向映射，并按学期开始日期换算成每个星期几的周数位掩码，
+# 展开事件时每门课程只需一次位运算，只有落在节假日的周才需要逐个处理。
+import hashlib
+import json
+from datetime import date, timedelta
+
+
+def parse_date_range(text):
+    """解析 "YYYY-MM-DD" 或 "YYYY-MM-DD..YYYY-MM-DD"，返回日期列表"""
+    start_text, sep, end_text = text.partition('..')
+    try:
+        start = date.fromisoformat(start_text.strip())
+        end = date.fromisoformat(end_text.strip()) if sep else start
+    except ValueError:
+        raise ValueError(f"日期格式错误：{text!r}，应为 YYYY-MM-DD 或 YYYY-MM-DD..YYYY-MM-DD") from None
+    if end < start:
+        raise ValueError(f"日期区间结束早于开始：{text!r}")
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class HolidayCalendar:
+    """放假日期集合和调休映射"""
+
+    def __init__(self, skip=(), makeup=None):
+        self.skip = frozenset(skip)
+        self.makeup = dict(makeup or {})  # 调休上课日 -> 按其课表上课的原日期
+        self.moved = {}                   # 原日期 -> (调休上课日, ...)
+        for target, source in sorted(self.makeup.items()):
+            self.moved[source] = self.moved.get(source, ()) + (target,)
+        # 需要特殊处理的日期
+        self.affected = self.skip | self.moved.keys()
+        self._week_masks = {}  # 学期开始日期 -> week_masks() 的结果
+        # 内容标识，用于事件缓存的键
+        content = ','.join(sorted(d.isoformat() for d in self.skip)) + ';' + ','.join(
+            f"{target.isoformat()}>{source.isoformat()}" for target, source in sorted(self.makeup.items()))
+        self.key = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+    def __bool__(self):
+        return bool(self.affected)
+
+    def __repr__(self):
+        return f"HolidayCalendar(skip={len(self.skip)}, makeup={len(self.makeup)})"
+
+    def is_skipped(self, day):
+        """该日期是否放假"""
+        return day in self.skip
+
+    def moved_to(self, day):
+        """按该日期课表上课的调休日，没有时返回空元组"""
+        return self.moved.get(day, ())
+
+    def week_masks(self, semester_start):
+        """以 semester_start 为第 1 周第一天，把放假日期和被调休的日期换算成周数位掩码
+
+        返回 {星期（0 为周一）: (放假周的掩码, 被调休周的掩码)}，同一学期开始日期只计算一次。
+        """
+        masks = self._week_masks.get(semester_start)
+        if masks is None:
+            masks = {}
+            for day in self.affected:
+                offset = (day - semester_start).days
+                if offset < 0:
+                    continue
+                week, weekday = offset // 7 + 1, offset % 7
+                skip_mask, moved_mask = masks.get(weekday, (0, 0))
+                if day in self.skip:
+                    skip_mask |= 1 << week
+                if day in self.moved:
+                    moved_mask |= 1 << week
+                masks[weekday] = (skip_mask, moved_mask)
+            self._week_masks[semester_start] = masks
+        return masks
+
+    @classmethod
+    def from_dict(cls, data):
+        skip = [day for text in data.get('skip', ()) for day in parse_date_range(text)]
+        makeup = {}
+        for target_text, source_text in data.get('makeup', {}).items():
+            try:
+                makeup[date.fromisoformat(target_text)] = date.fromisoformat(source_text)
+            except ValueError:
+                raise ValueError(f"调休日期格式错误：{target_text!r}: {source_text!r}") from None
+        return cls(skip, makeup)
+
+    def to_dict(self):
+        return {
+            'skip': sorted(day.isoformat() for day in self.skip),
+            'makeup': {target.isoformat(): source.isoformat() for target, source in sorted(self.makeup.items())},
+        }
+
+
+def load_holidays(path):
+    """从 JSON 文件读取节假日与调休表"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return HolidayCalendar.from_dict(json.load(f))
@@ -0,0 +1,76 @@
+"""
+===========================
+@Time : 2026/10/19 下午2:30
+@Author : Entropy.Xu
+@File : ics_cache.py
+@Software: PyCharm
+============================
+"""
+# ics_cache.py
+# 按课程内容缓存序列化后的 VEVENT 字节串，重复导出时只重新序列化新增或修改过的课程。
+# 同时缓存事件描述，版本（SEQUENCE, DTSTAMP）变化时只需重新序列化，不必重新生成事件。
+from collections import OrderedDict
+
+from ics_generator import MODE_EXPANDED, fixed_versions, utc_now
+from ics_writer import course_event_specs, serialize_specs
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def course_cache_key(course, semester_start, mode, holidays=None):
+    """课程的内容键：影响导出结果（含 UID）的所有字段"""
+    return (
+        course.name, course.location, course.weeks_mask, course.day, course.period,
+        course.start_time, course.end_time, semester_start, mode, holidays.key if holidays else None,
+    )
+
+
+class EventCache:
+    """有容量上限的 LRU 缓存，值为 [事件描述列表, 各事件版本, (字节串, 事件数)]"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def serialize(self, course, semester_start, mode=MODE_EXPANDED, uid_base=None, versions=None, holidays=None):
+        """返回课程序列化后的 (字节串, 事件数)，时间不合法时返回 None
+
+        uid_base 和 versions 的含义见 ics_writer.serialize_course。每次都会以缓存的事件描述调用
+        versions，所有事件的版本与上次相同时直接返回缓存的字节串。
+        """
+        key = (course_cache_key(course, semester_start, mode, holidays), uid_base)
+        entry = self._entries.get(key)
+        if entry is None:
+            specs = course_event_specs(course, semester_start, mode, uid_base, holidays)
+            if specs is None:
+                self.misses += 1
+                return None
+            entry = self._entries[key] = [specs, None, None]
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+
+        specs = entry[0]
+        versions = versions or fixed_versions(utc_now())
+        stamps = [versions(spec) for spec in specs]
+        if stamps == entry[1]:
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        for spec, (sequence, dtstamp) in zip(specs, stamps):
+            spec['sequence'], spec['dtstamp'] = sequence, dtstamp
+        entry[1] = stamps
+        entry[2] = serialize_specs(specs)
+        return entry[2]
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self.hits = self.misses = 0
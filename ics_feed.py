@@ -0,0 +1,210 @@
+"""
+===========================
+@Time : 2026/10/22 上午10:00
+@Author : Entropy.Xu
+@File : ics_feed.py
+@Software: PyCharm
+============================
+"""
+# ics_feed.py
+# 增量日历更新：每次导出在 ICS 旁边保存一份清单（<文件名>.manifest.json），记录每个 UID 的内容摘要、
+# SEQUENCE 和 DTSTAMP。再次导出时与上次的清单比较：内容未变的事件保持原来的版本，修改过的事件
+# SEQUENCE 加一，消失的事件以 STATUS:CANCELLED 发出；还可以另写一个只含这些变化的 "更新" 文件，
+# 调课之后日历客户端只需导入少数几个事件，而不是整个学期。
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from ics_generator import MODE_EXPANDED, utc_now
+from ics_writer import IcsStreamWriter, format_datetime, write_ics_stream
+from utils import atomic_open
+
+MANIFEST_VERSION = 1
+STATUS_CONFIRMED = 'CONFIRMED'
+STATUS_CANCELLED = 'CANCELLED'
+
+# 参与内容摘要的字段；UID、SEQUENCE、DTSTAMP 本身不计入
+DIGEST_FIELDS = ('summary', 'dtstart', 'dtend', 'location', 'description', 'alarm_description', 'rrule_count', 'exdate')
+
+
+def manifest_path_for(ics_path):
+    """ICS 文件对应的清单路径"""
+    return os.path.splitext(ics_path)[0] + '.manifest.json'
+
+
+def update_path_for(ics_path):
+    """ICS 文件对应的增量更新文件路径"""
+    return os.path.splitext(ics_path)[0] + '.update.ics'
+
+
+def spec_digest(spec):
+    """事件内容的摘要，内容不变时摘要不变；结果记在 spec['digest'] 中，缓存的事件描述不必重复计算"""
+    digest = spec.get('digest')
+    if digest is not None:
+        return digest
+    parts = []
+    for field in DIGEST_FIELDS:
+        value = spec.get(field)
+        if isinstance(value, list):
+            value = ','.join(format_datetime(dt) for dt in value)
+        elif isinstance(value, datetime):
+            value = format_datetime(value)
+        parts.append('' if value is None else str(value))
+    digest = spec['digest'] = hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()[:16]
+    return digest
+
+
+def parse_stamp(text):
+    """解析清单中的时间文本：带 Z 后缀的为 UTC 时间，否则为本地（浮动）时间"""
+    if text.endswith('Z'):
+        return datetime.strptime(text, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+    return datetime.strptime(text, '%Y%m%dT%H%M%S')
+
+
+def load_manifest(path):
+    """读取清单，返回 {uid: [摘要, sequence, dtstamp, 状态, 摘要文字, dtstart, dtend]}；文件不存在时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get('version') != MANIFEST_VERSION:
+        return {}
+    return data.get('events', {})
+
+
+def save_manifest(path, events, mode, semester_start, generated_at):
+    """原子地写入清单，events 中的 datetime 在这里才格式化为文本"""
+    data = {
+        'version': MANIFEST_VERSION,
+        'mode': mode,
+        'semester_start': semester_start.isoformat(),
+        'generated_at': format_datetime(generated_at),
+        'events': events,
+    }
+    with atomic_open(path, 'w', encoding='utf-8') as f:
+        # json.dumps 一次性编码可以使用 C 实现，比 json.dump 逐段写入快得多
+        f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=format_datetime))
+
+
+class ManifestVersions:
+    """与上次清单比较、为每个事件决定 (SEQUENCE, DTSTAMP) 的版本函数，可直接传给 write_ics_stream
+
+    keep_changed 为真时把新增或修改的事件描述保存在 changed 中，用于写更新文件；否则只计数，
+    内存占用与事件数无关，不影响流式写出。
+    """
+
+    def __init__(self, previous, now=None, keep_changed=False):
+        self.previous = previous
+        self.now = now or utc_now()
+        self.now_text = format_datetime(self.now)
+        self.entries = {}   # 本次导出后的清单，dtstart/dtend 保存时再格式化
+        self.changed = [] if keep_changed else None  # 新增或修改的事件描述
+        self._stamps = {}   # DTSTAMP 文本 -> datetime，清单中的时间戳大多相同
+        self.added = 0
+        self.updated = 0    # 修改过（非新增）的事件数
+        self.unchanged = 0
+        self._cancelled = None
+
+    def __call__(self, spec):
+        uid = spec['uid']
+        digest = spec_digest(spec)
+        old = self.previous.get(uid)
+        if old is not None and old[3] != STATUS_CANCELLED and old[0] == digest:
+            sequence, stamp_text = old[1], old[2]
+            dtstamp = self._stamps.get(stamp_text)
+            if dtstamp is None:
+                dtstamp = self._stamps[stamp_text] = parse_stamp(stamp_text)
+            self.unchanged += 1
+        else:
+            if old is None:
+                sequence = 0
+                self.added += 1
+            else:
+                sequence = old[1] + 1
+                self.updated += 1
+            dtstamp, stamp_text = self.now, self.now_text
+            if self.changed is not None:
+                self.changed.append(spec)
+        self.entries[uid] = [digest, sequence, stamp_text, STATUS_CONFIRMED, spec['summary'],
+                             spec['dtstart'], spec['dtend']]
+        return sequence, dtstamp
+
+    def cancelled(self):
+        """上次导出中有、这次没有的事件，返回取消事件的描述列表（只在首次调用时计算）
+
+        已经取消过的事件不会重复发出，但仍保留在清单中，以免再次出现时 SEQUENCE 倒退。
+        """
+        if self._cancelled is not None:
+            return self._cancelled
+        self._cancelled = []
+        for uid, old in self.previous.items():
+            if uid in self.entries:
+                continue
+            if old[3] == STATUS_CANCELLED:
+                self.entries[uid] = old
+                continue
+            digest, sequence, _, _, summary, dtstart, dtend = old
+            self._cancelled.append({
+                'summary': summary,
+                'dtstart': parse_stamp(dtstart),
+                'dtend': parse_stamp(dtend),
+                'dtstamp': self.now,
+                'uid': uid,
+                'sequence': sequence + 1,
+                'status': STATUS_CANCELLED,
+            })
+            self.entries[uid] = [digest, sequence + 1, self.now_text, STATUS_CANCELLED, summary, dtstart, dtend]
+        return self._cancelled
+
+
+class FeedResult:
+    """一次导出的结果统计"""
+
+    __slots__ = ('event_count', 'added', 'updated', 'cancelled', 'unchanged', 'update_path')
+
+    def __init__(self, event_count, added, updated, cancelled, unchanged, update_path=None):
+        self.event_count = event_count
+        self.added = added
+        self.updated = updated
+        self.cancelled = cancelled
+        self.unchanged = unchanged
+        self.update_path = update_path
+
+    def __repr__(self):
+        return (f"FeedResult(events={self.event_count}, added={self.added}, updated={self.updated}, "
+                f"cancelled={self.cancelled}, unchanged={self.unchanged})")
+
+    def describe(self):
+        """变化的文字描述"""
+        return f"新增 {self.added}、修改 {self.updated}、取消 {self.cancelled}、未变 {self.unchanged} 个事件"
+
+
+def write_update_file(path, versions):
+    """写入只含新增、修改和取消事件的更新文件，返回事件数；versions 需以 keep_changed=True 创建"""
+    with atomic_open(path, 'wb') as f:
+        writer = IcsStreamWriter(f)
+        writer.write_header()
+        writer.write_events(versions.changed)
+        writer.write_events(versions.cancelled())
+        writer.write_footer()
+    return writer.event_count
+
+
+def export_calendar(courses, semester_start, file_path, mode=MODE_EXPANDED, update_path=None, on_invalid_course=None,
+                    cache=None, on_progress=None, now=None, holidays=None):
+    """导出完整的 ICS 文件并与上次导出的清单比较，返回 FeedResult
+
+    完整文件包含所有事件以及本次新取消的事件；update_path 给出时另写一个只含变化的更新文件。
+    两个文件都写完后才更新清单，中途失败或取消时清单保持上次的状态。
+    """
+    manifest_path = manifest_path_for(file_path)
+    versions = ManifestVersions(load_manifest(manifest_path), now, keep_changed=update_path is not None)
+    count = write_ics_stream(courses, semester_start, file_path, mode, on_invalid_course, cache, on_progress,
+                             versions=versions, trailer=versions.cancelled, holidays=holidays)
+    if update_path is not None:
+        write_update_file(update_path, versions)
+    save_manifest(manifest_path, versions.entries, mode, semester_start, versions.now)
+    cancelled = len(versions.cancelled())
+    return FeedResult(count - cancelled, versions.added, versions.updated, cancelled, versions.unchanged, update_path)
@@ -0,0 +1,238 @@
+"""
+===========================
+@Time : 2026/10/18 上午9:30
+@Author : Entropy.Xu
+@File : ics_generator.py
+@Software: PyCharm
+============================
+"""
+# ics_generator.py
+# 与界面无关的 ICS 生成核心，供主窗口和批量命令行共用
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from course import Course
+from utils import format_weeks, mask_to_weeks, week_runs
+
+PRODID = '-//大学课表生成工具//'
+ALARM_MINUTES_BEFORE = 30
+
+# 事件输出模式
+MODE_EXPANDED = 'expanded'  # 每周一个事件，兼容不支持重复规则的客户端
+MODE_RRULE = 'rrule'        # 每门课一个重复事件，空缺周用 EXDATE 排除
+EVENT_MODES = (MODE_RRULE, MODE_EXPANDED)
+
+# 事件 UID 的域名部分；UID 由课程身份和周次决定，重复导出时保持不变，日历客户端据此更新而不是重复添加
+UID_DOMAIN = 'classtable-ics'
+
+
+def load_courses(file_path):
+    """从 courses.json 格式的文件读取课程列表"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [Course.from_dict(data) for data in json.load(f)]
+
+
+def get_course_times(course):
+    """获取课程的开始和结束时间，缺失或不合法时返回 (None, None)"""
+    start_time, end_time = course.start_time, course.end_time
+    if start_time is None or end_time is None or end_time <= start_time:
+        return None, None
+    return start_time, end_time
+
+
+def utc_now():
+    """当前 UTC 时间（精确到秒），用作 DTSTAMP"""
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def course_uid(course, ordinal=0):
+    """由课程身份（名称、星期、节次）生成稳定的 UID 前缀
+
+    同一单元格中的同名课程用 ordinal（出现顺序）区分；地点、时间、周数的修改不改变 UID。
+    """
+    identity = f"{course.name}\x1f{course.day}\x1f{course.period}\x1f{ordinal}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:20]
+
+
+class UidAllocator:
+    """按课程列表顺序分配 UID 前缀，同一身份的课程依次取序号 0, 1, 2, ..."""
+
+    def __init__(self):
+        self._seen = {}
+
+    def allocate(self, course):
+        identity = (course.name, course.day, course.period)
+        ordinal = self._seen.get(identity, 0)
+        self._seen[identity] = ordinal + 1
+        return course_uid(course, ordinal)
+
+
+def fixed_versions(dtstamp):
+    """所有事件使用同一个 DTSTAMP、SEQUENCE 为 0 的版本函数，见 stamp_specs"""
+    return lambda spec: (0, dtstamp)
+
+
+def stamp_specs(specs, versions):
+    """为事件描述填入 SEQUENCE 和 DTSTAMP，versions(spec) 返回 (sequence, dtstamp)"""
+    for spec in specs:
+        spec['sequence'], spec['dtstamp'] = versions(spec)
+    return specs
+
+
+def iter_event_specs(course, start_time, end_time, semester_start, mode=MODE_EXPANDED, uid_base=None, holidays=None):
+    """逐个生成课程事件的描述字典，供 icalendar 和流式写出两条路径共用
+
+    MODE_EXPANDED 为每周生成一个事件，UID 为 <uid_base>-w<周次>@域名；MODE_RRULE 只生成一个带
+    RRULE:FREQ=WEEKLY;COUNT=n 的事件，中间空缺的周用 EXDATE 排除，UID 为 <uid_base>@域名。
+    uid_base 默认为 course_uid(course)。
+
+    holidays 为可选的 holiday_calendar.HolidayCalendar：放假日期的课程在 MODE_EXPANDED 下不生成、
+    在 MODE_RRULE 下加入 EXDATE；按某日课表上课的调休日另外生成单次事件，UID 后附调休日期。
+    """
+    if uid_base is None:
+        uid_base = course_uid(course)
+    day = course.day
+    alarm_description = f"课程 {course.name} 即将开始"
+    duration_minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+
+    def spec(event_date, weeks_text, uid, note=''):
+        return {
+            'uid': uid,
+            'dtstart': datetime.combine(event_date, start_time),
+            'dtend': datetime.combine(event_date, end_time),
+            'summary': course.name,
+            'location': course.location,
+            'description': f"持续时间: {duration_minutes} 分钟\n周数: {weeks_text}{note}",
+            'alarm_description': alarm_description,
+        }
+
+    def moved(event_date, week, uid_prefix):
+        """调休：按 event_date 的课表在其他日期上课"""
+        for target in holidays.moved_to(event_date):
+            yield spec(target, week, f"{uid_prefix}-{target:%Y%m%d}@{UID_DOMAIN}",
+                       f"\n调休：补 {event_date.month}月{event_date.day}日的课")
+
+    # 与节假日重叠的周：放假周和被调休周的位掩码，大多数课程两者都为 0
+    skip_mask = moved_mask = 0
+    if holidays:
+        skip_mask, moved_mask = holidays.week_masks(semester_start).get(day, (0, 0))
+        skip_mask &= course.weeks_mask
+        moved_mask &= course.weeks_mask
+
+    if mode == MODE_RRULE:
+        runs = week_runs(course.weeks_mask)
+        if not runs:
+            return
+        first_week, last_week = runs[0][0], runs[-1][1]
+        event = spec(semester_start + timedelta(weeks=first_week - 1, days=day), format_weeks(course.weeks_mask),
+                     f"{uid_base}@{UID_DOMAIN}")
+        event['rrule_count'] = last_week - first_week + 1
+        # 相邻区间之间的空缺周
+        event['exdate'] = [
+            event['dtstart'] + timedelta(weeks=week - first_week)
+            for (_, prev_end), (next_start, _) in zip(runs, runs[1:])
+            for week in range(prev_end + 1, next_start)
+        ]
+        if skip_mask:
+            event['exdate'].extend(event['dtstart'] + timedelta(weeks=week - first_week)
+                                   for week in mask_to_weeks(skip_mask))
+            event['exdate'].sort()
+        if skip_mask != course.weeks_mask:
+            yield event
+        for week in mask_to_weeks(moved_mask):
+            yield from moved(semester_start + timedelta(weeks=week - 1, days=day), week, uid_base)
+        return
+
+    for week in mask_to_weeks(course.weeks_mask):
+        event_date = semester_start + timedelta(weeks=week - 1, days=day)
+        if not skip_mask >> week & 1:
+            yield spec(event_date, week, f"{uid_base}-w{week}@{UID_DOMAIN}")
+        if moved_mask >> week & 1:
+            yield from moved(event_date, week, f"{uid_base}-w{week}")
+
+
+def iter_course_specs(courses, semester_start, mode=MODE_EXPANDED, on_invalid_course=None, holidays=None):
+    """遍历所有课程的事件描述（含 UID），时间格式错误的课程会被跳过"""
+    uids = UidAllocator()
+    for course in courses:
+        uid_base = uids.allocate(course)
+        start_time, end_time = get_course_times(course)
+        if start_time is None or end_time is None:
+            if on_invalid_course is not None:
+                on_invalid_course(course)
+            continue
+        yield from iter_event_specs(course, start_time, end_time, semester_start, mode, uid_base, holidays)
+
+
+def create_event(spec):
+    """根据事件描述创建 icalendar 事件（含提醒）
+
+    uid、dtstamp、sequence、status 为可选字段；取消的事件（status 为 CANCELLED）只有
+    摘要、时间和版本信息，没有地点、描述和提醒。
+    """
+    from icalendar import Event, Alarm
+
+    event = Event()
+    event.add('dtstart', spec['dtstart'])
+    event.add('dtend', spec['dtend'])
+    event.add('summary', spec['summary'])
+    if 'dtstamp' in spec:
+        event.add('dtstamp', spec['dtstamp'])
+    if 'uid' in spec:
+        event.add('uid', spec['uid'])
+    if 'sequence' in spec:
+        event.add('sequence', spec['sequence'])
+    if 'status' in spec:
+        event.add('status', spec['status'])
+    if 'location' in spec:
+        event.add('location', spec['location'])
+    if 'description' in spec:
+        event.add('description', spec['description'])
+    if 'rrule_count' in spec:
+        event.add('rrule', {'freq': 'weekly', 'count': spec['rrule_count']})
+    if spec.get('exdate'):
+        event.add('exdate', spec['exdate'])
+    if 'alarm_description' not in spec:
+        return event
+
+    alarm = Alarm()
+    alarm.add('action', 'DISPLAY')
+    alarm.add('description', spec['alarm_description'])
+    alarm.add('trigger', timedelta(minutes=-ALARM_MINUTES_BEFORE))
+    event.add_component(alarm)
+    return event
+
+
+def build_calendar(courses, semester_start, on_invalid_course=None, mode=MODE_EXPANDED, dtstamp=None, holidays=None):
+    """根据课程列表构建日历，返回 (日历, 事件数)
+
+    mode 为 MODE_EXPANDED 或 MODE_RRULE，holidays 为可选的节假日与调休表，见 iter_event_specs。
+    on_invalid_course 为可选回调，在课程时间格式错误时以该课程为参数调用。
+    所有事件的 DTSTAMP 为 dtstamp（默认为当前 UTC 时间），SEQUENCE 为 0。
+    """
+    # icalendar 只用于这条参考路径，流式写出不需要它，因此延迟导入
+    from icalendar import Calendar
+
+    cal = Calendar()
+    cal.add('prodid', PRODID)
+    cal.add('version', '2.0')
+
+    versions = fixed_versions(dtstamp or utc_now())
+    total = 0
+    for spec in iter_course_specs(courses, semester_start, mode, on_invalid_course, holidays):
+        spec['sequence'], spec['dtstamp'] = versions(spec)
+        cal.add_component(create_event(spec))
+        total += 1
+    return cal, total
+
+
+def write_ics_file(courses, semester_start, file_path, mode=MODE_EXPANDED, dtstamp=None, holidays=None):
+    """生成 ICS 文件并写入指定路径（基于 icalendar 对象），返回写入的事件数
+
+    大批量导出请使用 ics_writer.write_ics_stream，DTSTAMP 相同时输出与本函数逐字节一致。
+    """
+    cal, total = build_calendar(courses, semester_start, mode=mode, dtstamp=dtstamp, holidays=holidays)
+    with open(file_path, 'wb') as f:
+        f.write(cal.to_ical())
+    return total
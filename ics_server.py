@@ -0,0 +1,434 @@
+"""
+===========================
+@Time : 2026/10/22 下午3:00
+@Author : Entropy.Xu
+@File : ics_server.py
+@Software: PyCharm
+============================
+"""
+# ics_server.py
+# 本地日历订阅服务：用标准库 http.server 把每份课表作为可订阅的 .ics 提供，日历客户端订阅后会定期轮询，
+# 课表修改后不必重新下载、导入文件。每个订阅缓存序列化好的内容及其 gzip 压缩结果，
+# 只有课程数据变化时才重新生成；支持 ETag/If-None-Match 和 Last-Modified/If-Modified-Since，
+# 轮询的客户端大多只会得到 304。
+# 命令行用法，例如：
+#   python ics_server.py courses/*.json --start 2024-09-02                  # 仅本机：http://127.0.0.1:8765/
+#   python ics_server.py --db schedules.db --semester 2024秋 --host 0.0.0.0  # 局域网内提供课表库中的所有课表
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from holiday_calendar import load_holidays
+from ics_cache import EventCache, course_cache_key
+from ics_feed import ManifestVersions
+from ics_generator import EVENT_MODES, MODE_RRULE, load_courses
+from ics_writer import write_ics_to
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 两次检查数据源（文件修改时间、课表库更新时间）之间的最短间隔，秒
+DEFAULT_PROBE_INTERVAL = 2.0
+# 低于该大小的内容不压缩
+GZIP_MIN_SIZE = 1024
+
+
+def accepts_gzip(accept_encoding):
+    """Accept-Encoding 是否接受 gzip：按 q 值判断，gzip;q=0 表示拒绝，未列出 gzip 时看 * 的 q 值"""
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+class FeedBody:
+    """一次生成的订阅内容：原文、gzip 压缩结果和缓存校验信息
+
+    原文和压缩结果是同一资源的两种表示，各有自己的强 ETag（压缩结果的带 -gzip 后缀）。
+    """
+
+    __slots__ = ('data', 'gzip_data', 'etag', 'gzip_etag', 'modified', 'last_modified', 'event_count')
+
+    def __init__(self, data, modified, event_count):
+        self.data = data
+        self.gzip_data = gzip.compress(data, compresslevel=6, mtime=0) if len(data) >= GZIP_MIN_SIZE else None
+        digest = hashlib.sha1(data).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"' if self.gzip_data is not None else None
+        self.modified = int(modified)  # HTTP 日期只精确到秒
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.event_count = event_count
+
+
+class CalendarFeed:
+    """一个可订阅的日历
+
+    数据可以由界面通过 update() 推送，也可以由 loader() 按需读取（返回 (课程列表, 学期开始日期)）；
+    probe() 返回数据源的版本标记（如文件修改时间），每隔 probe_interval 秒最多检查一次，变化时才重新生成。
+    事件版本在内存中沿用上次的结果，未变化的事件保持 DTSTAMP，重新生成时可命中事件缓存。
+    事件缓存会在生成时被修改，不能在多个订阅之间共享（不同订阅可能在不同线程中同时生成）。
+    """
+
+    def __init__(self, loader=None, probe=None, mode=MODE_RRULE, probe_interval=DEFAULT_PROBE_INTERVAL, cache=None,
+                 holidays=None):
+        self.loader = loader
+        self.probe = probe
+        self.mode = mode
+        self.holidays = holidays
+        self.probe_interval = probe_interval
+        self.cache = cache if cache is not None else EventCache()
+        self._lock = threading.Lock()        # 保护下面的状态，只在短时间内持有
+        self._build_lock = threading.Lock()  # 同一时间只有一个请求在生成，事件缓存也只在生成时使用
+        self._generation = 0      # 数据每变化一次加一，生成结束时据此判断结果是否已过时
+        self._snapshot = None     # update() 推送的 (课程列表, 学期开始日期)
+        self._snapshot_key = None  # 快照内容的键，推送相同的数据时不重新生成
+        self._body = None         # 当前数据对应的 FeedBody，None 表示需要重新生成
+        self._previous = None     # 上次生成的 FeedBody，内容不变时沿用其 Last-Modified
+        self._versions = {}       # 上次生成时各事件的版本，见 ics_feed.ManifestVersions
+        self._modified = time.time()
+        self._probe_token = None
+        self._probed_at = float('-inf')
+        self.builds = 0
+
+    def update(self, courses, semester_start, mode=None, holidays=None):
+        """推送新的课程数据（在调用方线程中复制快照）和节假日表，下次请求时重新生成；与上次推送的相同时不做任何事"""
+        feed_mode = mode or self.mode
+        key = (semester_start, feed_mode, holidays.key if holidays else None,
+               tuple(course_cache_key(course, semester_start, feed_mode) for course in courses))
+        with self._lock:
+            if key == self._snapshot_key:
+                return
+        snapshot = ([course.copy() for course in courses], semester_start)
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_key = key
+            if mode is not None:
+                self.mode = mode
+            self.holidays = holidays
+            self._invalidate()
+
+    def invalidate(self):
+        """标记数据已变化"""
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self):
+        if self._body is not None:
+            self._previous = self._body
+        self._body = None
+        self._generation += 1
+        self._modified = time.time()
+
+    def _check_probe(self):
+        now = time.monotonic()
+        if self.probe is None or now - self._probed_at < self.probe_interval:
+            return
+        self._probed_at = now
+        token = self.probe()
+        if token != self._probe_token:
+            if self._probe_token is not None:
+                self._invalidate()
+            self._probe_token = token
+
+    def body(self):
+        """当前的 FeedBody；数据变化后的第一次请求负责重新生成，其他并发请求等待它完成
+
+        生成时不持有 _lock，界面线程的 update() 不会被正在进行的生成阻塞；生成期间数据又变化时，
+        本次结果只返回给等待的请求，不作为当前内容，下次请求再按新数据生成。
+        """
+        with self._lock:
+            self._check_probe()
+            if self._body is not None:
+                return self._body
+        with self._build_lock:
+            with self._lock:
+                if self._body is not None:
+                    return self._body
+                generation = self._generation
+                snapshot, mode, holidays = self._snapshot, self.mode, self.holidays
+                versions = ManifestVersions(self._versions, datetime.fromtimestamp(int(self._modified), timezone.utc))
+                previous, modified = self._previous, self._modified
+            body = self._build(snapshot, mode, holidays, versions, previous, modified)
+            with self._lock:
+                self._versions = versions.entries
+                self.builds += 1
+                if generation == self._generation:
+                    self._body = body
+            return body
+
+    def _build(self, snapshot, mode, holidays, versions, previous, modified):
+        if snapshot is not None:
+            courses, semester_start = snapshot
+        elif self.loader is not None:
+            courses, semester_start = self.loader()
+        else:
+            courses, semester_start = [], None
+        if semester_start is None:
+            raise ValueError("缺少学期开始日期")
+        # 缓存容量至少容纳整份课表，否则按顺序重新生成时 LRU 会把每一项都挤出去
+        self.cache.max_entries = max(self.cache.max_entries, len(courses))
+
+        buffer = io.BytesIO()
+        count = write_ics_to(buffer, courses, semester_start, mode, cache=self.cache, versions=versions,
+                             holidays=holidays)
+        data = buffer.getvalue()
+        if previous is not None and previous.data == data:
+            return previous
+        return FeedBody(data, modified, count)
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    """GET / 列出所有订阅，GET /<名称>.ics 返回日历"""
+
+    protocol_version = 'HTTP/1.1'  # 保持连接，轮询的客户端不必每次重新建立连接
+    disable_nagle_algorithm = True  # 响应头和内容分两次写出，避免与延迟确认叠加出 40ms 的等待
+    server_version = 'ClassTableICS/1.0'
+
+    def do_HEAD(self):
+        self.handle_get(send_body=False)
+
+    def do_GET(self):
+        self.handle_get(send_body=True)
+
+    def handle_get(self, send_body):
+        path = unquote(urlsplit(self.path).path)
+        if path == '/':
+            self.send_index(send_body)
+            return
+        name = path[1:-4] if path.endswith('.ics') else None
+        feed = self.server.feeds.get(name) if name else None
+        if feed is None:
+            self.send_plain(HTTPStatus.NOT_FOUND, "订阅不存在", send_body)
+            return
+        try:
+            body = feed.body()
+        except Exception as e:
+            self.send_plain(HTTPStatus.INTERNAL_SERVER_ERROR, f"生成日历失败: {e}", send_body)
+            return
+
+        gzipped = body.gzip_data is not None and accepts_gzip(self.headers.get('Accept-Encoding'))
+        etag = body.gzip_etag if gzipped else body.etag
+        if self.not_modified(body, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_cache_headers(body, etag)
+            self.end_headers()
+            return
+
+        data = body.gzip_data if gzipped else body.data
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_cache_headers(body, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def not_modified(self, body, etag):
+        """按 If-None-Match（优先）或 If-Modified-Since 判断客户端的缓存是否仍然有效
+
+        etag 为本次要返回的表示（原文或 gzip）的 ETag，客户端缓存的是另一种表示时不算命中。
+        """
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= body.modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_cache_headers(self, body, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', body.last_modified)
+        self.send_header('Cache-Control', 'no-cache')  # 客户端每次都来校验，但可以复用缓存的内容
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def send_index(self, send_body):
+        host = self.headers.get('Host')
+        lines = [f"{name}.ics\thttp://{host}/{quote(name)}.ics" if host else f"{name}.ics\t{self.server.url_for(name)}"
+                 for name in sorted(self.server.feeds)]
+        self.send_plain(HTTPStatus.OK, '\n'.join(lines), send_body)
+
+    def send_plain(self, status, text, send_body):
+        data = (text + '\n').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FeedHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, feeds, verbose=False):
+        super().__init__(address, FeedRequestHandler)
+        self.feeds = feeds
+        self.verbose = verbose
+
+    def url_for(self, name, host=None):
+        """订阅的 URL；绑定到所有地址时可通过 host 指定对外的地址"""
+        bound_host, port = self.server_address[:2]
+        if host is None:
+            host = DEFAULT_HOST if bound_host in ('0.0.0.0', '') else bound_host
+        return f"http://{host}:{port}/{quote(name)}.ics"
+
+
+class IcsServer:
+    """在后台线程中运行的订阅服务"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+        self.feeds = {}  # 名称 -> CalendarFeed
+        self.httpd = FeedHTTPServer((host, port), self.feeds, verbose)
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def add_feed(self, name, feed):
+        """以 name 注册订阅，URL 为 /<name>.ics"""
+        self.feeds[name] = feed
+        return feed
+
+    def url_for(self, name, host=None):
+        return self.httpd.url_for(name, host)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='ics-server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def lan_address():
+    """本机在局域网中的地址，获取失败时返回 127.0.0.1"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(('10.255.255.255', 1))  # UDP 的 connect 不会发送数据，只用来选择出口网卡
+            return s.getsockname()[0]
+    except OSError:
+        return DEFAULT_HOST
+
+
+def json_file_feed(path, semester_start, mode=MODE_RRULE, holidays=None):
+    """courses.json 文件的订阅，文件修改时间变化时重新生成"""
+    return CalendarFeed(
+        loader=lambda: (load_courses(path), semester_start),
+        probe=lambda: os.stat(path).st_mtime_ns,
+        mode=mode, holidays=holidays,
+    )
+
+
+def database_feed(db_path, class_name, semester, semester_start=None, mode=MODE_RRULE, holidays=None):
+    """课表库中一份课表的订阅，课表的更新时间变化时重新生成；每次访问课表库都使用新的连接（线程安全）"""
+    from schedule_db import ScheduleDatabase
+
+    def load():
+        with ScheduleDatabase(db_path) as db:
+            courses, stored_start = db.load_schedule(class_name, semester)
+        return courses, semester_start or stored_start
+
+    def probe():
+        with ScheduleDatabase(db_path) as db:
+            schedules = db.list_schedules(class_name, semester)
+        return schedules[0][3] if schedules else None
+
+    return CalendarFeed(loader=load, probe=probe, mode=mode, holidays=holidays)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="在本地提供可订阅的 ICS 日历")
+    parser.add_argument('inputs', nargs='*', help="课程 JSON 文件，订阅名称取文件名")
+    parser.add_argument('--db', help="提供 SQLite 课表库中的课表，订阅名称为班级名")
+    parser.add_argument('--semester', help="与 --db 一起使用，提供该学期的所有课表")
+    parser.add_argument('-s', '--start', type=date.fromisoformat,
+                        help="学期第一周的第一天，格式 YYYY-MM-DD；使用 --db 时默认取课表库中记录的日期")
+    parser.add_argument('-m', '--mode', choices=EVENT_MODES, default=MODE_RRULE,
+                        help="rrule：每门课一个重复事件（默认）；expanded：每周一个事件")
+    parser.add_argument('--holidays', metavar='FILE', help="节假日与调休表（JSON，格式见 holiday_calendar.py）")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="监听地址，0.0.0.0 表示局域网内可访问（默认仅本机）")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"端口（默认 {DEFAULT_PORT}）")
+    parser.add_argument('-v', '--verbose', action='store_true', help="输出每个请求的日志")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.db:
+        parser.error("请指定课程 JSON 文件或 --db 课表库")
+    if args.db and not args.semester:
+        parser.error("使用 --db 时必须指定 --semester")
+    if args.inputs and args.start is None:
+        parser.error("从 JSON 文件提供订阅时必须指定 --start")
+    if args.holidays:
+        try:
+            args.holidays = load_holidays(args.holidays)
+        except (OSError, ValueError) as e:
+            parser.error(f"读取节假日表失败：{e}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = IcsServer(args.host, args.port, args.verbose)
+    for path in args.inputs:
+        name = os.path.splitext(os.path.basename(path))[0]
+        server.add_feed(name, json_file_feed(path, args.start, args.mode, args.holidays))
+    if args.db:
+        from schedule_db import ScheduleDatabase
+
+        with ScheduleDatabase(args.db) as db:
+            class_names = [class_name for class_name, *_ in db.list_schedules(semester=args.semester)]
+        for class_name in class_names:
+            server.add_feed(class_name, database_feed(args.db, class_name, args.semester, args.start, args.mode,
+                                                      args.holidays))
+
+    host = lan_address() if args.host in ('0.0.0.0', '') else None
+    print(f"共 {len(server.feeds)} 个订阅，列表：http://{host or args.host}:{server.port}/", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+===========================
+@Time : 2026/10/18 上午11:10
+@Author : Entropy.Xu
+@File : ics_writer.py
+@Software: PyCharm
+============================
+"""
+# ics_writer.py
+# 流式 ICS 写出：不构建完整的 Calendar 对象，逐个事件直接写入文件，
+# 内存占用与课表大小无关。属性顺序、转义和折行规则与 icalendar 保持一致，
+# 输出与 ics_generator.write_ics_file 逐字节相同。
+from ics_generator import (ALARM_MINUTES_BEFORE, MODE_EXPANDED, PRODID, UidAllocator, fixed_versions,
+                           get_course_times, iter_event_specs, stamp_specs, utc_now)
+from instrumentation import EVENTS_BUILT, count
+from utils import atomic_open
+
+LINE_LIMIT = 75
+FOLD_SEP = '\r\n '
+
+
+def escape_text(text):
+    """按 RFC 5545 转义 TEXT 类型的值"""
+    return (
+        str(text).replace(r'\N', '\n')
+        .replace('\\', '\\\\')
+        .replace(';', r'\;')
+        .replace(',', r'\,')
+        .replace('\r\n', r'\n')
+        .replace('\n', r'\n')
+        .replace('\r', r'\n')
+    )
+
+
+def fold_line(line):
+    """按 RFC 5545 折行，每行不超过 75 字节，且不在转义符后断开"""
+    if line.isascii():
+        if len(line) < LINE_LIMIT:
+            return line
+        if '\\' not in line and '^' not in line:
+            step = LINE_LIMIT - 1
+            return FOLD_SEP.join(line[i:i + step] for i in range(0, len(line), step))
+
+    folded = []
+    current = []
+    byte_count = 0
+    for char in line:
+        char_len = len(char.encode('utf-8'))
+        if current and byte_count + char_len >= LINE_LIMIT:
+            if len(current) > 1 and current[-1] in '\\^':
+                escaped_prefix = current.pop()
+                folded.append(''.join(current))
+                current = [escaped_prefix]
+                byte_count = len(escaped_prefix.encode('utf-8'))
+            else:
+                folded.append(''.join(current))
+                current = []
+                byte_count = 0
+        current.append(char)
+        byte_count += char_len
+    if current:
+        folded.append(''.join(current))
+    return FOLD_SEP.join(folded)
+
+
+def format_datetime(dt):
+    """格式化为 ICS 日期时间，UTC 时间带 Z 后缀"""
+    text = f"{dt.year:04}{dt.month:02}{dt.day:02}T{dt.hour:02}{dt.minute:02}{dt.second:02}"
+    if dt.tzinfo is not None and dt.utcoffset().total_seconds() == 0:
+        text += 'Z'
+    return text
+
+
+def content_line(name, value):
+    """生成一行折行后的内容行（不含行尾 CRLF）"""
+    return fold_line(f"{name}:{value}")
+
+
+def event_lines(spec):
+    """按 icalendar 的属性排序规则生成单个事件的内容行"""
+    lines = [
+        'BEGIN:VEVENT',
+        content_line('SUMMARY', escape_text(spec['summary'])),
+        content_line('DTSTART', format_datetime(spec['dtstart'])),
+        content_line('DTEND', format_datetime(spec['dtend'])),
+    ]
+    if 'dtstamp' in spec:
+        lines.append(content_line('DTSTAMP', format_datetime(spec['dtstamp'])))
+    if 'uid' in spec:
+        lines.append(content_line('UID', escape_text(spec['uid'])))
+    if 'sequence' in spec:
+        lines.append(f"SEQUENCE:{spec['sequence']}")
+    if 'rrule_count' in spec:
+        lines.append(content_line('RRULE', f"FREQ=WEEKLY;COUNT={spec['rrule_count']}"))
+    if spec.get('exdate'):
+        lines.append(content_line('EXDATE', ','.join(format_datetime(dt) for dt in spec['exdate'])))
+    if 'description' in spec:
+        lines.append(content_line('DESCRIPTION', escape_text(spec['description'])))
+    if 'location' in spec:
+        lines.append(content_line('LOCATION', escape_text(spec['location'])))
+    if 'status' in spec:
+        lines.append(content_line('STATUS', escape_text(spec['status'])))
+    if 'alarm_description' in spec:
+        lines.extend((
+            'BEGIN:VALARM',
+            'ACTION:DISPLAY',
+            content_line('DESCRIPTION', escape_text(spec['alarm_description'])),
+            f"TRIGGER:-PT{ALARM_MINUTES_BEFORE}M",
+            'END:VALARM',
+        ))
+    lines.append('END:VEVENT')
+    return lines
+
+
+def serialize_event(spec):
+    """将单个事件序列化为字节串（含行尾 CRLF）"""
+    return ('\r\n'.join(event_lines(spec)) + '\r\n').encode('utf-8')
+
+
+def course_event_specs(course, semester_start, mode=MODE_EXPANDED, uid_base=None, holidays=None):
+    """单门课程的事件描述列表（尚未填入 SEQUENCE 和 DTSTAMP），时间不合法时返回 None"""
+    start_time, end_time = get_course_times(course)
+    if start_time is None or end_time is None:
+        return None
+    return list(iter_event_specs(course, start_time, end_time, semester_start, mode, uid_base, holidays))
+
+
+def serialize_specs(specs):
+    """序列化若干事件描述，返回 (字节串, 事件数)"""
+    return b''.join(serialize_event(spec) for spec in specs), len(specs)
+
+
+def serialize_course(course, semester_start, mode=MODE_EXPANDED, uid_base=None, versions=None, holidays=None):
+    """序列化单门课程的所有事件，返回 (字节串, 事件数)，时间不合法时返回 None
+
+    versions(spec) 返回事件的 (sequence, dtstamp)，默认为 SEQUENCE 0、DTSTAMP 为当前时间。
+    """
+    specs = course_event_specs(course, semester_start, mode, uid_base, holidays)
+    if specs is None:
+        return None
+    return serialize_specs(stamp_specs(specs, versions or fixed_versions(utc_now())))
+
+
+class IcsStreamWriter:
+    """将日历逐段写入二进制文件对象"""
+
+    def __init__(self, f):
+        self.f = f
+        self.event_count = 0
+
+    def write_header(self):
+        header = ['BEGIN:VCALENDAR', 'VERSION:2.0', content_line('PRODID', escape_text(PRODID))]
+        self.f.write(('\r\n'.join(header) + '\r\n').encode('utf-8'))
+
+    def write_event(self, spec):
+        self.f.write(serialize_event(spec))
+        self.event_count += 1
+
+    def write_serialized(self, data, count):
+        """写入已序列化好的若干事件"""
+        self.f.write(data)
+        self.event_count += count
+
+    def write_events(self, specs):
+        """写入若干事件描述"""
+        for spec in specs:
+            self.write_event(spec)
+
+    def write_footer(self):
+        self.f.write(b'END:VCALENDAR\r\n')
+
+
+def write_ics_to(f, courses, semester_start, mode=MODE_EXPANDED, on_invalid_course=None, cache=None,
+                 on_progress=None, versions=None, trailer=None, holidays=None):
+    """将日历流式写入已打开的二进制文件对象（也可以是 io.BytesIO），返回写入的事件数，参数见 write_ics_stream"""
+    total = len(courses)
+    versions = versions or fixed_versions(utc_now())
+    uids = UidAllocator()
+    writer = IcsStreamWriter(f)
+    writer.write_header()
+    for done, course in enumerate(courses, 1):
+        uid_base = uids.allocate(course)
+        if cache is None:
+            serialized = serialize_course(course, semester_start, mode, uid_base, versions, holidays)
+        else:
+            serialized = cache.serialize(course, semester_start, mode, uid_base, versions, holidays)
+        if serialized is None:
+            if on_invalid_course is not None:
+                on_invalid_course(course)
+        else:
+            writer.write_serialized(*serialized)
+        if on_progress is not None:
+            on_progress(done, total)
+    if trailer is not None:
+        writer.write_events(trailer())
+    writer.write_footer()
+    count(EVENTS_BUILT, writer.event_count)
+    return writer.event_count
+
+
+def write_ics_stream(courses, semester_start, file_path, mode=MODE_EXPANDED, on_invalid_course=None, cache=None,
+                     on_progress=None, versions=None, trailer=None, holidays=None):
+    """流式生成 ICS 文件，返回写入的事件数
+
+    cache 为可选的 ics_cache.EventCache，给出时未变化的课程直接使用缓存的字节串。
+    on_progress 为可选回调，每处理完一门课程以 (已处理数, 总数) 调用；回调中抛出异常可中止导出。
+    versions(spec) 返回事件的 (sequence, dtstamp)，默认所有事件 SEQUENCE 为 0、DTSTAMP 为导出时间；
+    trailer 为可选回调，在写完所有课程后调用，返回需要追加写入的事件描述（如已取消的事件）。
+    holidays 为可选的 holiday_calendar.HolidayCalendar，见 ics_generator.iter_event_specs。
+    文件先写入临时文件，完成后原子地替换目标文件，中止时目标文件保持不变。
+    """
+    with atomic_open(file_path, 'wb') as f:
+        return write_ics_to(f, courses, semester_start, mode, on_invalid_course, cache, on_progress, versions,
+                            trailer, holidays)
@@ -0,0 +1,245 @@
+"""
+===========================
+@Time : 2026/10/23 上午9:00
+@Author : Entropy.Xu
+@File : instrumentation.py
+@Software: PyCharm
+============================
+"""
+# instrumentation.py
+# 热点路径的计时与计数：刷新表格、生成 ICS、粘贴、加载课程等操作用 operation() 包起来，
+# 期间用 count() 累计构建的事件数、重建的单元格数、调整行高的行数。每个操作结束后生成一条
+# OperationRecord，界面在状态栏显示最近一次操作，无界面运行时可以把汇总写成 JSON。
+# 不依赖 Qt，可以在批量生成的子进程中使用。
+#   CLASSTABLE_METRICS=metrics.json   退出时写入汇总（值为 - 时打印到标准错误）
+#   CLASSTABLE_PROFILE=profiles       每个顶层操作用 cProfile 记录，写入该目录下的 <操作>-<时间>-<进程号>-<序号>.prof
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_ENV = "CLASSTABLE_METRICS"
+PROFILE_ENV = "CLASSTABLE_PROFILE"
+
+EVENTS_BUILT = 'events_built'
+CELLS_REBUILT = 'cells_rebuilt'
+ROWS_RESIZED = 'rows_resized'
+
+COUNTER_LABELS = {
+    EVENTS_BUILT: "事件",
+    CELLS_REBUILT: "单元格",
+    ROWS_RESIZED: "行",
+}
+
+
+class OperationRecord:
+    """一次操作的耗时和计数"""
+
+    __slots__ = ('name', 'seconds', 'counters', 'started_at')
+
+    def __init__(self, name, seconds=0.0, counters=None, started_at=None):
+        self.name = name
+        self.seconds = seconds
+        self.counters = counters if counters is not None else {}
+        self.started_at = started_at or time.time()
+
+    def __repr__(self):
+        return f"OperationRecord({self.name!r}, {self.seconds * 1000:.1f} ms, {self.counters})"
+
+    def describe(self):
+        """状态栏中显示的文字，例如 "refresh_table 12.3 ms · 单元格 98 · 行 14" """
+        parts = [f"{self.name} {self.seconds * 1000:.1f} ms"]
+        parts.extend(f"{COUNTER_LABELS.get(name, name)} {value}" for name, value in self.counters.items())
+        return ' · '.join(parts)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'ms': round(self.seconds * 1000, 3),
+            'counters': dict(self.counters),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='milliseconds'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        started_at = datetime.fromisoformat(data['started_at']).timestamp() if data.get('started_at') else None
+        return cls(data['name'], data['ms'] / 1000, dict(data.get('counters', {})), started_at)
+
+
+class OperationStats:
+    """同名操作的累计统计"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class Instrumentation:
+    """操作计时、计数器汇总和可选的 cProfile 记录
+
+    operation() 可以嵌套，计数同时累加到当前线程所有未结束的操作上；只有最外层的操作会被 cProfile 记录。
+    listeners 中的回调在操作结束的线程中以 OperationRecord 调用，界面需要自行转到主线程。
+    """
+
+    def __init__(self, profile_dir=None):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profile_lock = threading.Lock()  # 同一时间只能有一个 cProfile 在运行
+        self._profile_sequence = 0
+        self.profile_dir = profile_dir
+        self.stats = {}      # 操作名称 -> OperationStats
+        self.counters = {}   # 计数器名称 -> 累计值
+        self.last = None     # 最近结束的 OperationRecord
+        self.listeners = []
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def count(self, name, n=1):
+        """累加计数器，不在任何操作中时只计入总数"""
+        if not n:
+            return
+        for record in self._stack():
+            record.counters[name] = record.counters.get(name, 0) + n
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def operation(self, name):
+        """计时一个操作，产出其 OperationRecord；操作中抛出异常时同样记录"""
+        stack = self._stack()
+        record = OperationRecord(name)
+        profiler = self._start_profile() if not stack else None
+        stack.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            stack.pop()
+            if profiler is not None:
+                self._stop_profile(profiler, name)
+            self.record(record, count=False)
+
+    def record(self, record, count=True):
+        """加入一条已结束的操作记录，例如子进程返回的记录；count 为真时其计数也计入总数"""
+        with self._lock:
+            stats = self.stats.get(record.name)
+            if stats is None:
+                stats = self.stats[record.name] = OperationStats()
+            stats.add(record.seconds)
+            if count:
+                for name, value in record.counters.items():
+                    self.counters[name] = self.counters.get(name, 0) + value
+            self.last = record
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(record)
+
+    def reset(self):
+        """清空统计，进行中的操作不受影响"""
+        with self._lock:
+            self.stats.clear()
+            self.counters.clear()
+            self.last = None
+
+    def snapshot(self):
+        """当前统计的字典形式，可直接序列化为 JSON"""
+        with self._lock:
+            return {
+                'operations': {name: stats.to_dict() for name, stats in sorted(self.stats.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'last': self.last.to_dict() if self.last else None,
+            }
+
+    def describe(self):
+        """统计的文字报告，每个操作一行"""
+        data = self.snapshot()
+        lines = [f"{name}：{s['count']} 次，平均 {s['mean_ms']:.1f} ms，最长 {s['max_ms']:.1f} ms，"
+                 f"共 {s['total_ms']:.1f} ms" for name, s in data['operations'].items()]
+        if data['counters']:
+            lines.append('计数：' + '，'.join(f"{COUNTER_LABELS.get(name, name)} {value}"
+                                             for name, value in data['counters'].items()))
+        return '\n'.join(lines)
+
+    def write_report(self, target):
+        """写出统计：target 为 "-" 时输出到标准错误，否则写入该 JSON 文件"""
+        text = json.dumps(self.snapshot(), ensure_ascii=False, indent=4)
+        if target == '-':
+            print(text, file=sys.stderr)
+            return
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def set_profile_dir(self, path):
+        """开始（path 为目录）或停止（path 为 None）记录 cProfile"""
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.profile_dir = path or None
+
+    def _start_profile(self):
+        if not self.profile_dir or not self._profile_lock.acquire(blocking=False):
+            return None
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 已有其他工具（调试器、外部 cProfile）在记录
+            self._profile_lock.release()
+            return None
+        return profiler
+
+    def _stop_profile(self, profiler, name):
+        try:
+            profiler.disable()
+            self._profile_sequence += 1
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(self.profile_dir or '.', f"{name}-{stamp}-{os.getpid()}-{self._profile_sequence}.prof")
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"写入性能记录失败: {e}", file=sys.stderr)
+        finally:
+            self._profile_lock.release()
+
+
+# 进程内共享的实例
+metrics = Instrumentation()
+count = metrics.count
+operation = metrics.operation
+
+
+def configure_from_env(environ=None):
+    """按环境变量开启 cProfile 记录和退出时的统计输出"""
+    environ = os.environ if environ is None else environ
+    profile_dir = environ.get(PROFILE_ENV)
+    if profile_dir:
+        metrics.set_profile_dir(profile_dir)
+    target = environ.get(METRICS_ENV)
+    if target:
+        atexit.register(metrics.write_report, target)
+    return target
@@ -7,11 +7,23 @@
 ============================
 """
 # main.py
+import time
+_START = time.perf_counter()  # 尽早记录，用于统计导入耗时
+
 import sys
 import os
+import json
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
+from PySide6.QtCore import QObject, QEvent
 from main_window import MainWindow
+from instrumentation import configure_from_env
+
+_IMPORTED = time.perf_counter()
+
+# 设置该环境变量后输出启动耗时；值以 .json 结尾时写入该文件，否则打印到标准错误
+STARTUP_TIMING_ENV = "CLASSTABLE_STARTUP_TIMING"
+
 
 def resource_path(relative_path):
     """获取资源文件的绝对路径"""
@@ -23,8 +35,50 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+
+class StartupTimer(QObject):
+    """记录启动各阶段耗时，主窗口首次绘制时输出报告"""
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self.phases = [("导入模块", _IMPORTED - _START)]
+        self.last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self.mark("首次绘制")
+            self.report()
+        return False
+
+    def report(self):
+        total = sum(seconds for _, seconds in self.phases)
+        if self.target.lower().endswith('.json'):
+            data = {name: round(seconds * 1000, 3) for name, seconds in self.phases}
+            data["总计"] = round(total * 1000, 3)
+            with open(self.target, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            return
+        print("启动耗时：", file=sys.stderr)
+        for name, seconds in self.phases:
+            print(f"  {name:<12}{seconds * 1000:9.1f} ms", file=sys.stderr)
+        print(f"  {'总计':<12}{total * 1000:9.1f} ms", file=sys.stderr)
+
+
 def main():
+    timing_target = os.environ.get(STARTUP_TIMING_ENV)
+    configure_from_env()  # CLASSTABLE_METRICS / CLASSTABLE_PROFILE
+    timer = StartupTimer(timing_target) if timing_target else None
+
     app = QApplication(sys.argv)
+    if timer:
+        timer.mark("创建 QApplication")
 
     # 设置应用程序图标
     icon_path = resource_path("resources/icon.ico")
@@ -37,13 +91,18 @@ def main():
             app.setStyleSheet(f.read())
     else:
         print(f"样式表未找到：{style_path}")
+    if timer:
+        timer.mark("加载样式表")
 
     # 创建并显示主窗口
     window = MainWindow()
+    if timer:
+        timer.mark("创建主窗口")
+        window.installEventFilter(timer)
     window.show()
+    window.offer_autosave_restore()
 
     sys.exit(app.exec())
 
 if __name__ == '__main__':
     main()
-
@@ -10,52 +10,76 @@
 import os
 import platform
 import json
-from datetime import datetime, timedelta
+from contextlib import contextmanager, nullcontext
 
 from PySide6.QtWidgets import (
-    QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget,
+    QMainWindow, QTableView, QVBoxLayout, QWidget,
     QPushButton, QMessageBox, QHBoxLayout, QHeaderView, QDateEdit, QLabel,
-    QCalendarWidget, QDialog, QFileDialog, QLineEdit, QMenu, QInputDialog
+    QCalendarWidget, QDialog, QFileDialog, QLineEdit, QMenu, QInputDialog, QCheckBox,
+    QProgressDialog, QSpinBox, QApplication
 )
 from PySide6.QtGui import QAction
-from PySide6.QtCore import Qt, QDate, QItemSelectionModel
+from PySide6.QtCore import Qt, QDate, QThreadPool, QSettings, QTimer, Signal
 
-from course_dialog import CourseDialog
-from utils import format_weeks, parse_weeks_input, get_time_from_period
-from icalendar import Calendar, Event, Alarm
+from autosave import AutoSaver, load_autosave, resolve_autosave_path
+from conflicts import ConflictEngine
+from course import Course
+from course_delegate import CourseChipDelegate
+from course_store import CourseStore
+from edit_history import EditHistory
+from instrumentation import CELLS_REBUILT, ROWS_RESIZED, count, metrics, operation
+from timetable_model import HEADERS, TimetableModel
+from period_table import PeriodTable, format_time, parse_time_or_none
+from utils import parse_weeks_input, atomic_open
+from week_index import WeekIndex, current_week
 
 
 class MainWindow(QMainWindow):
     """主窗口类，负责显示课表表格和生成 ICS 文件"""
 
+    # 操作计时结束（可能来自导出线程），排队到主线程更新状态栏
+    operation_finished = Signal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("大学课表生成日历工具")
         self.resize(1400, 900)
-        self.courses = []
+        self.courses = CourseStore()  # 带 (星期, 节次) 索引的课程集合
+        self.conflicts = ConflictEngine()  # 随课程增删改增量更新的冲突检测
+        self.courses.add_listener(self.conflicts)
+        self.week_index = WeekIndex()  # 每周有课的单元格，用于按周筛选时的局部刷新
+        self.courses.add_listener(self.week_index)
+        self.history = EditHistory(self.courses)  # 添加、粘贴、删除和修改节次时间的撤销/重做
+        self.batch_depth = 0  # batch_update 的嵌套层数
+        self.batch_pending = set()  # 批量编辑中被推迟的刷新：'table'、'cells'、'commit'
         self.copied_courses = []  # 用于存储复制的课程
-        self.periods = self.get_periods()
+        self.periods = PeriodTable.default()  # 预先解析好的节次时间表
         self.ics_file_path = None  # 保存生成的 ICS 文件路径
+        self.event_cache = None  # 按课程内容缓存序列化后的事件，首次导出时创建
+        self.export_task = None  # 正在后台运行的导出任务
+        self.settings = QSettings("Entropy.Xu", "ClassTableICSGenerator")
+        self.current_schedule = ("", "")  # 从课表库打开或保存的 (班级, 学期)
+        self.room_index = None  # 由课表库建立的教室占用索引，课表库变化时重建
+        self.room_index_key = None
+        self.autosaver = AutoSaver(self.courses, resolve_autosave_path(self.settings.value("autosave_path")), self)
+        self.ics_server = None  # 本地日历订阅服务，启动后才创建
+        self.ics_feed = None
+        self.ics_feed_url = None
+        self.holidays_cache = None  # (文件路径, 修改时间, HolidayCalendar)，文件变化时重新读取
+        # 连续编辑时合并推送给订阅服务的课程快照
+        self.feed_timer = QTimer(self)
+        self.feed_timer.setSingleShot(True)
+        self.feed_timer.setInterval(300)
+        self.feed_timer.timeout.connect(self.push_feed_update)
         self.init_ui()
-
-    @staticmethod
-    def get_periods():
-        """获取节次信息"""
-        return [
-            "第一节\n8:20-9:05",
-            "第二节\n9:10-9:55",
-            "第三节\n10:15-11:00",
-            "第四节\n11:05-11:50",
-            "第五节\n11:55-12:25",
-            "第六节\n12:30-13:00",
-            "第七节\n13:10-13:55",
-            "第八节\n14:00-14:45",
-            "第九节\n15:05-15:50",
-            "第十节\n15:55-16:40",
-            "第十一节\n18:00-18:45",
-            "第十二节\n18:50-19:35",
-            "第十三节\n19:40-20:25"
-        ]
+        self.conflict_label = QLabel()
+        self.statusBar().addPermanentWidget(self.conflict_label)
+        self.perf_label = QLabel()  # 最近一次被计时的操作
+        self.statusBar().addPermanentWidget(self.perf_label)
+        self.operation_finished.connect(self.show_operation_record)
+        metrics.listeners.append(self.operation_finished.emit)
+        self.autosaver.saved.connect(lambda path: self.statusBar().showMessage(f"已自动保存到 {path}", 3000))
+        self.autosaver.failed.connect(lambda message: self.statusBar().showMessage(f"自动保存失败: {message}"))
 
     def init_ui(self):
         """初始化主窗口界面"""
@@ -75,12 +99,57 @@ class MainWindow(QMainWindow):
         load_action.triggered.connect(self.load_courses_from_json)
         file_menu.addAction(load_action)
 
+        import_csv_action = QAction("导入教务 CSV…", self)
+        import_csv_action.triggered.connect(self.import_courses_from_csv)
+        file_menu.addAction(import_csv_action)
+
+        file_menu.addSeparator()
+        save_db_action = QAction("保存到课表库…", self)
+        save_db_action.triggered.connect(self.save_courses_to_database)
+        file_menu.addAction(save_db_action)
+
+        open_db_action = QAction("从课表库打开…", self)
+        open_db_action.triggered.connect(self.load_courses_from_database)
+        file_menu.addAction(open_db_action)
+
+        file_menu.addSeparator()
+        autosave_path_action = QAction("自动保存位置…", self)
+        autosave_path_action.triggered.connect(self.choose_autosave_path)
+        file_menu.addAction(autosave_path_action)
+
+        holidays_action = QAction("节假日与调休表…", self)
+        holidays_action.triggered.connect(self.choose_holidays_file)
+        file_menu.addAction(holidays_action)
+
+        tools_menu = menubar.addMenu("工具")
+        conflicts_action = QAction("查看时间冲突", self)
+        conflicts_action.triggered.connect(self.show_conflicts)
+        tools_menu.addAction(conflicts_action)
+
+        free_rooms_action = QAction("查找空闲教室…", self)
+        free_rooms_action.triggered.connect(self.show_free_rooms)
+        tools_menu.addAction(free_rooms_action)
+
+        room_collisions_action = QAction("检查教室冲突", self)
+        room_collisions_action.triggered.connect(self.show_room_collisions)
+        tools_menu.addAction(room_collisions_action)
+
+        tools_menu.addSeparator()
+        ics_server_action = QAction("日历订阅服务…", self)
+        ics_server_action.triggered.connect(self.toggle_ics_server)
+        tools_menu.addAction(ics_server_action)
+
+        metrics_action = QAction("性能统计…", self)
+        metrics_action.triggered.connect(self.show_metrics)
+        tools_menu.addAction(metrics_action)
+
     def setup_central_widget(self):
         """设置中心部件"""
         central_widget = QWidget()
         layout = QVBoxLayout()
 
         self.setup_first_day_input(layout)
+        self.setup_week_selector(layout)
         self.setup_table(layout)
         self.setup_generate_button(layout)
 
@@ -103,6 +172,65 @@ class MainWindow(QMainWindow):
         first_day_layout.addWidget(self.calendar_button)
         first_day_layout.addStretch()
         layout.addLayout(first_day_layout)
+        self.first_day_edit.dateChanged.connect(self.update_current_week_label)
+        self.first_day_edit.dateChanged.connect(self.schedule_feed_update)
+
+    def setup_week_selector(self, layout):
+        """设置按周筛选课表的周次选择"""
+        week_layout = QHBoxLayout()
+        week_label = QLabel("显示周次:")
+        self.week_spin = QSpinBox()
+        self.week_spin.setRange(0, 20)
+        self.week_spin.setSpecialValueText("全部")  # 0 表示显示全部课程
+        self.week_spin.setPrefix("第 ")
+        self.week_spin.setSuffix(" 周")
+        self.week_spin.setMinimumWidth(100)
+        self.week_spin.valueChanged.connect(self.on_week_changed)
+        # 连续切换周次时行高只在停下后调整一次
+        self.pending_resize_rows = set()
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(80)
+        self.resize_timer.timeout.connect(self.resize_pending_rows)
+        self.this_week_button = QPushButton("本周")
+        self.this_week_button.clicked.connect(self.show_current_week)
+        self.current_week_label = QLabel()
+        week_layout.addWidget(week_label)
+        week_layout.addWidget(self.week_spin)
+        week_layout.addWidget(self.this_week_button)
+        week_layout.addWidget(self.current_week_label)
+        week_layout.addStretch()
+        layout.addLayout(week_layout)
+        self.update_current_week_label()
+
+    def current_week(self):
+        """根据学期开始日期计算今天所在的周次"""
+        return current_week(self.first_day_edit.date().toPython(), QDate.currentDate().toPython())
+
+    def update_current_week_label(self):
+        """显示今天是第几周"""
+        week = self.current_week()
+        self.current_week_label.setText(f"今天是第 {week} 周" if week else "学期尚未开始")
+
+    def show_current_week(self):
+        """切换到本周"""
+        week = self.current_week()
+        if week > self.week_spin.maximum():
+            self.week_spin.setMaximum(week)
+        self.week_spin.setValue(week)
+
+    def on_week_changed(self, value):
+        """按周筛选课表，只刷新显示变化的单元格"""
+        self.pending_resize_rows.update(self.model.set_week(value or None))
+        self.resize_timer.start()
+
+    def resize_pending_rows(self):
+        """调整切换周次时内容变化的行的行高"""
+        rows, self.pending_resize_rows = self.pending_resize_rows, set()
+        with operation('switch_week'):
+            for row in rows:
+                self.table.resizeRowToContents(row)
+            count(ROWS_RESIZED, len(rows))
 
     def show_calendar_dialog(self):
         """显示日历对话框以选择日期"""
@@ -124,14 +252,16 @@ class MainWindow(QMainWindow):
 
     def setup_table(self, layout):
         """设置课程表格"""
-        self.table = QTableWidget(len(self.periods), 8)
-        self.table.setHorizontalHeaderLabels(
-            ['节次', '星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
-        )
+        self.model = TimetableModel(self.courses, self.periods, self, self.conflicts, self.week_index)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # 每门课程画成一个标签，行高按单元格内容缓存
+        self.chip_delegate = CourseChipDelegate(self.model, self.table)
+        self.table.setItemDelegate(self.chip_delegate)
         self.table.verticalHeader().setVisible(False)
         self.table.setWordWrap(True)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.cellDoubleClicked.connect(self.cell_double_clicked)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.doubleClicked.connect(lambda index: self.cell_double_clicked(index.row(), index.column()))
 
         # 启用自定义上下文菜单
         self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
@@ -145,12 +275,7 @@ class MainWindow(QMainWindow):
         for i in range(1, 8):
             self.table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
 
-        for row, period in enumerate(self.periods):
-            item = QTableWidgetItem(period)
-            item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-            self.table.setItem(row, 0, item)
-            self.table.resizeRowToContents(row)
+        self.table.resizeRowsToContents()
 
         # 设置焦点策略，确保键盘事件可以被捕获
         self.table.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
@@ -166,8 +291,18 @@ class MainWindow(QMainWindow):
         self.open_folder_button.clicked.connect(self.open_folder)
         self.open_folder_button.setEnabled(False)  # 初始状态不可用
 
+        # 合并为重复事件（RRULE），取消勾选则每周生成一个事件，兼容不支持重复规则的客户端
+        self.rrule_checkbox = QCheckBox("合并为重复事件")
+        self.rrule_checkbox.setChecked(True)
+        self.rrule_checkbox.toggled.connect(self.schedule_feed_update)
+
+        # 额外生成只含新增、修改、取消事件的 <文件名>.update.ics，调课后只需导入这个文件
+        self.update_checkbox = QCheckBox("同时生成增量更新文件")
+
         button_layout = QHBoxLayout()
         button_layout.addStretch()
+        button_layout.addWidget(self.rrule_checkbox)
+        button_layout.addWidget(self.update_checkbox)
         button_layout.addWidget(self.ics_button)
         button_layout.addWidget(self.open_folder_button)
         button_layout.addStretch()
@@ -179,109 +314,102 @@ class MainWindow(QMainWindow):
                 self.copy_cells()
             elif event.key() == Qt.Key.Key_V:
                 self.paste_cells()
+            elif event.key() == Qt.Key.Key_Z:
+                self.undo_edit()
+            elif event.key() == Qt.Key.Key_Y:
+                self.redo_edit()
+        elif event.modifiers() == Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier \
+                and event.key() == Qt.Key.Key_Z:
+            self.redo_edit()
         elif event.key() == Qt.Key.Key_Delete:
             self.delete_selected_courses()
         else:
             super().keyPressEvent(event)
 
+    def selected_ranges(self):
+        """返回当前选定的矩形区域列表"""
+        return list(self.table.selectionModel().selection())
+
     def copy_cells(self):
         """复制选定的单元格中的课程信息"""
-        selected_ranges = self.table.selectedRanges()
+        selected_ranges = self.selected_ranges()
         self.copied_courses = []
 
-        for selected_range in selected_ranges:
-            for row in range(selected_range.topRow(), selected_range.bottomRow() + 1):
-                for column in range(selected_range.leftColumn(), selected_range.rightColumn() + 1):
-                    if column == 0:
-                        continue  # 跳过节次列
+        with operation('copy_cells'):
+            for selected_range in selected_ranges:
+                for row in range(selected_range.top(), selected_range.bottom() + 1):
+                    for column in range(selected_range.left(), selected_range.right() + 1):
+                        if column == 0:
+                            continue  # 跳过节次列
 
-                    item = self.table.item(row, column)
-                    if item and item.text():
-                        # 找到对应的课程数据
-                        for course in self.courses:
-                            if course['day'] == column - 1 and course['period'] == row:
-                                self.copied_courses.append(course.copy())
+                        # 只复制按周筛选后仍显示的课程
+                        for course in self.model.visible_courses(column - 1, row):
+                            self.copied_courses.append(course.copy())
 
     def paste_cells(self):
         """将复制的课程信息粘贴到选定的单元格"""
         if not self.copied_courses:
             return  # 没有复制的课程，直接返回
 
-        selected_ranges = self.table.selectedRanges()
+        selected_ranges = self.selected_ranges()
         if not selected_ranges:
             return  # 没有选定的单元格，直接返回
 
         # 假设只粘贴到第一个选定区域的左上角
-        target_row = selected_ranges[0].topRow()
-        target_column = selected_ranges[0].leftColumn()
+        target_row = selected_ranges[0].top()
+        target_column = selected_ranges[0].left()
 
         if target_column == 0:
             return  # 不能粘贴到节次列
 
         # 计算偏移量
-        row_offset = target_row - self.copied_courses[0]['period']
-        column_offset = target_column - (self.copied_courses[0]['day'] + 1)
+        row_offset = target_row - self.copied_courses[0].period
+        column_offset = target_column - (self.copied_courses[0].day + 1)
 
         # 粘贴课程
-        new_courses = []
-        for course in self.copied_courses:
-            new_period = course['period'] + row_offset
-            new_day = course['day'] + column_offset
-
-            if new_period < 0 or new_period >= len(self.periods) or new_day < 0 or new_day > 6:
-                continue  # 超出表格范围，跳过
-
-            # 检查是否有重复的课程
-            if any(c for c in self.courses if c['day'] == new_day and c['period'] == new_period and c['name'] == course['name']):
-                continue  # 已存在相同课程，跳过
-
-            new_course = course.copy()
-            new_course['period'] = new_period
-            new_course['day'] = new_day
-
-            # 获取新的开始时间和结束时间
-            new_start_time, new_end_time = get_time_from_period(self.periods[new_period])
-            new_course['start_time'] = new_start_time
-            new_course['end_time'] = new_end_time
-
-            new_courses.append(new_course)
-
-        if new_courses:
-            self.courses.extend(new_courses)
-            self.refresh_table()
+        with operation('paste_cells'):
+            new_courses = []
+            for course in self.copied_courses:
+                new_period = course.period + row_offset
+                new_day = course.day + column_offset
+
+                if new_period < 0 or new_period >= len(self.periods) or new_day < 0 or new_day > 6:
+                    continue  # 超出表格范围，跳过
+
+                # 检查是否有重复的课程
+                if self.courses.contains(new_day, new_period, course.name):
+                    continue  # 已存在相同课程，跳过
+
+                # 获取新的开始时间和结束时间
+                new_start_time, new_end_time = self.periods.times(new_period)
+                new_courses.append(course.copy(
+                    period=new_period, day=new_day, start_time=new_start_time, end_time=new_end_time
+                ))
+
+            if new_courses:
+                with self.batch_update("粘贴课程"):
+                    self.courses.extend(new_courses)
+                    self.commit_course_changes()
 
     def delete_selected_courses(self):
         """删除选定的单元格中的课程"""
-        selected_ranges = self.table.selectedRanges()
+        selected_ranges = self.selected_ranges()
         if not selected_ranges:
             return  # 没有选定的单元格，直接返回
 
-        for selected_range in selected_ranges:
-            for row in range(selected_range.topRow(), selected_range.bottomRow() + 1):
-                for column in range(selected_range.leftColumn(), selected_range.rightColumn() + 1):
-                    if column == 0:
-                        continue  # 跳过节次列
+        with operation('delete_courses'), self.batch_update("删除课程"):
+            for selected_range in selected_ranges:
+                for row in range(selected_range.top(), selected_range.bottom() + 1):
+                    for column in range(selected_range.left(), selected_range.right() + 1):
+                        if column == 0:
+                            continue  # 跳过节次列
 
-                    day = column - 1
-                    period = row
+                        # 只删除单元格中当前显示的课程，按周筛选隐藏的课程保持不变
+                        for course in self.model.visible_courses(column - 1, row):
+                            self.courses.remove(course)
 
-                    # 获取单元格中的课程名称
-                    item = self.table.item(row, column)
-                    if not item:
-                        continue
-
-                    # 提取所有课程名称
-                    courses_in_cell = item.text().split('\n')
-                    course_names = [c.split('(')[0] for c in courses_in_cell]
-
-                    # 从 courses 列表中删除对应的课程
-                    self.courses = [
-                        course for course in self.courses
-                        if not (course['day'] == day and course['period'] == period and course['name'] in course_names)
-                    ]
-
-        # 更新表格显示
-        self.refresh_table()
+            # 更新表格显示
+            self.commit_course_changes()
 
     def show_context_menu(self, pos):
         """显示右键上下文菜单"""
@@ -296,8 +424,7 @@ class MainWindow(QMainWindow):
         if column == 0:
             pass  # 可以根据需要在节次列添加其他选项
         else:
-            item = self.table.item(row, column)
-            if item and item.text():
+            if self.model.visible_courses(column - 1, row):
                 delete_action = QAction("删除课程", self)
                 delete_action.triggered.connect(lambda: self.delete_course(row, column))
                 menu.addAction(delete_action)
@@ -311,6 +438,19 @@ class MainWindow(QMainWindow):
         paste_action.triggered.connect(self.paste_cells)
         menu.addAction(paste_action)
 
+        menu.addSeparator()
+        undo_label = self.history.undo_label()
+        undo_action = QAction(f"撤销{undo_label or ''}\tCtrl+Z", self)
+        undo_action.setEnabled(undo_label is not None)
+        undo_action.triggered.connect(self.undo_edit)
+        menu.addAction(undo_action)
+
+        redo_label = self.history.redo_label()
+        redo_action = QAction(f"重做{redo_label or ''}\tCtrl+Y", self)
+        redo_action.setEnabled(redo_label is not None)
+        redo_action.triggered.connect(self.redo_edit)
+        menu.addAction(redo_action)
+
         menu.exec(self.table.viewport().mapToGlobal(pos))
 
     def delete_course(self, row, column):
@@ -318,38 +458,34 @@ class MainWindow(QMainWindow):
         day = column - 1
         period = row
 
-        # 获取单元格中的课程名称
-        item = self.table.item(row, column)
-        if not item:
+        # 单元格中当前显示的课程（按周筛选时不包括隐藏的课程）
+        courses_in_cell = self.model.visible_courses(day, period)
+        if not courses_in_cell:
             return
 
         # 如果单元格中有多个课程，需要用户选择要删除的课程
-        courses_in_cell = item.text().split('\n')
         if len(courses_in_cell) > 1:
             # 当单元格中有多个课程时，弹出选择对话框
-            selected_course, ok = QInputDialog.getItem(
+            labels = [f"{course.name}({course.location})" for course in courses_in_cell]
+            selected_label, ok = QInputDialog.getItem(
                 self,
                 "选择课程",
                 "请选择要删除的课程：",
-                courses_in_cell,
+                labels,
                 editable=False
             )
             if not ok:
                 return
+            selected_course = courses_in_cell[labels.index(selected_label)]
         else:
             selected_course = courses_in_cell[0]
 
-        # 提取课程名称
-        course_name = selected_course.split('(')[0]
-
-        # 从 courses 列表中删除对应的课程
-        self.courses = [
-            course for course in self.courses
-            if not (course['day'] == day and course['period'] == period and course['name'] == course_name)
-        ]
+        # 从课程集合中删除对应的课程
+        with self.history.command("删除课程"):
+            self.courses.remove(selected_course)
 
         # 更新表格显示
-        self.refresh_table()
+        self.commit_course_changes()
 
     def cell_double_clicked(self, row, column):
         if column == 0:
@@ -361,14 +497,9 @@ class MainWindow(QMainWindow):
 
     def edit_period_time(self, row):
         """编辑节次时间范围"""
-        period_str = self.periods[row]
-        # 提取当前的节次名称和时间范围
-        try:
-            period_name, time_range = period_str.split('\n')
-            start_time_str, end_time_str = time_range.split('-')
-        except ValueError:
-            QMessageBox.warning(self, "错误", "节次信息格式不正确，无法编辑时间。")
-            return
+        period = self.periods[row]
+        period_name = period.name
+        start_time_str, end_time_str = format_time(period.start), format_time(period.end)
 
         # 创建对话框
         dialog = QDialog(self)
@@ -402,36 +533,36 @@ class MainWindow(QMainWindow):
         cancel_button.clicked.connect(dialog.reject)
 
         if dialog.exec():
-            new_start_time = start_time_edit.text().strip()
-            new_end_time = end_time_edit.text().strip()
             # 验证时间格式
-            if self.validate_time_format(new_start_time) and self.validate_time_format(new_end_time):
-                # 更新 periods 列表
-                self.periods[row] = f"{period_name}\n{new_start_time}-{new_end_time}"
-                # 更新表格中的显示
-                item = QTableWidgetItem(self.periods[row])
-                item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-                self.table.setItem(row, 0, item)
-                # 更新课程中对应的时间
-                self.update_courses_time(row, new_start_time, new_end_time)
-            else:
+            new_start_time = parse_time_or_none(start_time_edit.text())
+            new_end_time = parse_time_or_none(end_time_edit.text())
+            if new_start_time is None or new_end_time is None:
                 QMessageBox.warning(self, "输入错误", "时间格式不正确，请输入 HH:MM 格式的时间。")
+                return
+            if new_end_time <= new_start_time:
+                QMessageBox.warning(self, "输入错误", "结束时间必须晚于开始时间。")
+                return
+            old_start_time, old_end_time = self.periods.times(row)
+            with self.history.command(f"修改{period_name}时间"):
+                self.set_period_time(row, new_start_time, new_end_time)
+                self.history.record_call(
+                    lambda: self.set_period_time(row, old_start_time, old_end_time),
+                    lambda: self.set_period_time(row, new_start_time, new_end_time),
+                )
+                # 通过节次索引更新课程中对应的时间
+                self.update_courses_time(row, new_start_time, new_end_time)
+            self.commit_course_changes()
 
-    def validate_time_format(self, time_str):
-        """验证时间格式是否为 HH:MM"""
-        try:
-            datetime.strptime(time_str, "%H:%M")
-            return True
-        except ValueError:
-            return False
+    def set_period_time(self, row, start_time, end_time):
+        """修改节次时间表并刷新节次列的显示"""
+        self.periods.set_time(row, start_time, end_time)
+        self.model.period_changed(row)
+        self.table.resizeRowToContents(row)
 
     def update_courses_time(self, period_row, new_start_time, new_end_time):
         """更新课程数据中对应节次的时间"""
-        for course in self.courses:
-            if course['period'] == period_row:
-                course['start_time'] = new_start_time
-                course['end_time'] = new_end_time
+        for course in self.courses.in_period(period_row):
+            self.courses.update(course, start_time=new_start_time, end_time=new_end_time)
 
     def add_course(self, row, column):
         """添加课程到表格"""
@@ -442,15 +573,16 @@ class MainWindow(QMainWindow):
         period = row
 
         # 获取节次对应的开始时间和结束时间
-        default_start_time, default_end_time = get_time_from_period(self.periods[row])
+        default_start_time, default_end_time = self.periods.times(row)
 
+        from course_dialog import CourseDialog  # 首次使用时才导入对话框
         dialog = CourseDialog(self, day, period)
         if dialog.exec():
             data = dialog.get_data()
             if not self.validate_course_data(data):
                 return
 
-            task_weeks = parse_weeks_input(data['weeks'])
+            task_weeks = parse_weeks_input(data['weeks'], as_mask=True)
             if not task_weeks:
                 QMessageBox.warning(self, "输入错误", "周数格式不正确或为空。")
                 return
@@ -463,8 +595,19 @@ class MainWindow(QMainWindow):
             data['start_time'] = default_start_time
             data['end_time'] = default_end_time
 
-            self.update_table(row, column, data, task_weeks)
-            self.courses.append(self.create_course_dict(day, period, data, task_weeks))
+            course = self.create_course(day, period, data, task_weeks)
+            conflicts = self.conflicts.check(course)
+            if conflicts:
+                details = '\n'.join(conflict.describe() for conflict in conflicts[:10])
+                answer = QMessageBox.question(
+                    self, "时间冲突", f"该课程与已有课程时间冲突：\n{details}\n\n仍要添加吗？"
+                )
+                if answer != QMessageBox.StandardButton.Yes:
+                    return
+
+            with self.history.command("添加课程"):
+                self.courses.add(course)
+            self.commit_course_changes()
 
     @staticmethod
     def validate_course_data(data):
@@ -476,114 +619,121 @@ class MainWindow(QMainWindow):
 
     def is_course_duplicate(self, day, period, course_name):
         """检查课程是否重复"""
-        for course in self.courses:
-            if course['day'] == day and course['period'] == period and course['name'] == course_name:
-                return True
-        return False
-
-    def update_table(self, row, column, data, task_weeks):
-        """更新表格显示"""
-        weeks_str = format_weeks(task_weeks)
-        new_text = f"{data['name']}({data['location']})\n周数: {weeks_str}"
-        current_item = self.table.item(row, column)
-        if current_item and current_item.text():
-            new_text = f"{current_item.text()}\n{new_text}"
-        item = QTableWidgetItem(new_text)
-        item.setTextAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        self.table.setItem(row, column, item)
-        self.table.resizeRowToContents(row)
+        return self.courses.contains(day, period, course_name)
 
     @staticmethod
-    def create_course_dict(day, period, data, task_weeks):
-        """创建课程字典"""
-        return {
-            'day': day,
-            'period': period,
-            'name': data['name'].strip(),
-            'location': data['location'].strip(),
-            'weeks': task_weeks,
-            'start_time': data['start_time'],
-            'end_time': data['end_time']
-        }
+    def create_course(day, period, data, weeks_mask):
+        """创建课程记录"""
+        return Course(
+            day,
+            period,
+            data['name'].strip(),
+            data['location'].strip(),
+            weeks_mask,
+            data['start_time'],
+            data['end_time']
+        )
 
     def generate_ics(self):
         """生成 ICS 文件"""
-        cal = Calendar()
-        cal.add('prodid', '-//大学课表生成工具//')
-        cal.add('version', '2.0')
-
+        # 导出相关模块在首次导出时才导入，以加快启动
+        from ics_generator import MODE_RRULE, MODE_EXPANDED
         semester_start = self.first_day_edit.date().toPython()
-
-        for course in self.courses:
-            self.add_course_events(cal, course, semester_start)
-
-        self.save_ics_file(cal)
-
-    def add_course_events(self, cal, course, semester_start):
-        """添加课程事件到日历"""
-        task_weeks = course['weeks']
-        day = course['day']
-        start_time, end_time = self.get_course_times(course)
-        if start_time is None or end_time is None:
+        mode = MODE_RRULE if self.rrule_checkbox.isChecked() else MODE_EXPANDED
+        self.save_ics_file(semester_start, mode)
+
+    def warn_invalid_course_time(self, course_name):
+        """提示课程时间格式错误"""
+        QMessageBox.warning(self, "错误", f"课程 {course_name} 的时间格式错误，请检查节次时间配置。")
+
+    def save_ics_file(self, semester_start, mode):
+        """选择保存位置，并在后台线程中流式写出 ICS 文件"""
+        # 使用 QFileDialog 让用户选择保存位置
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "保存 ICS 文件",
+            os.path.expanduser("~/course_schedule.ics"),
+            "ICS Files (*.ics)"
+        )
+        if not file_path:
+            return  # 用户取消保存
+
+        from ics_cache import EventCache
+        from ics_feed import update_path_for
+        from export_worker import IcsExportTask
+        if self.event_cache is None:
+            self.event_cache = EventCache()
+
+        # 基于当前课程的快照在后台导出，导出期间界面保持响应；
+        # 与上次导出留下的清单比较，未变化的事件保持原来的 UID 和版本
+        update_path = update_path_for(file_path) if self.update_checkbox.isChecked() else None
+        task = IcsExportTask(self.courses, semester_start, file_path, mode, cache=self.event_cache,
+                             update_path=update_path, holidays=self.current_holidays())
+        self.export_task = task
+        self.invalid_course_names = []
+
+        self.export_progress = QProgressDialog("正在生成 ICS 文件…", "取消", 0, max(len(task.courses), 1), self)
+        self.export_progress.setWindowTitle("生成 ICS 文件")
+        self.export_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_progress.setMinimumDuration(500)
+        self.export_progress.canceled.connect(task.cancel)
+
+        task.signals.progress.connect(lambda done, total: self.export_progress.setValue(done))
+        task.signals.invalid_course.connect(self.invalid_course_names.append)
+        task.signals.finished.connect(self.on_export_finished)
+        task.signals.failed.connect(self.on_export_failed)
+        task.signals.cancelled.connect(self.on_export_cancelled)
+
+        self.ics_button.setEnabled(False)
+        QThreadPool.globalInstance().start(task)
+
+    def end_export(self):
+        """导出结束后的清理"""
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+        self.export_task = None
+        self.ics_button.setEnabled(True)
+        for name in self.invalid_course_names:
+            self.warn_invalid_course_time(name)
+
+    def stop_export(self):
+        """取消正在后台运行的导出并等待线程结束，目标文件保持不变（用于关闭窗口）"""
+        task = self.export_task
+        if task is None:
             return
-
-        for week in task_weeks:
-            event_date = semester_start + timedelta(weeks=week - 1, days=day)
-            start_datetime = datetime.combine(event_date, start_time)
-            end_datetime = datetime.combine(event_date, end_time)
-
-            event = Event()
-            event.add('dtstart', start_datetime)
-            event.add('dtend', end_datetime)
-            event.add('summary', course['name'])
-            event.add('location', course['location'])
-            duration_minutes = (end_datetime - start_datetime).seconds // 60
-            event.add('description', f"持续时间: {duration_minutes} 分钟\n周数: {week}")
-
-            alarm = Alarm()
-            alarm.add('action', 'DISPLAY')
-            alarm.add('description', f"课程 {course['name']} 即将开始")
-            alarm.add('trigger', timedelta(minutes=-30))
-            event.add_component(alarm)
-
-            cal.add_component(event)
-
-    def get_course_times(self, course):
-        """获取课程的开始和结束时间"""
-        try:
-            start_time = datetime.strptime(course['start_time'], "%H:%M").time()
-            end_time = datetime.strptime(course['end_time'], "%H:%M").time()
-            return start_time, end_time
-        except ValueError:
-            QMessageBox.warning(self, "错误", f"课程 {course['name']} 的时间格式错误，请检查节次时间配置。")
-            return None, None
-
-    def save_ics_file(self, cal):
-        """保存 ICS 文件"""
-        try:
-            # 使用 QFileDialog 让用户选择保存位置
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "保存 ICS 文件",
-                os.path.expanduser("~/course_schedule.ics"),
-                "ICS Files (*.ics)"
-            )
-            if not file_path:
-                return  # 用户取消保存
-
-            with open(file_path, 'wb') as f:
-                f.write(cal.to_ical())
-
-            QMessageBox.information(self, "成功", f"ICS 文件已生成！路径：{file_path}")
-
-            # 保存成功后，更新保存的文件路径
-            self.ics_file_path = file_path
-
-            # 启用“打开文件夹”按钮
-            self.open_folder_button.setEnabled(True)
-
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"生成 ICS 文件失败: {e}")
+        # 先断开信号，排队中的进度、结束通知不再发给即将销毁的窗口
+        signals = task.signals
+        for signal in (signals.progress, signals.invalid_course, signals.finished, signals.failed, signals.cancelled):
+            signal.disconnect()
+        task.cancel()
+        QThreadPool.globalInstance().waitForDone()
+        self.export_progress.canceled.disconnect()
+        self.export_progress.close()
+        self.export_task = None
+        self.ics_button.setEnabled(True)
+
+    def on_export_finished(self, file_path, result):
+        """后台导出完成，result 为 ics_feed.FeedResult"""
+        self.end_export()
+        message = f"ICS 文件已生成！路径：{file_path}\n相对上次导出：{result.describe()}"
+        if result.update_path:
+            message += f"\n增量更新文件：{result.update_path}"
+        QMessageBox.information(self, "成功", message)
+
+        # 保存成功后，更新保存的文件路径
+        self.ics_file_path = file_path
+
+        # 启用“打开文件夹”按钮
+        self.open_folder_button.setEnabled(True)
+
+    def on_export_failed(self, message):
+        """后台导出失败"""
+        self.end_export()
+        QMessageBox.warning(self, "错误", f"生成 ICS 文件失败: {message}")
+
+    def on_export_cancelled(self):
+        """后台导出被取消，目标文件保持不变"""
+        self.end_export()
 
     def open_folder(self):
         """打开包含 ICS 文件的文件夹"""
@@ -604,8 +754,8 @@ class MainWindow(QMainWindow):
     def save_courses_to_json(self):
         """将课程信息保存到 JSON 文件"""
         try:
-            with open('courses.json', 'w', encoding='utf-8') as f:
-                json.dump(self.courses, f, ensure_ascii=False, indent=4)
+            with operation('save_courses_to_json'), atomic_open('courses.json', 'w', encoding='utf-8') as f:
+                json.dump([course.to_dict() for course in self.courses], f, ensure_ascii=False, indent=4)
             QMessageBox.information(self, "成功", "课程信息已保存到 courses.json")
         except Exception as e:
             QMessageBox.warning(self, "错误", f"保存课程信息失败: {e}")
@@ -613,38 +763,491 @@ class MainWindow(QMainWindow):
     def load_courses_from_json(self):
         """从 JSON 文件加载课程信息"""
         try:
-            with open('courses.json', 'r', encoding='utf-8') as f:
-                self.courses = json.load(f)
-            self.refresh_table()
+            with operation('load_courses_from_json'), self.batch_update():
+                with open('courses.json', 'r', encoding='utf-8') as f:
+                    self.courses.reset(Course.from_dict(data) for data in json.load(f))
+                self.commit_course_changes()
             QMessageBox.information(self, "成功", "课程信息已从 courses.json 加载")
         except FileNotFoundError:
             QMessageBox.warning(self, "错误", "文件 courses.json 不存在。")
         except Exception as e:
             QMessageBox.warning(self, "错误", f"加载课程信息失败: {e}")
 
+    def import_courses_from_csv(self):
+        """从教务系统导出的 CSV 中导入一个班级的课程，替换当前课表"""
+        file_path, _ = QFileDialog.getOpenFileName(self, "导入教务 CSV", os.path.expanduser("~"), "CSV Files (*.csv)")
+        if not file_path:
+            return
+
+        from csv_import import ImportReport, import_into_store, scan_class_names
+        # 教务系统导出的文件常见 UTF-8（带 BOM）或 GBK 编码
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                with open(file_path, 'r', encoding=encoding, newline='') as f:
+                    class_names = scan_class_names(f)
+                break
+            except UnicodeDecodeError:
+                continue
+            except Exception as e:
+                QMessageBox.warning(self, "错误", f"读取 CSV 失败: {e}")
+                return
+        else:
+            QMessageBox.warning(self, "错误", "无法识别 CSV 文件的编码。")
+            return
+        if not class_names:
+            QMessageBox.information(self, "提示", "CSV 中没有课程。")
+            return
+
+        class_name = class_names[0]
+        if len(class_names) > 1:
+            class_name, ok = QInputDialog.getItem(self, "导入教务 CSV", "选择班级:", class_names, 0, False)
+            if not ok:
+                return
+
+        report = ImportReport(max_errors=10)
+        try:
+            with self.batch_update():
+                try:
+                    with open(file_path, 'r', encoding=encoding, newline='') as f:
+                        self.courses.clear()
+                        import_into_store(f, self.courses, self.periods, class_name, report)
+                finally:
+                    self.commit_course_changes()  # 导入中途失败时也显示已导入的部分
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"导入 CSV 失败: {e}")
+            return
+        self.current_schedule = (class_name, self.current_schedule[1])
+
+        message = report.summary()
+        if report.errors:
+            details = '\n'.join(f"第 {line} 行：{reason}" for line, reason, _ in report.errors)
+            message += f"\n\n{details}"
+            if report.error_count > len(report.errors):
+                message += f"\n……另有 {report.error_count - len(report.errors)} 行错误"
+            QMessageBox.warning(self, "导入完成", message)
+        else:
+            QMessageBox.information(self, "导入完成", message)
+
+    def save_courses_to_database(self):
+        """将当前课表保存到 SQLite 课表库中的 (班级, 学期)"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "保存到课表库",
+            self.settings.value("database_path", os.path.expanduser("~/schedules.db")),
+            "课表库 (*.db)",
+            options=QFileDialog.Option.DontConfirmOverwrite
+        )
+        if not file_path:
+            return
+        class_name, ok = QInputDialog.getText(self, "保存到课表库", "班级:", text=self.current_schedule[0])
+        if not ok or not class_name.strip():
+            return
+        semester, ok = QInputDialog.getText(self, "保存到课表库", "学期:", text=self.current_schedule[1])
+        if not ok or not semester.strip():
+            return
+
+        from schedule_db import ScheduleDatabase
+        try:
+            with ScheduleDatabase(file_path) as db:
+                db.save_schedule(class_name.strip(), semester.strip(), self.courses,
+                                 self.first_day_edit.date().toPython())
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"保存到课表库失败: {e}")
+            return
+        self.settings.setValue("database_path", file_path)
+        self.current_schedule = (class_name.strip(), semester.strip())
+        QMessageBox.information(self, "成功", f"课表已保存到课表库：{semester.strip()} {class_name.strip()}")
+
+    def load_courses_from_database(self):
+        """从 SQLite 课表库中选择一份课表打开"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "从课表库打开",
+            self.settings.value("database_path", os.path.expanduser("~")),
+            "课表库 (*.db)"
+        )
+        if not file_path:
+            return
+
+        from schedule_db import ScheduleDatabase
+        try:
+            with ScheduleDatabase(file_path) as db:
+                schedules = db.list_schedules()
+                if not schedules:
+                    QMessageBox.information(self, "提示", "课表库中没有课表。")
+                    return
+                labels = [f"{semester} / {class_name}" for class_name, semester, _, _ in schedules]
+                selected_label, ok = QInputDialog.getItem(self, "从课表库打开", "选择课表:", labels, 0, False)
+                if not ok:
+                    return
+                class_name, semester = schedules[labels.index(selected_label)][:2]
+                courses, semester_start = db.load_schedule(class_name, semester)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"读取课表库失败: {e}")
+            return
+        self.settings.setValue("database_path", file_path)
+        self.current_schedule = (class_name, semester)
+        with self.batch_update():
+            self.courses.reset(courses)
+            if semester_start is not None:
+                self.first_day_edit.setDate(QDate(semester_start))
+            self.commit_course_changes()
+
+    def build_room_index(self):
+        """汇总课表库中同一学期的课表和当前课表，返回教室占用索引"""
+        from room_index import RoomIndex, build_from_database
+        class_name, semester = self.current_schedule
+        db_path = self.settings.value("database_path")
+        if semester and db_path and os.path.exists(db_path):
+            key = (db_path, os.path.getmtime(db_path), class_name, semester)
+            if key != self.room_index_key:
+                from schedule_db import ScheduleDatabase
+                with ScheduleDatabase(db_path) as db:
+                    self.room_index = build_from_database(db, semester)
+                self.room_index_key = key
+        else:
+            self.room_index, self.room_index_key = RoomIndex(), None
+        # 当前课表可能已修改，以界面中的课程替换课表库中的版本
+        label = class_name or "当前课表"
+        self.room_index.remove_schedule(label)
+        self.room_index.add_schedule(label, self.courses)
+        return self.room_index
+
+    def show_free_rooms(self):
+        """列出选中单元格在指定周空闲的教室"""
+        index = self.table.currentIndex()
+        if not index.isValid() or index.column() == 0:
+            QMessageBox.warning(self, "提示", "请先选择一个课程单元格。")
+            return
+        week, ok = QInputDialog.getInt(self, "查找空闲教室", "第几周:", 1, 1, 60)
+        if not ok:
+            return
+        try:
+            rooms = self.build_room_index().free_rooms(index.column() - 1, index.row(), week)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"建立教室占用索引失败: {e}")
+            return
+        slot = f"{HEADERS[index.column()]}{self.periods[index.row()].name}，第 {week} 周"
+        if rooms:
+            QMessageBox.information(self, "空闲教室", f"{slot}空闲的教室（共 {len(rooms)} 个）：\n{'、'.join(rooms)}")
+        else:
+            QMessageBox.information(self, "空闲教室", f"{slot}没有空闲的教室。")
+
+    def show_room_collisions(self):
+        """列出当前课表与课表库中同学期课表之间的教室重复预订"""
+        try:
+            collisions = self.build_room_index().collisions()
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"建立教室占用索引失败: {e}")
+            return
+        if not collisions:
+            QMessageBox.information(self, "教室冲突", "没有发现教室冲突。")
+            return
+        details = '\n'.join(collision.describe() for collision in collisions[:50])
+        if len(collisions) > 50:
+            details += f"\n……另有 {len(collisions) - 50} 处"
+        QMessageBox.warning(self, "教室冲突", f"共发现 {len(collisions)} 处教室冲突：\n\n{details}")
+
+    def undo_edit(self):
+        """撤销最近一次编辑，只刷新受影响的单元格"""
+        with operation('undo'), self.batch_update():
+            label = self.history.undo()
+            if label is not None:
+                self.commit_course_changes()
+        self.statusBar().showMessage(f"已撤销：{label}" if label else "没有可撤销的操作", 3000)
+
+    def redo_edit(self):
+        """重做最近撤销的编辑，只刷新受影响的单元格"""
+        with operation('redo'), self.batch_update():
+            label = self.history.redo()
+            if label is not None:
+                self.commit_course_changes()
+        self.statusBar().showMessage(f"已重做：{label}" if label else "没有可重做的操作", 3000)
+
+    @contextmanager
+    def batch_update(self, label=None):
+        """批量编辑：期间表格不重绘，commit_course_changes 和各种刷新都推迟到最外层结束时合并为一次，
+        每个变化的行只调整一次行高；label 给出时这些修改作为一次编辑记入撤销历史。可以嵌套。
+
+        脚本中成批修改课程时，例如：
+            with window.batch_update("批量调课"):
+                for course in courses:
+                    window.courses.update(course, location=new_location)
+                    window.commit_course_changes()
+        """
+        self.batch_depth += 1
+        if self.batch_depth == 1:
+            self.table.setUpdatesEnabled(False)
+        try:
+            with self.history.command(label) if label else nullcontext():
+                yield
+        finally:
+            self.batch_depth -= 1
+            if not self.batch_depth:
+                pending, self.batch_pending = self.batch_pending, set()
+                try:
+                    # 整表刷新已包含变化的单元格
+                    if 'table' in pending:
+                        self.refresh_table()
+                    elif pending:
+                        self.refresh_dirty_cells()
+                    if 'commit' in pending:
+                        self.autosaver.schedule()
+                finally:
+                    self.table.setUpdatesEnabled(True)
+
+    def defer_refresh(self, kind):
+        """在批量编辑中记下结束时需要的刷新，返回是否已推迟"""
+        if not self.batch_depth:
+            return False
+        self.batch_pending.add(kind)
+        return True
+
+    def commit_course_changes(self):
+        """课程数据变化后调用：刷新变化的单元格并安排自动保存"""
+        if self.defer_refresh('commit'):
+            return
+        self.refresh_dirty_cells()
+        self.autosaver.schedule()
+
+    def choose_autosave_path(self):
+        """选择自动保存文件的位置"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "自动保存位置",
+            self.autosaver.path,
+            "JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        self.settings.setValue("autosave_path", file_path)
+        self.autosaver.set_path(file_path)
+        self.autosaver.save_now()
+
+    def current_holidays(self):
+        """当前使用的节假日与调休表，未设置或读取失败时返回 None"""
+        path = self.settings.value("holidays_path")
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if self.holidays_cache is None or self.holidays_cache[:2] != (path, mtime):
+                from holiday_calendar import load_holidays
+                self.holidays_cache = (path, mtime, load_holidays(path))
+        except (OSError, ValueError) as e:
+            self.statusBar().showMessage(f"读取节假日表失败，导出时不跳过节假日: {e}", 5000)
+            return None
+        return self.holidays_cache[2]
+
+    def choose_holidays_file(self):
+        """选择导出时使用的节假日与调休表，已设置时可以更换或停用"""
+        current = self.settings.value("holidays_path")
+        if current:
+            box = QMessageBox(QMessageBox.Icon.Question, "节假日与调休表", f"当前使用：{current}", parent=self)
+            replace_button = box.addButton("更换…", QMessageBox.ButtonRole.AcceptRole)
+            remove_button = box.addButton("不再使用", QMessageBox.ButtonRole.DestructiveRole)
+            box.addButton(QMessageBox.StandardButton.Cancel)
+            box.exec()
+            if box.clickedButton() == remove_button:
+                self.settings.remove("holidays_path")
+                self.holidays_cache = None
+                self.statusBar().showMessage("导出时不再跳过节假日", 3000)
+                self.schedule_feed_update()
+                return
+            if box.clickedButton() != replace_button:
+                return
+
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "选择节假日与调休表",
+            os.path.dirname(current) if current else "",
+            "JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        from holiday_calendar import load_holidays
+        try:
+            holidays = load_holidays(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "错误", f"读取节假日表失败: {e}")
+            return
+        self.settings.setValue("holidays_path", file_path)
+        self.holidays_cache = None
+        self.statusBar().showMessage(
+            f"已使用节假日表：{len(holidays.skip)} 个放假日，{len(holidays.makeup)} 个调休上课日", 5000
+        )
+        self.schedule_feed_update()
+
+    def offer_autosave_restore(self):
+        """启动时如果存在自动保存的课程，询问是否恢复"""
+        if self.courses or not os.path.exists(self.autosaver.path):
+            return
+        try:
+            courses = load_autosave(self.autosaver.path)
+        except Exception as e:
+            QMessageBox.warning(self, "错误", f"读取自动保存的课程失败: {e}")
+            return
+        if not courses:
+            return
+        answer = QMessageBox.question(
+            self, "恢复课程", f"发现上次自动保存的 {len(courses)} 门课程，是否恢复？"
+        )
+        if answer == QMessageBox.StandardButton.Yes:
+            with self.batch_update():
+                self.courses.reset(courses)
+                self.refresh_dirty_cells()
+
+    def toggle_ics_server(self):
+        """启动本地日历订阅服务；已在运行时显示订阅地址并询问是否停止"""
+        if self.ics_server is not None:
+            answer = QMessageBox.question(
+                self, "日历订阅服务", f"订阅服务正在运行：\n{self.ics_feed_url}\n\n是否停止？"
+            )
+            if answer == QMessageBox.StandardButton.Yes:
+                self.ics_server.stop()
+                self.ics_server = self.ics_feed = None
+                self.statusBar().showMessage("日历订阅服务已停止", 3000)
+            return
+
+        from ics_server import DEFAULT_HOST, DEFAULT_PORT, CalendarFeed, IcsServer, lan_address
+        choices = ["仅本机（127.0.0.1）", "局域网（0.0.0.0）"]
+        choice, ok = QInputDialog.getItem(self, "日历订阅服务", "允许访问的范围:", choices, 0, False)
+        if not ok:
+            return
+        host = DEFAULT_HOST if choice == choices[0] else '0.0.0.0'
+        port, ok = QInputDialog.getInt(self, "日历订阅服务", "端口:",
+                                       int(self.settings.value("ics_server_port", DEFAULT_PORT)), 1, 65535)
+        if not ok:
+            return
+        try:
+            server = IcsServer(host, port)
+        except OSError as e:
+            QMessageBox.warning(self, "错误", f"启动订阅服务失败: {e}")
+            return
+        self.settings.setValue("ics_server_port", port)
+
+        name = self.current_schedule[0] or "课表"
+        self.ics_feed = server.add_feed(name, CalendarFeed())
+        self.push_feed_update()
+        server.start()
+        self.ics_server = server
+        self.ics_feed_url = server.url_for(name, lan_address() if host == '0.0.0.0' else None)
+        QApplication.clipboard().setText(self.ics_feed_url)
+        QMessageBox.information(
+            self, "日历订阅服务",
+            f"订阅地址（已复制到剪贴板）：\n{self.ics_feed_url}\n\n"
+            "在日历客户端中添加该地址的订阅后，课表的修改会在客户端下次刷新时自动同步。"
+        )
+
+    def schedule_feed_update(self):
+        """课程数据、学期开始日期或导出模式变化后，延迟推送给订阅服务"""
+        if self.ics_feed is not None:
+            self.feed_timer.start()
+
+    def push_feed_update(self):
+        """把当前课程的快照推送给订阅服务，客户端下次请求时重新生成"""
+        if self.ics_feed is None:
+            return
+        from ics_generator import MODE_RRULE, MODE_EXPANDED
+        mode = MODE_RRULE if self.rrule_checkbox.isChecked() else MODE_EXPANDED
+        with operation('feed_update'):
+            self.ics_feed.update(self.courses, self.first_day_edit.date().toPython(), mode, self.current_holidays())
+
+    def closeEvent(self, event):
+        """退出前保存尚未保存的编辑，取消并等待正在进行的导出，停止订阅服务"""
+        self.autosaver.flush()
+        self.stop_export()
+        if self.operation_finished.emit in metrics.listeners:
+            metrics.listeners.remove(self.operation_finished.emit)
+        if self.ics_server is not None:
+            self.ics_server.stop()
+            self.ics_server = self.ics_feed = None
+        super().closeEvent(event)
+
     def refresh_table(self):
-        """刷新表格显示"""
-        # 仅清除课程数据，保留节次列（第一列）
-        for row in range(self.table.rowCount()):
-            for column in range(1, self.table.columnCount()):
-                self.table.setItem(row, column, None)
-
-        for row, period in enumerate(self.periods):
-            # 更新节次列的显示（防止时间修改后未更新）
-            item = QTableWidgetItem(period)
-            item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-            self.table.setItem(row, 0, item)
-
-        for course in self.courses:
-            row = course['period']
-            column = course['day'] + 1
-            weeks_str = format_weeks(course['weeks'])
-            new_text = f"{course['name']}({course['location']})\n周数: {weeks_str}"
-            current_item = self.table.item(row, column)
-            if current_item and current_item.text():
-                new_text = f"{current_item.text()}\n{new_text}"
-            item = QTableWidgetItem(new_text)
-            item.setTextAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-            self.table.setItem(row, column, item)
+        """刷新整个表格显示（节次列和所有课程单元格）"""
+        if self.defer_refresh('table'):
+            return
+        with operation('refresh_table'):
+            self.courses.take_dirty()
+            self.conflicts.take_changed()
+            self.model.refresh_all()
+            self.table.resizeRowsToContents()
+            rows = self.model.rowCount()
+            count(CELLS_REBUILT, rows * (self.model.columnCount() - 1))
+            count(ROWS_RESIZED, rows)
+        self.update_conflict_label()
+        self.update_week_range()
+        self.schedule_feed_update()
+
+    def refresh_dirty_cells(self):
+        """只刷新自上次刷新以来发生变化的单元格（包括冲突状态变化的单元格）"""
+        if self.defer_refresh('cells'):
+            return
+        with operation('refresh_dirty_cells'):
+            self.refresh_cells(self.courses.take_dirty() | self.conflicts.take_changed())
+        self.update_conflict_label()
+        self.update_week_range()
+        self.schedule_feed_update()
+
+    def update_week_range(self):
+        """周次选择的范围随课程的最大周次扩展"""
+        self.week_spin.setMaximum(max(20, self.week_index.max_week(), self.week_spin.value()))
+
+    def update_conflict_label(self):
+        """在状态栏显示冲突数量"""
+        count = len(self.conflicts)
+        self.conflict_label.setText(f"时间冲突：{count} 处" if count else "")
+
+    def show_operation_record(self, record):
+        """在状态栏显示最近一次被计时的操作"""
+        self.perf_label.setText(record.describe())
+
+    def show_metrics(self):
+        """显示各操作的累计耗时，可以清空统计或开始、停止 cProfile 记录"""
+        text = metrics.describe() or "还没有记录到操作。"
+        if metrics.profile_dir:
+            text += f"\n\n正在记录 cProfile 到：{metrics.profile_dir}"
+        box = QMessageBox(QMessageBox.Icon.Information, "性能统计", text, parent=self)
+        profile_button = box.addButton("停止记录" if metrics.profile_dir else "记录 cProfile…",
+                                       QMessageBox.ButtonRole.ActionRole)
+        reset_button = box.addButton("清空统计", QMessageBox.ButtonRole.ResetRole)
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() == reset_button:
+            metrics.reset()
+            self.perf_label.clear()
+        elif box.clickedButton() == profile_button:
+            if metrics.profile_dir:
+                self.statusBar().showMessage(f"cProfile 记录已保存在 {metrics.profile_dir}", 5000)
+                metrics.set_profile_dir(None)
+                return
+            directory = QFileDialog.getExistingDirectory(self, "选择 cProfile 记录的保存位置", os.path.expanduser("~"))
+            if not directory:
+                return
+            try:
+                metrics.set_profile_dir(directory)
+            except OSError as e:
+                QMessageBox.warning(self, "错误", f"无法使用该目录: {e}")
+                return
+            self.statusBar().showMessage("之后的每个操作都会写入一个 .prof 文件", 5000)
+
+    def show_conflicts(self):
+        """列出所有时间冲突"""
+        conflicts = self.conflicts.conflicts()
+        if not conflicts:
+            QMessageBox.information(self, "时间冲突", "没有发现时间冲突。")
+            return
+        conflicts.sort(key=lambda c: (c.first.day, c.first.start_time, c.second.start_time))
+        details = '\n'.join(conflict.describe() for conflict in conflicts[:50])
+        if len(conflicts) > 50:
+            details += f"\n……另有 {len(conflicts) - 50} 处"
+        QMessageBox.warning(self, "时间冲突", f"共发现 {len(conflicts)} 处时间冲突：\n\n{details}")
+
+    def refresh_cells(self, cells):
+        """刷新指定的 (星期, 节次) 单元格，每行最多调整一次行高"""
+        rows = self.model.cells_changed(cells)
+        for row in rows:
             self.table.resizeRowToContents(row)
+        count(CELLS_REBUILT, len(cells))
+        count(ROWS_RESIZED, len(rows))
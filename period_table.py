@@ -0,0 +1,119 @@
+"""
+===========================
+@Time : 2026/10/19 上午11:00
+@Author : Entropy.Xu
+@File : period_table.py
+@Software: PyCharm
+============================
+"""
+# period_table.py
+# 节次时间表：节次时间只在创建或修改时解析和校验一次，以 datetime.time 保存，
+# 界面上显示的 "第一节\n8:20-9:05" 字符串由它生成。
+from datetime import datetime, time
+from functools import lru_cache
+
+DEFAULT_PERIODS = [
+    ("第一节", "8:20", "9:05"),
+    ("第二节", "9:10", "9:55"),
+    ("第三节", "10:15", "11:00"),
+    ("第四节", "11:05", "11:50"),
+    ("第五节", "11:55", "12:25"),
+    ("第六节", "12:30", "13:00"),
+    ("第七节", "13:10", "13:55"),
+    ("第八节", "14:00", "14:45"),
+    ("第九节", "15:05", "15:50"),
+    ("第十节", "15:55", "16:40"),
+    ("第十一节", "18:00", "18:45"),
+    ("第十二节", "18:50", "19:35"),
+    ("第十三节", "19:40", "20:25"),
+]
+
+
+@lru_cache(maxsize=1024)
+def _parse_time_text(text):
+    return datetime.strptime(text, "%H:%M").time()
+
+
+def parse_time(time_str):
+    """解析 HH:MM 格式的时间，格式错误时抛出 ValueError（课表中的时间字符串高度重复，结果会缓存）"""
+    return _parse_time_text(time_str.strip())
+
+
+def parse_time_or_none(time_str):
+    """解析 HH:MM 格式的时间，格式错误或为空时返回 None"""
+    try:
+        return parse_time(time_str)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def format_time(value):
+    """格式化时间为 H:MM（与节次显示一致，小时不补零）"""
+    if value is None:
+        return None
+    return f"{value.hour}:{value.minute:02d}"
+
+
+class Period:
+    """单个节次：名称、开始时间和结束时间"""
+
+    __slots__ = ('name', 'start', 'end', 'display')
+
+    def __init__(self, name, start, end):
+        if not isinstance(start, time) or not isinstance(end, time):
+            raise TypeError("节次时间必须是 datetime.time")
+        if end <= start:
+            raise ValueError(f"{name}的结束时间必须晚于开始时间")
+        self.name = name
+        self.start = start
+        self.end = end
+        self.display = f"{name}\n{format_time(start)}-{format_time(end)}"
+
+    @property
+    def duration_minutes(self):
+        """节次时长（分钟）"""
+        return (self.end.hour * 60 + self.end.minute) - (self.start.hour * 60 + self.start.minute)
+
+
+class PeriodTable:
+    """节次时间表，按行号（从 0 开始）访问"""
+
+    def __init__(self, periods):
+        self._periods = list(periods)
+
+    @classmethod
+    def default(cls):
+        """默认的十三节课时间表"""
+        return cls(Period(name, parse_time(start), parse_time(end)) for name, start, end in DEFAULT_PERIODS)
+
+    @classmethod
+    def from_strings(cls, period_strings):
+        """从 "第一节\\n8:20-9:05" 格式的字符串列表创建，格式错误时抛出 ValueError"""
+        periods = []
+        for period_str in period_strings:
+            name, time_range = period_str.split('\n')
+            start_str, end_str = time_range.split('-')
+            periods.append(Period(name, parse_time(start_str), parse_time(end_str)))
+        return cls(periods)
+
+    def __len__(self):
+        return len(self._periods)
+
+    def __getitem__(self, row):
+        return self._periods[row]
+
+    def __iter__(self):
+        return iter(self._periods)
+
+    def display(self, row):
+        """节次列中显示的文本"""
+        return self._periods[row].display
+
+    def times(self, row):
+        """返回节次的 (开始时间, 结束时间)"""
+        period = self._periods[row]
+        return period.start, period.end
+
+    def set_time(self, row, start, end):
+        """修改节次时间，时间不合法时抛出 ValueError"""
+        self._periods[row] = Period(self._periods[row].name, start, end)
@@ -0,0 +1,208 @@
+"""
+===========================
+@Time : 2026/10/21 下午3:00
+@Author : Entropy.Xu
+@File : room_index.py
+@Software: PyCharm
+============================
+"""
+# room_index.py
+# 教室占用索引：汇总多份课表，为每个教室的每个 (星期, 节次) 保存一个周数位掩码，
+# "某周某节哪些教室空闲" 只需对每个教室做一次位运算；重复预订在加入时即可发现。
+# 命令行用法，例如：
+#   python room_index.py --db schedules.db --semester 2024秋             # 列出教室冲突
+#   python room_index.py --db schedules.db --semester 2024秋 --free 1 3 5  # 星期一第 3 节第 5 周的空闲教室
+#   python room_index.py courses/*.json
+import argparse
+import os
+import sys
+
+from conflicts import WEEKDAY_NAMES
+from utils import format_weeks
+
+
+class RoomCollision:
+    """同一教室、同一 (星期, 节次) 在相同的周被多份课表预订"""
+
+    __slots__ = ('room', 'day', 'period', 'weeks_mask', 'bookings')
+
+    def __init__(self, room, day, period, weeks_mask, bookings):
+        self.room = room
+        self.day = day
+        self.period = period
+        self.weeks_mask = weeks_mask
+        self.bookings = bookings  # [(课表名称, 课程), ...]
+
+    def __repr__(self):
+        return f"RoomCollision({self.room!r}, day={self.day}, period={self.period}, weeks={format_weeks(self.weeks_mask)})"
+
+    def describe(self):
+        """冲突的文字描述"""
+        names = '、'.join(f"{schedule} {course.name}" for schedule, course in self.bookings)
+        return (f"{self.room} {WEEKDAY_NAMES[self.day]}第 {self.period + 1} 节，"
+                f"第 {format_weeks(self.weeks_mask)} 周：{names}")
+
+
+class RoomIndex:
+    """按教室、(星期, 节次) 保存周数位掩码的占用索引"""
+
+    def __init__(self):
+        self._masks = {}      # (day, period) -> {room: 已占用周的位掩码}
+        self._bookings = {}   # (room, day, period) -> [(课表名称, 课程), ...]
+        self._schedules = {}  # 课表名称 -> [(room, day, period), ...]
+        self._room_counts = {}  # room -> 预订数
+        self._collisions = set()  # 可能存在冲突的 (room, day, period)
+
+    def __len__(self):
+        return sum(self._room_counts.values())
+
+    @staticmethod
+    def room_of(course):
+        """课程的教室名称，未填写地点时返回空字符串"""
+        return course.location.strip()
+
+    def add(self, schedule, course):
+        """加入一门课程的预订，schedule 为课表名称（如班级名）"""
+        room = self.room_of(course)
+        if not room:
+            return
+        slot = (course.day, course.period)
+        key = (room, course.day, course.period)
+        rooms = self._masks.setdefault(slot, {})
+        occupied = rooms.get(room, 0)
+        if occupied & course.weeks_mask:
+            self._collisions.add(key)
+        rooms[room] = occupied | course.weeks_mask
+        self._bookings.setdefault(key, []).append((schedule, course))
+        self._schedules.setdefault(schedule, []).append(key)
+        self._room_counts[room] = self._room_counts.get(room, 0) + 1
+
+    def add_schedule(self, schedule, courses):
+        """加入一份课表的所有课程"""
+        for course in courses:
+            self.add(schedule, course)
+
+    def add_many(self, items):
+        """加入 (课表名称, 课程) 序列，例如 ScheduleDatabase.iter_courses() 的结果"""
+        for schedule, course in items:
+            self.add(schedule, course)
+
+    def remove_schedule(self, schedule):
+        """移除一份课表的所有预订，只重新计算受影响的单元格"""
+        for key in set(self._schedules.pop(schedule, ())):
+            room, day, period = key
+            bookings = [b for b in self._bookings[key] if b[0] != schedule]
+            self._room_counts[room] -= len(self._bookings[key]) - len(bookings)
+            if not self._room_counts[room]:
+                del self._room_counts[room]
+            rooms = self._masks[(day, period)]
+            if bookings:
+                self._bookings[key] = bookings
+                seen = double = 0
+                for _, course in bookings:
+                    double |= seen & course.weeks_mask
+                    seen |= course.weeks_mask
+                rooms[room] = seen
+                if not double:
+                    self._collisions.discard(key)
+            else:
+                del self._bookings[key]
+                del rooms[room]
+                self._collisions.discard(key)
+
+    def rooms(self):
+        """所有出现过的教室（按名称排序）"""
+        return sorted(self._room_counts)
+
+    def is_free(self, room, day, period, week):
+        """教室在第 week 周的 (星期, 节次) 是否空闲"""
+        return not self._masks.get((day, period), {}).get(room, 0) >> week & 1
+
+    def free_rooms(self, day, period, week, rooms=None):
+        """第 week 周 (星期, 节次) 空闲的教室，rooms 给出时只在其中查找"""
+        occupied = self._masks.get((day, period), {})
+        candidates = self._room_counts if rooms is None else rooms
+        return sorted(room for room in candidates if not occupied.get(room, 0) >> week & 1)
+
+    def occupancy(self, room, day, period):
+        """教室在 (星期, 节次) 被占用的周的位掩码"""
+        return self._masks.get((day, period), {}).get(room, 0)
+
+    def bookings(self, room, day, period):
+        """教室在 (星期, 节次) 的所有预订 [(课表名称, 课程), ...]"""
+        return list(self._bookings.get((room, day, period), ()))
+
+    def collisions(self, room=None):
+        """所有重复预订，每个 (教室, 星期, 节次) 一条，列出在冲突周上课的预订"""
+        result = []
+        for key in self._collisions:
+            if room is not None and key[0] != room:
+                continue
+            seen = double = 0
+            bookings = self._bookings[key]
+            for _, course in bookings:
+                double |= seen & course.weeks_mask
+                seen |= course.weeks_mask
+            if double:
+                result.append(RoomCollision(*key, double, [b for b in bookings if b[1].weeks_mask & double]))
+        result.sort(key=lambda c: (c.room, c.day, c.period))
+        return result
+
+
+def build_from_database(db, semester=None):
+    """从 schedule_db.ScheduleDatabase 中逐行读取课程建立索引，课表名称为班级名"""
+    index = RoomIndex()
+    index.add_many(db.iter_courses(semester))
+    return index
+
+
+def build_from_json_files(paths, index=None):
+    """从多个 courses.json 格式的文件建立（或补充）索引，课表名称为文件名"""
+    from ics_generator import load_courses
+
+    index = index if index is not None else RoomIndex()
+    for path in paths:
+        index.add_schedule(os.path.splitext(os.path.basename(path))[0], load_courses(path))
+    return index
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="检查多份课表之间的教室占用")
+    parser.add_argument('inputs', nargs='*', help="课程 JSON 文件")
+    parser.add_argument('--db', help="从 SQLite 课表库读取课表")
+    parser.add_argument('--semester', help="与 --db 一起使用，只检查该学期的课表")
+    parser.add_argument('--free', nargs=3, type=int, metavar=('DAY', 'PERIOD', 'WEEK'),
+                        help="列出星期 DAY（1-7）第 PERIOD 节在第 WEEK 周空闲的教室")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.db:
+        parser.error("请指定课程 JSON 文件或 --db 课表库")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.db:
+        from schedule_db import ScheduleDatabase
+
+        with ScheduleDatabase(args.db) as db:
+            index = build_from_database(db, args.semester)
+    else:
+        index = RoomIndex()
+    if args.inputs:
+        build_from_json_files(args.inputs, index)
+
+    if args.free:
+        day, period, week = args.free
+        for room in index.free_rooms(day - 1, period - 1, week):
+            print(room)
+        return 0
+
+    collisions = index.collisions()
+    for collision in collisions:
+        print(collision.describe())
+    print(f"共 {len(index.rooms())} 个教室，{len(index)} 条预订，{len(collisions)} 处教室冲突", file=sys.stderr)
+    return 1 if collisions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
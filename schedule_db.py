@@ -0,0 +1,272 @@
+"""
+===========================
+@Time : 2026/10/20 下午4:30
+@Author : Entropy.Xu
+@File : schedule_db.py
+@Software: PyCharm
+============================
+"""
+# schedule_db.py
+# 可选的 SQLite 课表库：一个数据库文件保存多个班级、多个学期的课表。
+# 按 (班级, 学期) 打开一份课表只是一次索引查询，无需解析整个文件；
+# 保存单份课表在一个事务中完成。只依赖标准库 sqlite3。
+# 命令行用法，例如：
+#   python schedule_db.py library.db import courses/*.json --semester 2024秋
+#   python schedule_db.py library.db list
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from course import Course
+from period_table import format_time, parse_time_or_none
+from utils import weeks_to_mask
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY,
+    class_name TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    semester_start TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_schedules_class_semester ON schedules (class_name, semester);
+
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    schedule_id INTEGER NOT NULL REFERENCES schedules (id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    weeks_mask INTEGER NOT NULL,
+    start_time TEXT,
+    end_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_courses_schedule ON courses (schedule_id);
+CREATE INDEX IF NOT EXISTS idx_courses_slot ON courses (day, period);
+CREATE INDEX IF NOT EXISTS idx_courses_location ON courses (location);
+"""
+
+COURSE_COLUMNS = "day, period, name, location, weeks_mask, start_time, end_time"
+
+
+def course_row(schedule_id, course):
+    """课程转换为 courses 表的一行"""
+    return (schedule_id, course.day, course.period, course.name, course.location, course.weeks_mask,
+            format_time(course.start_time), format_time(course.end_time))
+
+
+def json_course_row(schedule_id, data):
+    """courses.json 中的字典直接转换为一行，不经过 Course 对象"""
+    return (schedule_id, data['day'], data['period'], data['name'], data.get('location', ''),
+            weeks_to_mask(data.get('weeks', ())),
+            format_time(parse_time_or_none(data.get('start_time'))),
+            format_time(parse_time_or_none(data.get('end_time'))))
+
+
+def row_course(row):
+    """courses 表的一行转换为课程"""
+    day, period, name, location, weeks_mask, start_time, end_time = row
+    return Course(day, period, name, location, weeks_mask, parse_time_or_none(start_time), parse_time_or_none(end_time))
+
+
+class ScheduleDatabase:
+    """按 (班级, 学期) 存取课表的 SQLite 课表库"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def list_schedules(self, class_name=None, semester=None):
+        """列出课表，返回 [(班级, 学期, 学期开始日期, 更新时间), ...]，可按班级或学期筛选"""
+        conditions, params = [], []
+        if class_name is not None:
+            conditions.append("class_name = ?")
+            params.append(class_name)
+        if semester is not None:
+            conditions.append("semester = ?")
+            params.append(semester)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT class_name, semester, semester_start, updated_at FROM schedules{where} "
+            "ORDER BY semester, class_name",
+            params,
+        )
+        return [(name, term, date.fromisoformat(start) if start else None, updated)
+                for name, term, start, updated in rows]
+
+    def schedule_id(self, class_name, semester):
+        """查找课表的 id，不存在时返回 None"""
+        row = self.conn.execute(
+            "SELECT id FROM schedules WHERE class_name = ? AND semester = ?", (class_name, semester)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _replace_schedule(self, class_name, semester, semester_start, rows):
+        """在当前事务中写入一份课表，rows 为以 schedule_id 为参数生成行的可迭代对象"""
+        start = semester_start.isoformat() if semester_start else None
+        schedule_id = self.schedule_id(class_name, semester)
+        if schedule_id is None:
+            schedule_id = self.conn.execute(
+                "INSERT INTO schedules (class_name, semester, semester_start, updated_at) VALUES (?, ?, ?, ?)",
+                (class_name, semester, start, time.time()),
+            ).lastrowid
+        else:
+            self.conn.execute(
+                "UPDATE schedules SET semester_start = COALESCE(?, semester_start), updated_at = ? WHERE id = ?",
+                (start, time.time(), schedule_id),
+            )
+            self.conn.execute("DELETE FROM courses WHERE schedule_id = ?", (schedule_id,))
+        self.conn.executemany(
+            f"INSERT INTO courses (schedule_id, {COURSE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows(schedule_id),
+        )
+        return schedule_id
+
+    def save_schedule(self, class_name, semester, courses, semester_start=None):
+        """在一个事务中保存（覆盖）一份课表，返回课表 id"""
+        with self.conn:
+            return self._replace_schedule(
+                class_name, semester, semester_start,
+                lambda schedule_id: (course_row(schedule_id, course) for course in courses),
+            )
+
+    def load_schedule(self, class_name, semester):
+        """读取一份课表，返回 (课程列表, 学期开始日期)；课表不存在时抛出 KeyError"""
+        row = self.conn.execute(
+            "SELECT id, semester_start FROM schedules WHERE class_name = ? AND semester = ?",
+            (class_name, semester),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"课表不存在：{class_name} {semester}")
+        schedule_id, start = row
+        rows = self.conn.execute(
+            f"SELECT {COURSE_COLUMNS} FROM courses WHERE schedule_id = ? ORDER BY id", (schedule_id,)
+        )
+        return [row_course(r) for r in rows], date.fromisoformat(start) if start else None
+
+    def delete_schedule(self, class_name, semester):
+        """删除一份课表及其课程，返回是否存在"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM schedules WHERE class_name = ? AND semester = ?", (class_name, semester)
+            )
+        return cursor.rowcount > 0
+
+    def _iter_courses(self, condition, params, semester):
+        """跨课表逐行查询课程，产出 (班级, 课程)"""
+        columns = ', '.join(f"c.{column}" for column in COURSE_COLUMNS.split(', '))
+        sql = (f"SELECT s.class_name, {columns} FROM courses c "
+               f"JOIN schedules s ON s.id = c.schedule_id WHERE {condition}")
+        params = list(params)
+        if semester is not None:
+            sql += " AND s.semester = ?"
+            params.append(semester)
+        for row in self.conn.execute(sql, params):
+            yield row[0], row_course(row[1:])
+
+    def iter_courses(self, semester=None):
+        """逐行产出所有课表（可只取一个学期）中的 (班级, 课程)，不会一次性读入内存"""
+        return self._iter_courses("1", (), semester)
+
+    def courses_in_slot(self, day, period, semester=None):
+        """查找所有课表中某个 (星期, 节次) 的课程，返回 [(班级, 课程), ...]"""
+        return list(self._iter_courses("c.day = ? AND c.period = ?", (day, period), semester))
+
+    def courses_at_location(self, location, semester=None):
+        """查找所有课表中在某个地点上课的课程，返回 [(班级, 课程), ...]"""
+        return list(self._iter_courses("c.location = ?", (location,), semester))
+
+    def import_json_files(self, paths, semester, semester_start=None, class_name_for=None):
+        """批量导入 courses.json 格式的文件，全部在一个事务中完成，返回 (课表数, 课程数)
+
+        班级名默认取文件名（不含扩展名），可通过 class_name_for(path) 自定义。
+        """
+        if class_name_for is None:
+            class_name_for = lambda path: os.path.splitext(os.path.basename(path))[0]  # noqa: E731
+        schedules = courses = 0
+        with self.conn:
+            for path in paths:
+                with open(path, 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+                self._replace_schedule(
+                    class_name_for(path), semester, semester_start,
+                    lambda schedule_id: (json_course_row(schedule_id, data) for data in items),
+                )
+                schedules += 1
+                courses += len(items)
+        return schedules, courses
+
+    def import_class_courses(self, items, semester, semester_start=None):
+        """在一个事务中流式导入 (班级, 课程) 序列，返回 (课表数, 课程数)
+
+        出现的每个班级的课表会被整体替换；items 可以是生成器，不会被一次性读入内存。
+        """
+        schedule_ids = {}
+
+        def rows():
+            for class_name, course in items:
+                schedule_id = schedule_ids.get(class_name)
+                if schedule_id is None:
+                    schedule_id = self._replace_schedule(class_name, semester, semester_start, lambda _: ())
+                    schedule_ids[class_name] = schedule_id
+                yield course_row(schedule_id, course)
+
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                f"INSERT INTO courses (schedule_id, {COURSE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows(),
+            )
+            count = cursor.rowcount
+        return len(schedule_ids), count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="管理 SQLite 课表库")
+    parser.add_argument('database', help="课表库文件（不存在时自动创建）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="批量导入 courses.json 格式的课程文件，班级名取文件名")
+    import_parser.add_argument('inputs', nargs='+', help="课程 JSON 文件")
+    import_parser.add_argument('--semester', required=True, help="学期名称，例如 2024秋")
+    import_parser.add_argument('-s', '--start', type=date.fromisoformat,
+                               help="学期第一周的第一天，格式 YYYY-MM-DD")
+
+    list_parser = subparsers.add_parser('list', help="列出课表库中的课表")
+    list_parser.add_argument('--semester', help="只列出该学期的课表")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with ScheduleDatabase(args.database) as db:
+        if args.command == 'import':
+            started = time.perf_counter()
+            schedules, courses = db.import_json_files(args.inputs, args.semester, args.start)
+            elapsed = time.perf_counter() - started
+            print(f"已导入 {schedules} 份课表，共 {courses} 门课程，耗时 {elapsed:.2f} 秒")
+        else:
+            for class_name, semester, semester_start, _ in db.list_schedules(semester=args.semester):
+                print(f"{semester}\t{class_name}\t{semester_start or ''}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
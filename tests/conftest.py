@@ -0,0 +1,35 @@
+"""
+===========================
+@Time : 2026/10/24 上午10:00
+@Author : Entropy.Xu
+@File : conftest.py
+@Software: PyCharm
+============================
+"""
+# conftest.py
+# 模块都在仓库根目录下，直接运行 pytest 时把根目录加入导入路径；window 为界面测试共用的主窗口
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    """离屏平台上的主窗口，自动保存写入临时目录，测试结束后关闭"""
+    pytest.importorskip('PySide6')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    monkeypatch.setenv('CLASSTABLE_AUTOSAVE_PATH', str(tmp_path / 'autosave.json'))
+    from PySide6.QtCore import QEvent
+    from PySide6.QtWidgets import QApplication
+    from main_window import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    main_window = MainWindow()
+    yield main_window
+    main_window.autosaver.flush()
+    main_window.close()
+    main_window.deleteLater()
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete)
@@ -0,0 +1,44 @@
+"""
+===========================
+@Time : 2026/10/24 下午2:00
+@Author : Entropy.Xu
+@File : test_batch_generate.py
+@Software: PyCharm
+============================
+"""
+# test_batch_generate.py
+# 批量生成的输出文件名：不同来源写入同一个文件时必须报错，而不是静默覆盖。
+import json
+from datetime import date
+
+import pytest
+
+from batch_generate import main, run
+
+COURSES = [{'day': 0, 'period': 0, 'name': '高等数学', 'location': 'A101', 'weeks': [1, 2],
+            'start_time': '8:00', 'end_time': '9:40'}]
+
+
+def write_courses(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(COURSES, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_same_file_name_in_different_directories_fails(tmp_path, capsys):
+    first = write_courses(tmp_path / 'a' / 'courses.json')
+    second = write_courses(tmp_path / 'b' / 'courses.json')
+    out = tmp_path / 'out'
+    with pytest.raises(ValueError, match='courses.ics'):
+        run([first, second], str(out), date(2024, 9, 2), jobs=1)
+    assert not out.exists()
+    assert main([first, second, '-o', str(out), '--start', '2024-09-02', '-j', '1']) == 2
+    assert '输出文件冲突' in capsys.readouterr().err
+
+
+def test_repeated_input_is_generated_once(tmp_path):
+    path = write_courses(tmp_path / 'courses.json')
+    files, events, failures, skipped, _ = run([path, str(tmp_path / '.' / 'courses.json')], str(tmp_path / 'out'),
+                                              date(2024, 9, 2), jobs=1)
+    assert (files, events, failures, skipped) == (1, 1, [], [])
+    assert (tmp_path / 'out' / 'courses.ics').exists()
@@ -0,0 +1,138 @@
+"""
+===========================
+@Time : 2026/10/24 上午11:00
+@Author : Entropy.Xu
+@File : test_conflicts.py
+@Software: PyCharm
+============================
+"""
+# test_conflicts.py
+# 随机增删改课程，每一步都把 ConflictEngine 的增量结果与逐对比较（O(n²)）的结果对照，
+# 同时检查一次性的 find_conflicts（sweep line）。
+import random
+from datetime import time
+
+import pytest
+
+from conflicts import ConflictEngine, course_interval, find_conflicts
+from course import Course
+from course_store import CourseStore
+
+DAYS = 3
+PERIODS = 4
+
+
+def random_time(rng):
+    minutes = rng.randrange(8 * 60, 12 * 60, 10)
+    return time(minutes // 60, minutes % 60)
+
+
+def random_fields(rng):
+    """随机的上课时间和周数，包括时间缺失、结束早于开始、没有上课周和首尾相接的情况"""
+    start = random_time(rng)
+    roll = rng.random()
+    if roll < 0.05:
+        end = None
+    elif roll < 0.1:
+        end = start
+    else:
+        minutes = min(start.hour * 60 + start.minute + rng.choice([10, 30, 50, 60, 100, 120]), 23 * 60)
+        end = time(minutes // 60, minutes % 60)
+    return {
+        'day': rng.randrange(DAYS),
+        'period': rng.randrange(PERIODS),
+        'weeks_mask': rng.getrandbits(6) << 1,
+        'start_time': start,
+        'end_time': end,
+    }
+
+
+def random_course(rng, index):
+    fields = random_fields(rng)
+    return Course(fields['day'], fields['period'], f"课程{index}", '', fields['weeks_mask'],
+                  fields['start_time'], fields['end_time'])
+
+
+def brute_force(courses):
+    """逐对比较所有课程，返回 {frozenset(两门课程的 id): 冲突的周}"""
+    courses = list(courses)
+    pairs = {}
+    for i, first in enumerate(courses):
+        first_interval = course_interval(first)
+        if first_interval is None:
+            continue
+        for second in courses[i + 1:]:
+            second_interval = course_interval(second)
+            if second_interval is None or first.day != second.day:
+                continue
+            common = first.weeks_mask & second.weeks_mask
+            if common and first_interval[0] < second_interval[1] and second_interval[0] < first_interval[1]:
+                pairs[frozenset((id(first), id(second)))] = common
+    return pairs
+
+
+def as_pairs(conflicts):
+    pairs = {frozenset((id(conflict.first), id(conflict.second))): conflict.weeks_mask for conflict in conflicts}
+    assert len(pairs) == len(conflicts), "同一对课程重复出现"
+    return pairs
+
+
+def conflict_slots(courses, pairs):
+    by_id = {id(course): course for course in courses}
+    return {(by_id[key].day, by_id[key].period) for pair in pairs for key in pair}
+
+
+def assert_matches(engine, courses, previous_slots):
+    """检查引擎与逐对比较一致，返回当前有冲突的单元格"""
+    expected = brute_force(courses)
+    assert as_pairs(engine.conflicts()) == expected
+    assert len(engine) == len(expected)
+    for course in courses:
+        own = {pair: mask for pair, mask in expected.items() if id(course) in pair}
+        assert as_pairs(engine.conflicts_for(course)) == own
+    slots = conflict_slots(courses, expected)
+    for day in range(DAYS):
+        for period in range(PERIODS):
+            assert engine.slot_has_conflict(day, period) == ((day, period) in slots)
+    # 冲突状态变化的单元格都要报告，界面只重绘这些单元格
+    assert slots ^ previous_slots <= engine.take_changed()
+    return slots
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_engine_matches_brute_force(seed):
+    rng = random.Random(seed)
+    store = CourseStore()
+    engine = ConflictEngine()
+    store.add_listener(engine)
+    created = 0
+    slots = set()
+    for step in range(300):
+        courses = store.to_list()
+        roll = rng.random()
+        if roll < 0.4 or not courses:
+            store.add(random_course(rng, created))
+            created += 1
+        elif roll < 0.6:
+            store.remove(rng.choice(courses))
+        elif roll < 0.9:
+            fields = random_fields(rng)
+            changes = {field: fields[field] for field in rng.sample(sorted(fields), rng.randint(1, len(fields)))}
+            store.update(rng.choice(courses), **changes)
+        elif roll < 0.97:
+            # 整体替换：保留一部分原有课程，再加入新课程
+            kept = [course for course in courses if rng.random() < 0.7]
+            fresh = [random_course(rng, created + i) for i in range(rng.randint(0, 10))]
+            created += len(fresh)
+            store.reset(kept + fresh)
+        else:
+            store.clear()
+        slots = assert_matches(engine, store.to_list(), slots)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_find_conflicts_matches_brute_force(seed):
+    rng = random.Random(1000 + seed)
+    courses = [random_course(rng, i) for i in range(rng.randint(0, 80))]
+    assert as_pairs(find_conflicts(courses)) == brute_force(courses)
+    assert as_pairs(ConflictEngine(courses).conflicts()) == brute_force(courses)
@@ -0,0 +1,157 @@
+"""
+===========================
+@Time : 2026/10/24 下午5:00
+@Author : Entropy.Xu
+@File : test_edit_history.py
+@Software: PyCharm
+============================
+"""
+# test_edit_history.py
+# 撤销/重做：增量记录（删除 + 添加合并为只含变化字段的修改）的往返，撤销后单元格中课程的先后顺序不变，
+# 以及在主窗口中撤销、重做后表格刷新为对应的内容。
+from course import Course
+from course_store import CourseStore
+from edit_history import ADDED, REMOVED, UPDATED, EditHistory, course_state
+
+
+def make_course(day, period, name, location='A101', weeks=(1, 2)):
+    return Course.from_dict({'day': day, 'period': period, 'name': name, 'location': location, 'weeks': list(weeks),
+                             'start_time': '8:00', 'end_time': '9:40'})
+
+
+def store_state(store):
+    """课程集合的内容，包括每个单元格中课程的先后顺序"""
+    return sorted(course_state(course) for course in store.to_list()), \
+        {slot: [course.name for course in store.at(*slot)] for slot in store.slots()}
+
+
+def make_history():
+    store = CourseStore([make_course(0, 0, 'A'), make_course(0, 0, 'B'), make_course(1, 2, 'C'),
+                         make_course(0, 0, 'E')])
+    return store, EditHistory(store)
+
+
+def assert_round_trip(store, history, before, after):
+    assert history.undo() is not None
+    assert store_state(store) == before
+    assert history.redo() is not None
+    assert store_state(store) == after
+    history.undo()
+    assert store_state(store) == before
+
+
+def test_add_round_trip():
+    store, history = make_history()
+    before = store_state(store)
+    with history.command("添加") as command:
+        store.add(make_course(2, 3, 'D'))
+    assert [step[0] for step in command.steps] == [ADDED]
+    assert_round_trip(store, history, before, store_state(store))
+
+
+def test_remove_keeps_order_within_slot():
+    store, history = make_history()
+    before = store_state(store)
+    a, b, e = store.at(0, 0)
+    with history.command("删除") as command:
+        store.remove(b)
+        store.remove(a)
+        store.remove(e)
+    assert command.steps == [(REMOVED, b, 1), (REMOVED, a, 0), (REMOVED, e, 0)]
+    assert store.at(0, 0) == []
+    assert_round_trip(store, history, before, store_state(store))
+    assert [course.name for course in store.at(0, 0)] == ['A', 'B', 'E']
+
+
+def test_remove_from_middle_then_add_restores_position():
+    store, history = make_history()
+    before = store_state(store)
+    with history.command("替换"):
+        store.remove(store.at(0, 0)[1])
+        store.add(make_course(0, 0, 'F'))
+    assert [course.name for course in store.at(0, 0)] == ['A', 'E', 'F']
+    assert_round_trip(store, history, before, store_state(store))
+
+
+def test_field_update_is_recorded_as_delta():
+    store, history = make_history()
+    before = store_state(store)
+    course = store.at(1, 2)[0]
+    with history.command("修改") as command:
+        store.update(course, location='B202', weeks_mask=1 << 5)
+    # 删除 + 添加合并为一次只含变化字段的修改
+    assert command.steps == [(UPDATED, course, {'location': 'A101', 'weeks_mask': 0b110},
+                              {'location': 'B202', 'weeks_mask': 1 << 5}, 0)]
+    assert_round_trip(store, history, before, store_state(store))
+
+
+def test_move_round_trip():
+    store, history = make_history()
+    before = store_state(store)
+    course = store.at(0, 0)[0]
+    with history.command("移动") as command:
+        store.update(course, day=4, period=5)
+    assert command.steps[0][0] == UPDATED
+    assert store.at(4, 5) == [course]
+    assert_round_trip(store, history, before, store_state(store))
+    assert store.at(4, 5) == []
+    assert store.at(0, 0)[0] is course
+
+
+def test_unchanged_update_and_empty_command_are_not_recorded():
+    store, history = make_history()
+    with history.command("空操作"):
+        store.update(store.at(1, 2)[0], location='A101')
+    assert not history.can_undo()
+
+
+def test_change_outside_command_clears_history():
+    store, history = make_history()
+    with history.command("添加"):
+        store.add(make_course(2, 3, 'D'))
+    store.add(make_course(3, 3, 'E'))
+    assert not history.can_undo()
+    store.reset([])
+    assert history.undo() is None
+
+
+def test_new_edit_clears_redo():
+    store, history = make_history()
+    with history.command("添加"):
+        store.add(make_course(2, 3, 'D'))
+    history.undo()
+    with history.command("删除"):
+        store.remove(store.at(1, 2)[0])
+    assert not history.can_redo()
+
+
+def test_window_undo_redo_refreshes_table(window):
+    model = window.table.model()
+    first, second = make_course(0, 0, 'A'), make_course(0, 0, 'B')
+    window.courses.extend([first, second])
+    window.commit_course_changes()
+    window.history.clear()
+    original = model.cell_text(0, 1)
+    assert original == 'A(A101)\n周数: 1-2\nB(A101)\n周数: 1-2'
+
+    edits = [
+        ("添加", lambda: window.courses.add(make_course(2, 1, 'C')), (1, 3), 'C(A101)\n周数: 1-2'),
+        ("删除", lambda: window.courses.remove(second), (0, 1), 'A(A101)\n周数: 1-2'),
+        ("修改", lambda: window.courses.update(first, location='B202'), (0, 1),
+         'A(B202)\n周数: 1-2\nB(A101)\n周数: 1-2'),
+        ("移动", lambda: window.courses.update(first, day=3, period=2), (2, 4), 'A(A101)\n周数: 1-2'),
+    ]
+    for label, edit, (row, column), edited in edits:
+        before = model.cell_text(row, column), model.cell_text(0, 1)
+        with window.history.command(label):
+            edit()
+        window.commit_course_changes()
+        after = model.cell_text(row, column), model.cell_text(0, 1)
+        assert after[0] == edited
+
+        window.undo_edit()
+        assert (model.cell_text(row, column), model.cell_text(0, 1)) == before
+        window.redo_edit()
+        assert (model.cell_text(row, column), model.cell_text(0, 1)) == after
+        window.undo_edit()
+        assert model.cell_text(0, 1) == original
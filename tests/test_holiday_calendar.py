@@ -0,0 +1,111 @@
+"""
+===========================
+@Time : 2026/10/24 下午6:00
+@Author : Entropy.Xu
+@File : test_holiday_calendar.py
+@Software: PyCharm
+============================
+"""
+# test_holiday_calendar.py
+# 节假日与调休：按星期几换算的周数位掩码，以及放假、调休在 RRULE/EXDATE 和逐周展开两种模式下的事件。
+from datetime import date, datetime, time, timezone
+
+import pytest
+
+from course import Course
+from holiday_calendar import HolidayCalendar, parse_date_range
+from ics_generator import MODE_EXPANDED, MODE_RRULE, UID_DOMAIN, fixed_versions, iter_event_specs, write_ics_file
+from ics_writer import write_ics_stream
+
+SEMESTER_START = date(2024, 9, 2)  # 星期一
+START, END = time(8, 0), time(9, 40)
+# 中秋 9 月 16、17 日放假，9 月 14 日（周六）上 16 日（周一）的课；国庆 10 月 1 至 7 日放假，
+# 9 月 29 日（周日）上 10 月 4 日（周五）的课，10 月 12 日（周六）上 10 月 7 日（周一）的课
+HOLIDAYS = HolidayCalendar.from_dict({
+    'skip': ['2024-08-30', '2024-09-16..2024-09-17', '2024-10-01..2024-10-07'],
+    'makeup': {'2024-09-14': '2024-09-16', '2024-09-29': '2024-10-04', '2024-10-12': '2024-10-07'},
+})
+
+
+def weeks_mask(*weeks):
+    return sum(1 << week for week in weeks)
+
+
+def make_course(day, weeks):
+    return Course(day, 0, '高等数学', 'A101', weeks_mask(*weeks), START, END)
+
+
+def specs(course, mode):
+    return list(iter_event_specs(course, START, END, SEMESTER_START, mode, uid_base='c', holidays=HOLIDAYS))
+
+
+def at(day):
+    return datetime.combine(day, START)
+
+
+def test_parse_date_range():
+    assert parse_date_range('2024-10-06..2024-10-07') == [date(2024, 10, 6), date(2024, 10, 7)]
+    assert parse_date_range('2024-10-06') == [date(2024, 10, 6)]
+    with pytest.raises(ValueError):
+        parse_date_range('2024-10-07..2024-10-06')
+
+
+def test_week_masks_per_weekday():
+    masks = HOLIDAYS.week_masks(SEMESTER_START)
+    # 学期开始前的日期不计入；10 月 7 日是第 6 周的周一
+    assert masks[0] == (weeks_mask(3, 6), weeks_mask(3, 6))
+    assert masks[1] == (weeks_mask(3, 5), 0)
+    assert masks[4] == (weeks_mask(5), weeks_mask(5))
+    for weekday in (2, 3, 5, 6):
+        assert masks[weekday] == (weeks_mask(5), 0)
+    assert HOLIDAYS.week_masks(SEMESTER_START) is masks
+
+
+def test_expanded_skips_holidays_and_adds_makeup_days():
+    events = specs(make_course(0, range(1, 9)), MODE_EXPANDED)
+    starts = [event['dtstart'] for event in events]
+    assert starts == [at(date(2024, 9, 2)), at(date(2024, 9, 9)), at(date(2024, 9, 14)), at(date(2024, 9, 23)),
+                      at(date(2024, 9, 30)), at(date(2024, 10, 12)), at(date(2024, 10, 14)), at(date(2024, 10, 21))]
+    uids = {event['dtstart'].date(): event['uid'] for event in events}
+    assert uids[date(2024, 9, 14)] == f"c-w3-20240914@{UID_DOMAIN}"
+    assert uids[date(2024, 9, 23)] == f"c-w4@{UID_DOMAIN}"
+    assert '调休：补 9月16日的课' in events[2]['description']
+
+
+def test_rrule_excludes_holidays_and_adds_makeup_days():
+    event, *makeups = specs(make_course(0, [1, 2, 3, 4, 6, 7]), MODE_RRULE)
+    assert event['uid'] == f"c@{UID_DOMAIN}"
+    assert event['dtstart'] == at(date(2024, 9, 2))
+    assert event['rrule_count'] == 7
+    # 第 5 周本来没有课，第 3、6 周放假，EXDATE 按时间排序
+    assert event['exdate'] == [at(date(2024, 9, 16)), at(date(2024, 9, 30)), at(date(2024, 10, 7))]
+    assert [(spec['dtstart'], spec['uid']) for spec in makeups] == [
+        (at(date(2024, 9, 14)), f"c-20240914@{UID_DOMAIN}"),
+        (at(date(2024, 10, 12)), f"c-20241012@{UID_DOMAIN}"),
+    ]
+
+
+@pytest.mark.parametrize('mode', [MODE_RRULE, MODE_EXPANDED])
+def test_class_only_in_holiday_weeks(mode):
+    # 周二第 3 周放假且没有调休：不生成事件
+    assert specs(make_course(1, [3]), mode) == []
+    # 周五第 5 周放假，9 月 29 日调休补课：只有补课事件
+    assert [event['dtstart'] for event in specs(make_course(4, [5]), mode)] == [at(date(2024, 9, 29))]
+
+
+@pytest.mark.parametrize('mode', [MODE_RRULE, MODE_EXPANDED])
+def test_courses_outside_holiday_weeks_are_unchanged(mode):
+    course = make_course(1, [1, 2, 4, 6])
+    plain = list(iter_event_specs(course, START, END, SEMESTER_START, mode, uid_base='c'))
+    assert specs(course, mode) == plain
+
+
+@pytest.mark.parametrize('mode', [MODE_RRULE, MODE_EXPANDED])
+def test_stream_matches_icalendar_with_holidays(tmp_path, mode):
+    courses = [make_course(day, range(1, 9)) for day in range(7)]
+    dtstamp = datetime(2024, 9, 1, 8, 30, tzinfo=timezone.utc)
+    reference, streamed = tmp_path / 'reference.ics', tmp_path / 'streamed.ics'
+    count = write_ics_file(courses, SEMESTER_START, reference, mode, dtstamp=dtstamp, holidays=HOLIDAYS)
+    assert write_ics_stream(courses, SEMESTER_START, streamed, mode, versions=fixed_versions(dtstamp),
+                            holidays=HOLIDAYS) == count
+    assert streamed.read_bytes() == reference.read_bytes()
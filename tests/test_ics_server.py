@@ -0,0 +1,66 @@
+"""
+===========================
+@Time : 2026/10/24 下午4:00
+@Author : Entropy.Xu
+@File : test_ics_server.py
+@Software: PyCharm
+============================
+"""
+# test_ics_server.py
+# 订阅的生成不阻塞 update()，生成期间推送的新数据在下次请求时生效；按 Accept-Encoding 的 q 值决定是否压缩。
+import threading
+from datetime import date
+
+from course import Course
+from ics_server import CalendarFeed, accepts_gzip
+
+SEMESTER_START = date(2024, 9, 2)
+
+
+def make_courses(location):
+    return [Course.from_dict({'day': 0, 'period': 0, 'name': '高等数学', 'location': location, 'weeks': [1, 2],
+                              'start_time': '8:00', 'end_time': '9:40'})]
+
+
+def test_update_is_not_blocked_by_a_running_build():
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_loader():
+        loading.set()
+        release.wait(5)
+        return make_courses('旧教室'), SEMESTER_START
+
+    feed = CalendarFeed(loader=slow_loader)
+    bodies = []
+    request = threading.Thread(target=lambda: bodies.append(feed.body()))
+    request.start()
+    assert loading.wait(5)
+
+    pushed = threading.Thread(target=feed.update, args=(make_courses('新教室'), SEMESTER_START))
+    pushed.start()
+    pushed.join(1)
+    assert not pushed.is_alive(), "update() 等待了正在进行的生成"
+
+    release.set()
+    request.join(5)
+    assert '旧教室'.encode('utf-8') in bodies[0].data
+    # 生成期间数据已变化，过时的结果不会被缓存
+    current = feed.body()
+    assert '新教室'.encode('utf-8') in current.data
+    assert feed.builds == 2
+    assert feed.body() is current
+
+
+def test_accepts_gzip_honours_q_values():
+    assert accepts_gzip('gzip, deflate, br')
+    assert accepts_gzip('deflate;q=0.5, GZIP;q=0.8')
+    assert accepts_gzip('x-gzip')
+    assert accepts_gzip('*')
+    assert not accepts_gzip('gzip;q=0')
+    assert not accepts_gzip('gzip; q=0.000, identity')
+    assert not accepts_gzip('*;q=0, identity')
+    assert not accepts_gzip('gzip;q=0, *')
+    assert not accepts_gzip('identity')
+    assert not accepts_gzip('')
+    assert not accepts_gzip(None)
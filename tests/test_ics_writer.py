@@ -0,0 +1,64 @@
+"""
+===========================
+@Time : 2026/10/24 上午10:00
+@Author : Entropy.Xu
+@File : test_ics_writer.py
+@Software: PyCharm
+============================
+"""
+# test_ics_writer.py
+# 流式写出（ics_writer）与 icalendar 参考实现（ics_generator）的输出必须逐字节一致，
+# 重点覆盖需要转义的字符（; , \ 换行）、中文以及超过 75 字节需要折行的内容行。
+from datetime import date, datetime, timezone
+
+import pytest
+
+from course import Course
+from ics_cache import EventCache
+from ics_generator import EVENT_MODES, fixed_versions, write_ics_file
+from ics_writer import write_ics_stream
+
+SEMESTER_START = date(2024, 9, 2)
+DTSTAMP = datetime(2024, 9, 1, 8, 30, tzinfo=timezone.utc)
+
+
+def make_courses():
+    rows = [
+        (0, 0, "高等数学（上）", "教学楼A101", [1, 2, 3, 5, 8], "8:00", "9:40"),
+        (1, 2, "数据结构; 实验, 第二部分\\附录", "实验楼 3-201; 机房", [1, 3, 5, 7], "10:00", "11:40"),
+        (2, 4, "多行\n课程名称\r\n第三行", "地点\n备注", list(range(1, 17)), "14:00", "15:40"),
+        (3, 6, "计算机网络与分布式系统原理及其在大规模互联网服务中的应用（双语教学，含课程设计与期末综合实践环节）",
+         "信息科学与技术学院综合实验大楼东区四层开放实验室（请携带学生证）", [2, 4, 6, 8, 10], "16:00", "17:40"),
+        (4, 8, "a" * 70 + "中" * 10, ";" * 40 + "," * 40, [1], "19:00", "20:40"),
+        (5, 1, "时间错误的课程", "A", [1], "10:00", "9:00"),
+    ]
+    courses = [Course.from_dict({'day': day, 'period': period, 'name': name, 'location': location, 'weeks': weeks,
+                                 'start_time': start, 'end_time': end})
+               for day, period, name, location, weeks, start, end in rows]
+    # 同一身份的课程出现两次，覆盖 UID 去重
+    return courses + [courses[1].copy()]
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+@pytest.mark.parametrize('mode', EVENT_MODES)
+def test_stream_matches_icalendar(tmp_path, mode, use_cache):
+    courses = make_courses()
+    reference = tmp_path / 'reference.ics'
+    streamed = tmp_path / 'streamed.ics'
+    expected_count = write_ics_file(courses, SEMESTER_START, reference, mode, dtstamp=DTSTAMP)
+    cache = EventCache() if use_cache else None
+    for _ in range(2 if use_cache else 1):  # 使用缓存时第二次写出全部命中缓存
+        count = write_ics_stream(courses, SEMESTER_START, streamed, mode, cache=cache,
+                                 versions=fixed_versions(DTSTAMP))
+        assert count == expected_count
+        assert streamed.read_bytes() == reference.read_bytes()
+
+
+def test_schedule_exercises_escaping_and_folding(tmp_path):
+    path = tmp_path / 'streamed.ics'
+    write_ics_stream(make_courses(), SEMESTER_START, path, versions=fixed_versions(DTSTAMP))
+    data = path.read_bytes()
+    assert b'\\;' in data and b'\\,' in data and b'\\\\' in data and b'\\n' in data
+    assert b'\r\n ' in data
+    assert all(len(line) <= 75 for line in data.split(b'\r\n'))
+    data.decode('utf-8')  # 折行不会把多字节字符截断
@@ -0,0 +1,78 @@
+"""
+===========================
+@Time : 2026/10/24 下午3:00
+@Author : Entropy.Xu
+@File : test_main_window.py
+@Software: PyCharm
+============================
+"""
+# test_main_window.py
+# 主窗口：batch_update 文档中的脚本示例修改课程后表格显示新的内容；关闭窗口时取消并等待后台导出。
+import threading
+import time
+
+from course import Course
+
+
+def make_course(day, period, name, location='OldRoom', weeks=(1, 2)):
+    return Course.from_dict({'day': day, 'period': period, 'name': name, 'location': location, 'weeks': list(weeks),
+                             'start_time': '8:00', 'end_time': '9:40'})
+
+
+def test_batch_update_example_refreshes_cells(window):
+    courses = [make_course(0, 0, 'A'), make_course(2, 1, 'B')]
+    window.courses.extend(courses)
+    window.commit_course_changes()
+    model = window.table.model()
+    assert model.cell_text(0, 1) == 'A(OldRoom)\n周数: 1-2'
+
+    # batch_update 文档字符串中的示例
+    with window.batch_update("批量调课"):
+        for course in courses:
+            window.courses.update(course, location='NewRoom')
+            window.commit_course_changes()
+
+    assert model.cell_text(0, 1) == 'A(NewRoom)\n周数: 1-2'
+    assert model.cell_text(1, 3) == 'B(NewRoom)\n周数: 1-2'
+
+    window.undo_edit()
+    assert model.cell_text(0, 1) == 'A(OldRoom)\n周数: 1-2'
+    assert model.cell_text(1, 3) == 'B(OldRoom)\n周数: 1-2'
+
+
+def test_update_without_batch_refreshes_weeks(window):
+    course = make_course(0, 0, 'A')
+    window.courses.add(course)
+    window.commit_course_changes()
+    window.courses.update(course, weeks_mask=1 << 3)
+    window.commit_course_changes()
+    assert window.table.model().cell_text(0, 1) == 'A(OldRoom)\n周数: 3'
+
+
+def test_close_cancels_and_waits_for_running_export(window, tmp_path, monkeypatch):
+    import export_worker
+    from PySide6.QtWidgets import QFileDialog
+
+    started = threading.Event()
+    stopped = []
+
+    def slow_export(courses, semester_start, file_path, mode, on_progress=None, **kwargs):
+        started.set()
+        try:
+            for _ in range(500):
+                time.sleep(0.01)
+                on_progress(0, 1)
+        except export_worker.ExportCancelled:
+            stopped.append('cancelled')
+            raise
+        stopped.append('finished')
+
+    monkeypatch.setattr(export_worker, 'export_calendar', slow_export)
+    monkeypatch.setattr(QFileDialog, 'getSaveFileName', lambda *args: (str(tmp_path / 'out.ics'), ''))
+    window.courses.add(make_course(0, 0, 'A'))
+    window.generate_ics()
+    assert started.wait(5)
+
+    window.close()
+    assert stopped == ['cancelled']
+    assert window.export_task is None
@@ -0,0 +1,174 @@
+"""
+===========================
+@Time : 2026/10/18 下午4:20
+@Author : Entropy.Xu
+@File : timetable_model.py
+@Software: PyCharm
+============================
+"""
+# timetable_model.py
+# 课表的数据模型：单元格文本在绘制时才从课程集合中生成并缓存，
+# 课程变化时只对受影响的单元格发出 dataChanged。
+# 给出冲突检测引擎时，有冲突的单元格以浅红色背景显示，提示文字列出冲突。
+# 可按周筛选只显示某一周上课的课程，切换周次时借助周索引只刷新两周中有课的单元格。
+# cell_chips 给出单元格中每门课程的 (名称, 地点, 周数) 元组，供 course_delegate 分别绘制。
+from functools import lru_cache
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from utils import format_weeks
+
+HEADERS = ['节次', '星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+CONFLICT_BACKGROUND = QColor(255, 205, 205)
+
+
+@lru_cache(maxsize=65536)
+def course_text(name, location, weeks_mask):
+    """单门课程在单元格中的两行文本，按课程内容缓存"""
+    return f"{name}({location})\n周数: {format_weeks(weeks_mask)}"
+
+
+@lru_cache(maxsize=65536)
+def course_chip(name, location, weeks_mask):
+    """单门课程的 (名称, 地点, 周数文本)，按课程内容缓存，相同内容的单元格共享同一个元组"""
+    return name, location, format_weeks(weeks_mask)
+
+
+CELL_ROLES = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.BackgroundRole, Qt.ItemDataRole.ToolTipRole]
+
+
+class TimetableModel(QAbstractTableModel):
+    """课表模型，第 0 列为节次，第 1~7 列为星期一至星期日"""
+
+    def __init__(self, courses, periods, parent=None, conflicts=None, week_index=None):
+        super().__init__(parent)
+        self.courses = courses
+        self.periods = periods
+        self.conflicts = conflicts  # 可选的 conflicts.ConflictEngine
+        self.week_index = week_index  # 可选的 week_index.WeekIndex，按周筛选时用于确定需刷新的单元格
+        self.week = None  # 只显示该周上课的课程，None 表示显示全部
+        self._text_cache = {}  # (row, column) -> {周次: 单元格文本}，周次为 None 表示全部
+        self._chip_cache = {}  # (row, column) -> {周次: 课程元组的元组}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.periods)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        if index.column() == 0:
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return self.periods.display(row)
+            return self.cell_text(row, column) or None
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if column and self.cell_conflicts(row, column):
+                return CONFLICT_BACKGROUND
+            return None
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if column:
+                return '\n'.join(conflict.describe() for conflict in self.cell_conflicts(row, column)) or None
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 0:
+                return Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft
+        return None
+
+    def visible_courses(self, day, period):
+        """(星期, 节次) 单元格中当前显示的课程：按周筛选时只包括该周上课的课程"""
+        week = self.week
+        courses = self.courses.at(day, period)
+        if week is None:
+            return courses
+        return [course for course in courses if course.weeks_mask >> week & 1]
+
+    def cell_text(self, row, column):
+        """生成单元格中显示的课程文本，每周的结果分别缓存到该单元格下次变化为止"""
+        week = self.week
+        texts = self._text_cache.setdefault((row, column), {})
+        text = texts.get(week)
+        if text is None:
+            text = '\n'.join(
+                course_text(course.name, course.location, course.weeks_mask)
+                for course in self.visible_courses(column - 1, row)
+            )
+            texts[week] = text
+        return text
+
+    def cell_chips(self, row, column):
+        """单元格中显示的课程，返回 ((名称, 地点, 周数文本), ...)；单元格变化前返回同一个元组"""
+        week = self.week
+        chips_by_week = self._chip_cache.setdefault((row, column), {})
+        chips = chips_by_week.get(week)
+        if chips is None:
+            chips = chips_by_week[week] = tuple(
+                course_chip(course.name, course.location, course.weeks_mask)
+                for course in self.visible_courses(column - 1, row)
+            )
+        return chips
+
+    def cell_conflicts(self, row, column):
+        """单元格中显示的课程在当前周次下的冲突；按周筛选时只包括该周发生的冲突"""
+        if self.conflicts is None or not self.conflicts.slot_has_conflict(column - 1, row):
+            return []
+        week = self.week
+        return [
+            conflict
+            for course in self.visible_courses(column - 1, row)
+            for conflict in self.conflicts.conflicts_for(course)
+            if week is None or conflict.weeks_mask >> week & 1
+        ]
+
+    def cells_changed(self, cells):
+        """通知 (星期, 节次) 单元格已变化，返回受影响的行"""
+        columns = {}  # row -> (最左列, 最右列)，每行只发出一次 dataChanged
+        for day, period in cells:
+            if not 0 <= period < len(self.periods) or not 0 <= day < 7:
+                continue
+            row, column = period, day + 1
+            self._text_cache.pop((row, column), None)
+            self._chip_cache.pop((row, column), None)
+            left, right = columns.get(row, (column, column))
+            columns[row] = (min(left, column), max(right, column))
+        for row, (left, right) in columns.items():
+            self.dataChanged.emit(self.index(row, left), self.index(row, right), CELL_ROLES)
+        return columns.keys()
+
+    def set_week(self, week):
+        """切换显示的周次（None 为全部），返回受影响的行"""
+        if week == self.week:
+            return set()
+        if self.week is None or week is None or self.week_index is None:
+            cells = self.courses.slots()
+        else:
+            cells = self.week_index.changed_slots(self.week, week)
+        self.week = week
+        return self.cells_changed(cells)
+
+    def period_changed(self, row):
+        """通知节次列的显示已变化"""
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def refresh_all(self):
+        """清空缓存并通知整个表格已变化"""
+        self._text_cache.clear()
+        self._chip_cache.clear()
+        self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
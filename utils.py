@@ -7,51 +7,102 @@
 ============================
 """
 # utils.py
-def format_weeks(weeks):
-    """格式化周数列表为字符串，连续的周数用'-'表示"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+def weeks_to_mask(weeks):
+    """将周数列表转换为整数位掩码，第 n 位表示第 n 周"""
+    mask = 0
+    for week in weeks:
+        mask |= 1 << week
+    return mask
+
+def mask_to_weeks(mask):
+    """将周数位掩码转换为升序的周数列表"""
+    weeks = []
+    while mask:
+        lowest = mask & -mask
+        weeks.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return weeks
+
+def mask_runs(mask):
+    """直接从位掩码中找出连续的周数区间，返回 [(起始周, 结束周), ...]"""
+    runs = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        # 最低位的 0 之前连续 1 的个数即为区间长度
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        runs.append((start, start + length - 1))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
+
+def week_runs(weeks):
+    """将周数列表（或位掩码）拆分为连续区间，返回 [(起始周, 结束周), ...]"""
+    if isinstance(weeks, int):
+        return mask_runs(weeks)
     if not weeks:
-        return ''
+        return []
     weeks = sorted(weeks)
-    ranges = []
+    runs = []
     start = prev = weeks[0]
     for week in weeks[1:]:
         if week == prev + 1:
             prev = week
         else:
-            if start == prev:
-                ranges.append(f"{start}")
-            else:
-                ranges.append(f"{start}-{prev}")
+            runs.append((start, prev))
             start = prev = week
-    if start == prev:
-        ranges.append(f"{start}")
-    else:
-        ranges.append(f"{start}-{prev}")
-    return ','.join(ranges)
-
-def parse_weeks_input(weeks_input):
-    """解析周数输入字符串，返回周数列表"""
-    weeks = set()
+    runs.append((start, prev))
+    return runs
+
+def format_weeks(weeks):
+    """格式化周数列表（或位掩码）为字符串，连续的周数用'-'表示"""
+    return ','.join(f"{start}" if start == end else f"{start}-{end}" for start, end in week_runs(weeks))
+
+def parse_weeks_input(weeks_input, as_mask=False):
+    """解析周数输入字符串，返回周数列表；as_mask 为 True 时返回位掩码
+
+    周数从 1 开始，含第 0 周的部分被忽略（周次选择中 0 表示显示全部周）。
+    """
+    mask = 0
     for part in weeks_input.split(','):
         part = part.strip()
         if '-' in part:
             try:
                 start, end = part.split('-')
-                weeks.update(range(int(start), int(end) + 1))
+                start, end = int(start), int(end)
             except ValueError:
                 continue
+            if end >= start >= 1:
+                mask |= ((1 << (end - start + 1)) - 1) << start
         else:
             try:
-                weeks.add(int(part))
+                week = int(part)
             except ValueError:
                 continue
-    return sorted(weeks)
+            if week >= 1:
+                mask |= 1 << week
+    return mask if as_mask else mask_to_weeks(mask)
+
+@contextmanager
+def atomic_open(file_path, mode='wb', encoding=None):
+    """原子地写入文件：先写入同目录下的临时文件，成功后再重命名为目标文件
 
-def get_time_from_period(period_str):
-    """根据节次信息获取开始时间和结束时间"""
+    写入过程中出错（包括被取消）时删除临时文件，目标文件保持不变。
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp', dir=directory)
     try:
-        times = period_str.split('\n')[1]
-        start_time_str, end_time_str = times.split('-')
-        return start_time_str.strip(), end_time_str.strip()
-    except IndexError:
-        return "08:00", "09:00"  # 默认时间
\ No newline at end of file
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
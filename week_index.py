@@ -0,0 +1,60 @@
+"""
+===========================
+@Time : 2026/10/21 下午8:00
+@Author : Entropy.Xu
+@File : week_index.py
+@Software: PyCharm
+============================
+"""
+# week_index.py
+# 周索引：记录每一周有课的 (星期, 节次) 单元格，作为 CourseStore 的监听者随增删增量更新。
+# 按周筛选课表时，切换周次只需刷新两周中有课的单元格，而不是整个表格。
+from utils import mask_to_weeks
+
+
+def current_week(semester_start, today):
+    """根据学期第一周的第一天计算 today 所在的周次（第 1 周起），开学前返回 0"""
+    days = (today - semester_start).days
+    return days // 7 + 1 if days >= 0 else 0
+
+
+class WeekIndex:
+    """周 -> 有课的单元格"""
+
+    def __init__(self, courses=()):
+        self._slots = {}  # week -> {(day, period): 该周在此单元格上课的课程数}
+        if courses:
+            self.courses_reset(courses)
+
+    def course_added(self, course):
+        slot = (course.day, course.period)
+        for week in mask_to_weeks(course.weeks_mask):
+            slots = self._slots.setdefault(week, {})
+            slots[slot] = slots.get(slot, 0) + 1
+
+    def course_removed(self, course):
+        slot = (course.day, course.period)
+        for week in mask_to_weeks(course.weeks_mask):
+            slots = self._slots[week]
+            slots[slot] -= 1
+            if not slots[slot]:
+                del slots[slot]
+                if not slots:
+                    del self._slots[week]
+
+    def courses_reset(self, courses):
+        self._slots.clear()
+        for course in courses:
+            self.course_added(course)
+
+    def slots(self, week):
+        """第 week 周有课的单元格"""
+        return self._slots.get(week, {}).keys()
+
+    def changed_slots(self, old_week, new_week):
+        """从 old_week 切换到 new_week 时显示可能变化的单元格"""
+        return self.slots(old_week) | self.slots(new_week)
+
+    def max_week(self):
+        """有课的最大周次，没有课程时返回 0"""
+        return max(self._slots, default=0)